@@ -0,0 +1,181 @@
+# api/embedding_cache.py
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; the cache is then safe within one process only
+    fcntl = None
+
+
+def model_fingerprint(model, model_name: str, normalize: bool = True) -> str:
+    """
+    Fingerprint a SentenceTransformer so cached vectors are never reused
+    across different weights, pooling or sequence length, even under the
+    same model name (e.g. a re-downloaded or fine-tuned checkpoint).
+    """
+    h = hashlib.sha1()
+    h.update(model_name.encode("utf-8"))
+    h.update(str(model.get_sentence_embedding_dimension()).encode("ascii"))
+    h.update(str(getattr(model, "max_seq_length", "")).encode("ascii"))
+    h.update(str(normalize).encode("ascii"))
+    h.update(" ".join(type(module).__name__ for module in model).encode("utf-8"))
+
+    params = list(model.parameters())
+    for param in (params[:1] + params[-1:]):
+        # First/last 1 MiB of the embedding and output weights is plenty to tell checkpoints apart
+        h.update(param.detach().cpu().numpy().tobytes()[:1 << 20])
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed store of document embeddings.
+
+    One directory per (model name, fingerprint). Vectors are appended to a
+    flat float32 file that is read through np.memmap; a SQLite table maps
+    sha1(text) to a row in that file. Identical texts share one row, so a
+    chunk repeated across sources is encoded once, and unchanged text is
+    never re-encoded between runs.
+
+    Several processes (encoder runs, indexers) may share a cache directory:
+    appends take an exclusive fcntl lock on a lock file, so rows are
+    allocated from the file size by one writer at a time.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, fingerprint: str, dim: int):
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        self.path = os.path.join(cache_dir, f"{slug}-{fingerprint[:16]}")
+        self.dim = dim
+        self.vectors_path = os.path.join(self.path, "vectors.f32")
+        self.lock_path = os.path.join(self.path, "append.lock")
+        self._row_bytes = dim * 4
+        self._lock = threading.Lock()
+        self._memmap = None
+        self._hits = 0
+        self._misses = 0
+
+        os.makedirs(self.path, exist_ok=True)
+        meta_path = os.path.join(self.path, "meta.json")
+        if not os.path.exists(meta_path):
+            with open(meta_path, 'w') as f:
+                json.dump({'model_name': model_name, 'fingerprint': fingerprint, 'dim': dim}, f, indent=2)
+
+        self._index = sqlite3.connect(os.path.join(self.path, "index.db"), check_same_thread=False)
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.execute("CREATE TABLE IF NOT EXISTS entries (key BLOB PRIMARY KEY, row INTEGER NOT NULL)")
+        self._index.commit()
+        open(self.vectors_path, 'ab').close()
+
+    @staticmethod
+    def text_key(text: str) -> bytes:
+        return hashlib.sha1(text.encode("utf-8")).digest()
+
+    @contextmanager
+    def _append_lock(self):
+        """Exclusive across processes sharing the directory (and, with self._lock, threads)"""
+        with open(self.lock_path, 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _rows_on_disk(self) -> int:
+        return os.path.getsize(self.vectors_path) // self._row_bytes
+
+    def _vectors(self) -> np.ndarray:
+        rows = self._rows_on_disk()
+        if self._memmap is None or self._memmap.shape[0] != rows:
+            if rows == 0:
+                return np.empty((0, self.dim), dtype=np.float32)
+            self._memmap = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(rows, self.dim))
+        return self._memmap
+
+    def _lookup_rows(self, keys: List[bytes]) -> Dict[bytes, int]:
+        rows = {}
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            for key, row in self._index.execute(
+                f"SELECT key, row FROM entries WHERE key IN ({placeholders})", batch
+            ):
+                rows[bytes(key)] = row
+        return rows
+
+    def lookup(self, texts: List[str], out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, List[int]]:
+        """
+        Fetch cached embeddings for texts
+
+        Args:
+            texts: Texts to look up
+            out: (len(texts), dim) array to fill (e.g. a memmap); allocated if omitted
+
+        Returns:
+            (array of shape (len(texts), dim) with cached rows filled in,
+             indices of texts that are not cached)
+        """
+        keys = [self.text_key(text) for text in texts]
+        if out is None:
+            out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        with self._lock:
+            rows = self._lookup_rows(list(set(keys)))
+            vectors = self._vectors()
+            missing = []
+            for i, key in enumerate(keys):
+                row = rows.get(key)
+                if row is None or row >= vectors.shape[0]:
+                    missing.append(i)
+                else:
+                    out[i] = vectors[row]
+            self._hits += len(texts) - len(missing)
+            self._misses += len(missing)
+        return out, missing
+
+    def add(self, texts: List[str], embeddings: np.ndarray):
+        """Append embeddings for texts not already cached"""
+        with self._lock, self._append_lock():
+            # Read under the lock: another process may have added some of these meanwhile
+            keys = [self.text_key(text) for text in texts]
+            known = self._lookup_rows(list(set(keys)))
+            new_keys, new_rows = [], []
+            for key, embedding in zip(keys, embeddings):
+                if key in known:
+                    continue
+                known[key] = -1
+                new_keys.append(key)
+                new_rows.append(embedding)
+            if not new_keys:
+                return
+
+            # Vectors first, index second: a crash in between only leaves unreferenced rows
+            first_row = self._rows_on_disk()
+            with open(self.vectors_path, 'r+b') as f:
+                # Drop a torn row left by a writer that crashed mid-append
+                f.truncate(first_row * self._row_bytes)
+                f.seek(0, os.SEEK_END)
+                f.write(np.asarray(new_rows, dtype=np.float32).tobytes())
+            self._index.executemany(
+                "INSERT OR REPLACE INTO entries (key, row) VALUES (?, ?)",
+                [(key, first_row + i) for i, key in enumerate(new_keys)]
+            )
+            self._index.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'path': self.path,
+                'rows': self._rows_on_disk(),
+                'hits': self._hits,
+                'misses': self._misses,
+            }
@@ -8,8 +8,20 @@ import os
 from tqdm import tqdm
 import torch
 
+from api.embedding_cache import EmbeddingCache, model_fingerprint
+from api.embedding_store import EmbeddingBundle, bundle_path, has_bundle, write_bundle
+from api.projection import Projection
+from api.quantization import QuantizedMatrix
+from api.length_batching import LengthBucketedEncoder
+from api.parallel_embedding import ParallelEncoder
+from api.utils.shared_cache import cache_key
+
+# Batch size of the plain and multiprocess encode paths when the caller gives none
+DEFAULT_BATCH_SIZE = 32
+
 class EmbeddingGenerator:
-    def __init__(self, model_name: str = "all-mpnet-base-v2", device: str = None):
+    def __init__(self, model_name: str = "all-mpnet-base-v2", device: str = None,
+                 length_bucketing: bool = True):
         """
         Initialize embedding generator
         
@@ -20,6 +32,8 @@ class EmbeddingGenerator:
                        - "all-MiniLM-L6-v2" (good speed/quality balance, 384 dims)
                        - "all-MiniLM-L12-v2" (better quality, 384 dims)
             device: Device to run on ('cuda', 'cpu', or None for auto-detect)
+            length_bucketing: Encode corpora in token-length buckets with autotuned
+                              batch sizes instead of fixed batches in input order
         """
         if device is None:
             device = 'cuda' if torch.cuda.is_available() else 'cpu'
@@ -32,6 +46,91 @@ class EmbeddingGenerator:
         # Model dimensions
         self.embedding_dim = self.model.get_sentence_embedding_dimension()
         print(f"Model loaded. Embedding dimension: {self.embedding_dim}")
+        
+        # Optional shared cache for query embeddings (see enable_query_cache)
+        self.query_cache = None
+        self.query_cache_ttl_s = 0
+        
+        # Optional persistent cache for document embeddings (see enable_embedding_cache)
+        self.embedding_cache = None
+        
+        # Corpus encoding groups texts of similar length so batches pad less
+        self.bucketed_encoder = LengthBucketedEncoder(self.model) if length_bucketing else None
+        
+        # Optional multi-process encoder for large corpora (see enable_multiprocess)
+        self.parallel_encoder = None
+        self.parallel_min_texts = 0
+        
+        # Optional dimensionality reduction applied to query vectors (see set_projection)
+        self.projection = None
+    
+    def enable_multiprocess(self, workers: int, threads_per_worker: int = 0,
+                            min_texts: int = 512) -> Optional[ParallelEncoder]:
+        """
+        Encode large batches with one model replica per CPU worker process
+        
+        Args:
+            workers: Number of worker processes
+            threads_per_worker: Torch threads per worker (0 = cores / workers)
+            min_texts: Smaller inputs are encoded in-process (pool overhead dominates)
+        """
+        if workers <= 1 or self.device != 'cpu':
+            print(f"Multi-process encoding not used (workers={workers}, device={self.device})")
+            return None
+        self.parallel_encoder = ParallelEncoder(
+            self.model_name, self.embedding_dim, workers,
+            threads_per_worker=threads_per_worker, device=self.device
+        )
+        self.parallel_min_texts = min_texts
+        return self.parallel_encoder
+    
+    def close(self):
+        """Stop worker processes, if any"""
+        if self.parallel_encoder is not None:
+            self.parallel_encoder.close()
+            self.parallel_encoder = None
+    
+    def enable_embedding_cache(self, cache_dir: str = ".cache/embeddings") -> EmbeddingCache:
+        """
+        Reuse document embeddings across indexing runs
+        
+        Args:
+            cache_dir: Root directory; one sub-directory per model fingerprint
+        """
+        fingerprint = model_fingerprint(self.model, self.model_name)
+        self.embedding_cache = EmbeddingCache(cache_dir, self.model_name, fingerprint, self.embedding_dim)
+        print(f"Embedding cache: {self.embedding_cache.path}")
+        return self.embedding_cache
+    
+    def enable_query_cache(self, cache, ttl_s: float):
+        """
+        Cache single-query embeddings in a shared cache tier
+        
+        Args:
+            cache: TieredCache instance shared with the API
+            ttl_s: Time-to-live for cached vectors
+        """
+        self.query_cache = cache
+        self.query_cache_ttl_s = ttl_s
+    
+    def set_projection(self, projection: Optional[Projection]):
+        """
+        Map query embeddings into the reduced space an index was built in
+        
+        Args:
+            projection: Projection fitted on this model's embeddings (None disables it)
+        """
+        if projection is not None and projection.dim_in != self.embedding_dim:
+            raise ValueError(f"Projection expects {projection.dim_in}-d input, "
+                             f"{self.model_name} produces {self.embedding_dim}-d embeddings")
+        self.projection = projection
+        if projection is not None:
+            print(f"Query projection: {projection.method} {projection.dim_in} -> {projection.dim} dims")
+    
+    @property
+    def vector_dim(self) -> int:
+        """Dimension of the query vectors this generator returns"""
+        return self.projection.dim if self.projection is not None else self.embedding_dim
     
     def prepare_texts_from_chunks(self, chunks: List[Dict]) -> List[str]:
         """
@@ -62,35 +161,139 @@ class EmbeddingGenerator:
         
         return texts
     
-    def generate_embeddings_batch(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+    def generate_embeddings_batch(self, texts: List[str], batch_size: Optional[int] = None,
+                                  verbose: bool = True, out_path: Optional[str] = None) -> np.ndarray:
         """
         Generate embeddings for a list of texts in batches
         
         Args:
             texts: List of texts to embed
-            batch_size: Batch size for processing
+            batch_size: Batch size for processing; with length bucketing an upper
+                        bound on the per-bucket sizes the autotuner picks
+                        (None = autotuned, DEFAULT_BATCH_SIZE elsewhere)
+            verbose: Print progress (disable when called per batch by a streaming pipeline)
+            out_path: .npy file to write the embeddings into; a read-only memmap
+                      of it is returned (encoder workers write their rows there
+                      directly instead of into a temp file)
             
         Returns:
             Numpy array of embeddings
         """
-        print(f"Generating embeddings for {len(texts)} texts...")
+        if verbose:
+            print(f"Generating embeddings for {len(texts)} texts...")
+        
+        if self.embedding_cache is not None:
+            return self._generate_embeddings_cached(texts, batch_size, verbose, out_path)
+        
+        embeddings = self._encode(texts, batch_size, verbose, out_path)
         
+        if verbose:
+            print(f"Generated embeddings shape: {embeddings.shape}")
+        return embeddings
+    
+    def _encode(self, texts: List[str], batch_size: Optional[int], verbose: bool = True,
+                out_path: Optional[str] = None) -> np.ndarray:
+        fixed_size = batch_size or DEFAULT_BATCH_SIZE
+        if self.parallel_encoder is not None and len(texts) >= self.parallel_min_texts:
+            return self.parallel_encoder.encode(texts, batch_size=fixed_size, out_path=out_path,
+                                                verbose=verbose)
+        if self.bucketed_encoder is not None and len(texts) > fixed_size:
+            # Batch sizes are chosen per length bucket by the autotuner, capped at the caller's
+            embeddings = self.bucketed_encoder.encode(texts, verbose=verbose, batch_size=batch_size)
+        else:
+            embeddings = self.model.encode(
+                texts,
+                batch_size=fixed_size,
+                show_progress_bar=verbose,
+                convert_to_numpy=True,
+                normalize_embeddings=True  # Normalize for cosine similarity
+            )
+        if out_path is None:
+            return embeddings
+        np.save(out_path, np.asarray(embeddings, dtype=np.float32))
+        return np.load(out_path, mmap_mode='r')
+    
+    def _generate_embeddings_cached(self, texts: List[str], batch_size: Optional[int],
+                                    verbose: bool = True, out_path: Optional[str] = None) -> np.ndarray:
+        """Encode only texts missing from the embedding cache, each distinct text once"""
+        out = None
+        if out_path is not None:
+            out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32,
+                                            shape=(len(texts), self.embedding_dim))
+        embeddings, missing = self.embedding_cache.lookup(texts, out=out)
+        
+        # Identical texts (e.g. boilerplate repeated across sources) are encoded once
+        unique_missing = list(dict.fromkeys(texts[i] for i in missing))
+        if verbose:
+            print(f"Embedding cache: {len(texts) - len(missing)} hits, "
+                  f"{len(unique_missing)} distinct texts to encode")
+        
+        if unique_missing:
+            encoded = self._encode(unique_missing, batch_size, verbose)
+            self.embedding_cache.add(unique_missing, encoded)
+            row_of = {text: row for row, text in enumerate(unique_missing)}
+            for i in missing:
+                embeddings[i] = encoded[row_of[texts[i]]]
+        
+        if verbose:
+            print(f"Generated embeddings shape: {embeddings.shape}")
+        if out is not None:
+            out.flush()
+            del out, embeddings
+            return np.load(out_path, mmap_mode='r')
+        return embeddings
+    
+    def generate_single_embedding(self, text: str, projection: Optional[Projection] = None) -> np.ndarray:
+        """
+        Generate embedding for a single text
+        
+        Args:
+            text: Query text
+            projection: Map into this reduced space (default: the one set with set_projection)
+        """
+        projection = projection or self.projection
+        if self.query_cache is not None:
+            parts = (self.model_name, self.embedding_dim)
+            if projection is not None:
+                parts += (projection.fingerprint,)
+            key = cache_key("embedding", *parts, text)
+            cached = self.query_cache.get_vector(key)
+            if cached is not None:
+                return cached
+        
+        embedding = self.model.encode([text], convert_to_numpy=True, normalize_embeddings=True)[0]
+        if projection is not None:
+            embedding = projection.apply(embedding)
+        
+        if self.query_cache is not None:
+            self.query_cache.set_vector(key, embedding, self.query_cache_ttl_s)
+        return embedding
+
+    def generate_query_embeddings(self, texts: List[str], batch_size: int = 32,
+                                  projection: Optional[Projection] = None) -> np.ndarray:
+        """
+        Generate embeddings for many queries with a single encode call
+
+        Args:
+            texts: Query texts to embed
+            batch_size: Batch size used inside the encoder
+            projection: Map into this reduced space (default: the one set with set_projection)
+
+        Returns:
+            Numpy array of shape (len(texts), vector_dim)
+        """
         embeddings = self.model.encode(
             texts,
             batch_size=batch_size,
-            show_progress_bar=True,
+            show_progress_bar=False,
             convert_to_numpy=True,
-            normalize_embeddings=True  # Normalize for cosine similarity
+            normalize_embeddings=True
         )
-        
-        print(f"Generated embeddings shape: {embeddings.shape}")
+        projection = projection or self.projection
+        if projection is not None:
+            embeddings = projection.apply(embeddings)
         return embeddings
-    
-    def generate_single_embedding(self, text: str) -> np.ndarray:
-        """Generate embedding for a single text"""
-        embedding = self.model.encode([text], convert_to_numpy=True, normalize_embeddings=True)
-        return embedding[0]
-    
+
     def process_chunks_to_embeddings(self, chunks: List[Dict], batch_size: int = 32) -> Tuple[List[Dict], np.ndarray]:
         """
         Process chunks and generate embeddings
@@ -120,32 +323,39 @@ class EmbeddingGenerator:
         return enhanced_chunks, embeddings
     
     def save_embeddings_and_chunks(self, chunks: List[Dict], embeddings: np.ndarray, 
-                                 output_dir: str = "embeddings_output"):
+                                 output_dir: str = "embeddings_output", dtype: str = "float32",
+                                 projection: Optional[Projection] = None):
         """
-        Save chunks and embeddings to files
+        Save chunks and embeddings as a memory-mappable bundle (see api.embedding_store)
         
         Args:
             chunks: Enhanced chunks with metadata
             embeddings: Embedding vectors
             output_dir: Directory to save files
+            dtype: Embedding storage precision: 'float32', 'float16' (half the
+                   size) or 'int8' (a quarter, per-dimension scales)
+            projection: Store embeddings reduced by this projection (saved with
+                        the bundle and applied to queries from then on)
         """
         os.makedirs(output_dir, exist_ok=True)
         
-        # Save chunks as JSON
-        chunks_file = os.path.join(output_dir, "chunks_with_metadata.json")
-        with open(chunks_file, 'w', encoding='utf-8') as f:
-            json.dump(chunks, f, indent=2, ensure_ascii=False)
-        print(f"Saved chunks to: {chunks_file}")
+        if projection is not None:
+            embeddings = projection.apply(embeddings)
+            self.set_projection(projection)
         
-        # Save embeddings as numpy file
-        embeddings_file = os.path.join(output_dir, "embeddings.npy")
-        np.save(embeddings_file, embeddings)
-        print(f"Saved embeddings to: {embeddings_file}")
+        bundle_dir = bundle_path(output_dir)
+        manifest = write_bundle(bundle_dir, chunks, embeddings, self.model_name, dtype=dtype,
+                                projection=projection)
+        size = sum(info['bytes'] for info in manifest['files'].values())
+        print(f"Saved {manifest['count']} chunks and {dtype} embeddings to: {bundle_dir} ({size / 1e6:.1f} MB)")
+        if 'recall' in manifest:
+            print(f"Search recall vs float32: {manifest['recall']}")
         
         # Save embedding metadata
         metadata = {
             'model_name': self.model_name,
             'embedding_dim': self.embedding_dim,
+            'stored_dim': int(embeddings.shape[1]),
             'num_chunks': len(chunks),
             'embedding_shape': embeddings.shape
         }
@@ -155,25 +365,44 @@ class EmbeddingGenerator:
             json.dump(metadata, f, indent=2)
         print(f"Saved metadata to: {metadata_file}")
     
-    def load_embeddings_and_chunks(self, input_dir: str = "embeddings_output") -> Tuple[List[Dict], np.ndarray]:
+    def load_embeddings_and_chunks(self, input_dir: str = "embeddings_output",
+                                   dequantize: bool = False) -> Tuple[List[Dict], np.ndarray]:
         """
         Load previously saved chunks and embeddings
         
         Args:
-            input_dir: Directory containing saved files
+            input_dir: Directory containing saved files (a bundle, or the legacy
+                       chunks_with_metadata.json + embeddings.npy pair)
+            dequantize: Return float32 embeddings even for a float16/int8 bundle
+                        (a full float32 copy). By default such a bundle comes
+                        back as its QuantizedMatrix, which find_similar_texts
+                        searches block by block; float32 bundles are always
+                        the memmap
             
         Returns:
-            Tuple of (chunks, embeddings)
+            Tuple of (chunks, embeddings); embeddings of a bundle are memory-mapped.
+            A bundle's projection, if any, is applied to queries from then on.
         """
-        chunks_file = os.path.join(input_dir, "chunks_with_metadata.json")
-        embeddings_file = os.path.join(input_dir, "embeddings.npy")
-        
-        # Load chunks
-        with open(chunks_file, 'r', encoding='utf-8') as f:
-            chunks = json.load(f)
-        
-        # Load embeddings
-        embeddings = np.load(embeddings_file)
+        if has_bundle(input_dir):
+            bundle = EmbeddingBundle(bundle_path(input_dir))
+            if bundle.model_name and bundle.model_name != self.model_name:
+                print(f"Warning: bundle was embedded with {bundle.model_name}, not {self.model_name}")
+            if bundle.projection is not None:
+                self.set_projection(bundle.projection)
+            chunks = bundle.chunks()
+            embeddings = bundle.embeddings if dequantize or bundle.dtype == 'float32' else bundle.matrix
+        else:
+            print(f"No bundle in {input_dir}; reading legacy JSON "
+                  f"(convert with: python -m api.embedding_store convert {input_dir})")
+            chunks_file = os.path.join(input_dir, "chunks_with_metadata.json")
+            embeddings_file = os.path.join(input_dir, "embeddings.npy")
+            
+            # Load chunks
+            with open(chunks_file, 'r', encoding='utf-8') as f:
+                chunks = json.load(f)
+            
+            # Load embeddings
+            embeddings = np.load(embeddings_file)
         
         print(f"Loaded {len(chunks)} chunks and embeddings with shape {embeddings.shape}")
         return chunks, embeddings
@@ -186,7 +415,7 @@ class EmbeddingGenerator:
         Args:
             query: Search query
             chunks: List of chunk dictionaries
-            embeddings: Embedding vectors
+            embeddings: Embedding vectors, or a (float16/int8) QuantizedMatrix
             top_k: Number of top results to return
             
         Returns:
@@ -195,16 +424,15 @@ class EmbeddingGenerator:
         # Generate query embedding
         query_embedding = self.generate_single_embedding(query)
         
-        # Calculate cosine similarities
-        similarities = np.dot(embeddings, query_embedding)
-        
-        # Get top k indices
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        # Cosine similarities, dequantizing block by block for reduced-precision storage
+        if not isinstance(embeddings, QuantizedMatrix):
+            embeddings = QuantizedMatrix(np.asarray(embeddings), 'float32')
+        top_indices, similarities = embeddings.top_k(query_embedding, top_k)
         
         # Return results with scores
         results = []
-        for idx in top_indices:
-            results.append((chunks[idx], float(similarities[idx])))
+        for idx, score in zip(top_indices, similarities):
+            results.append((chunks[idx], float(score)))
         
         return results
 
@@ -212,6 +440,7 @@ class EmbeddingGenerator:
 def main():
     # Initialize embedding generator
     embedder = EmbeddingGenerator(model_name="all-mpnet-base-v2")  # or "all-MiniLM-L6-v2" for speed
+    embedder.enable_embedding_cache()  # re-runs only encode new or edited chunks
     
     # Load processed chunks
     print("Loading processed chunks...")
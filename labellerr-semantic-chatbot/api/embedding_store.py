@@ -0,0 +1,401 @@
+# api/embedding_store.py
+"""
+Compact, memory-mappable bundle of chunks and their embeddings.
+
+Layout of a bundle directory:
+    manifest.json         model, dim, count, dtype, columns, sha256 of every file
+    embeddings.f32        embedding matrix (count x dim), read through np.memmap;
+                          .f16 / .i8 when stored at reduced precision
+    quant.f32             int8 only: per-dimension scale and offset (2 x dim)
+    projection.f32        optional PCA map the stored vectors went through
+                          (metadata under 'projection', see api.projection)
+    columns/cN.bin        UTF-8 values of chunk field N, back to back
+    columns/cN.offsets    uint64 start offsets (count + 1) into cN.bin
+    columns/cN.tags       uint8 per row (only when needed): 0 missing,
+                          1 str (raw UTF-8), 2 other value (JSON)
+
+Opening a bundle maps the files and parses only the manifest; chunks are
+decoded on access, so a node can stream a large index into Qdrant without
+first materializing it as JSON objects.
+
+    python -m api.embedding_store convert embeddings_output [--dtype int8]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from api.projection import Projection
+from api.quantization import FILE_SUFFIX, QuantizedMatrix, recall_report, sample_queries
+
+FORMAT = "labellerr-embedding-bundle"
+FORMAT_VERSION = 1
+BUNDLE_DIR = "bundle"
+
+# Derivable from the other fields (EmbeddingGenerator.prepare_texts_from_chunks)
+DEFAULT_DROP = ('text_for_embedding',)
+
+_MISSING, _STR, _JSON = 0, 1, 2
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class _ColumnWriter:
+    def __init__(self, path: str, rows_before: int):
+        self.blob = open(path + ".bin", 'wb')
+        self.path = path
+        self.size = 0
+        # Rows written before the column first appeared are missing
+        self.offsets = [0] * (rows_before + 1)
+        self.tags = bytearray(rows_before)
+
+    def add(self, value: Any):
+        if isinstance(value, str):
+            data, tag = value.encode("utf-8"), _STR
+        else:
+            data, tag = json.dumps(value, ensure_ascii=False).encode("utf-8"), _JSON
+        self.blob.write(data)
+        self.size += len(data)
+        self.offsets.append(self.size)
+        self.tags.append(tag)
+
+    def add_missing(self):
+        self.offsets.append(self.size)
+        self.tags.append(_MISSING)
+
+    def close(self) -> List[str]:
+        self.blob.close()
+        files = [self.path + ".bin", self.path + ".offsets"]
+        np.asarray(self.offsets, dtype=np.uint64).tofile(self.path + ".offsets")
+        if any(tag != _STR for tag in self.tags):
+            np.frombuffer(bytes(self.tags), dtype=np.uint8).tofile(self.path + ".tags")
+            files.append(self.path + ".tags")
+        return files
+
+
+class BundleWriter:
+    """
+    Write a bundle incrementally: add() batches of chunks and embeddings,
+    then close(). Files go to '<path>.tmp' and replace <path> only once the
+    manifest is complete, so readers never see a half-written bundle.
+
+    With dtype 'float16' or 'int8' the float32 vectors are encoded on close()
+    and the manifest records recall@k against float32 on sampled rows. Pass
+    the projection the (already projected) vectors went through so queries
+    can be mapped the same way.
+    """
+
+    def __init__(self, path: str, model_name: str, dim: int, drop: Sequence[str] = DEFAULT_DROP,
+                 extra: Optional[Dict] = None, dtype: str = 'float32', projection: Optional[Projection] = None):
+        if dtype not in FILE_SUFFIX:
+            raise ValueError(f"Unsupported embedding dtype '{dtype}' (use one of {list(FILE_SUFFIX)})")
+        self.path = path
+        self.tmp_path = path.rstrip(os.sep) + ".tmp"
+        self.model_name = model_name
+        self.dim = dim
+        self.dtype = dtype
+        if projection is not None and projection.dim != dim:
+            raise ValueError(f"Projection outputs {projection.dim} dims, bundle stores {dim}")
+        self.projection = projection
+        self.drop = set(drop)
+        self.extra = extra or {}
+        self.count = 0
+        self._columns: Dict[str, _ColumnWriter] = {}
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(os.path.join(self.tmp_path, "columns"))
+        self._vectors = open(os.path.join(self.tmp_path, "embeddings.f32"), 'wb')
+
+    def add(self, chunks: Sequence[Dict], embeddings: np.ndarray):
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if embeddings.shape != (len(chunks), self.dim):
+            raise ValueError(f"Expected embeddings of shape ({len(chunks)}, {self.dim}), got {embeddings.shape}")
+        self._vectors.write(embeddings.tobytes())
+
+        for chunk in chunks:
+            for name, value in chunk.items():
+                if name in self.drop or name in self._columns:
+                    continue
+                self._columns[name] = _ColumnWriter(
+                    os.path.join(self.tmp_path, "columns", f"c{len(self._columns)}"), self.count
+                )
+            for name, column in self._columns.items():
+                if name in chunk:
+                    column.add(chunk[name])
+                else:
+                    column.add_missing()
+            self.count += 1
+
+    def close(self) -> Dict:
+        """Finish the bundle and return its manifest"""
+        self._vectors.close()
+        files, recall = self._encode_vectors()
+        if self.projection is not None and self.projection.components is not None:
+            files.append(os.path.join(self.tmp_path, "projection.f32"))
+            self.projection.components.tofile(files[-1])
+        columns = []
+        for name, column in self._columns.items():
+            files.extend(column.close())
+            columns.append({'name': name, 'file': os.path.basename(column.path),
+                            'has_tags': os.path.exists(column.path + ".tags")})
+
+        manifest = {
+            'format': FORMAT,
+            'version': FORMAT_VERSION,
+            'model_name': self.model_name,
+            'dim': self.dim,
+            'count': self.count,
+            'dtype': self.dtype,
+            'columns': columns,
+            'files': {
+                os.path.relpath(path, self.tmp_path): {'bytes': os.path.getsize(path), 'sha256': _sha256(path)}
+                for path in files
+            },
+            'created_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            **self.extra,
+        }
+        if recall:
+            manifest['recall'] = recall
+        if self.projection is not None:
+            manifest['projection'] = self.projection.metadata()
+        with open(os.path.join(self.tmp_path, "manifest.json"), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        old_path = self.path.rstrip(os.sep) + ".old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.rename(self.path, old_path)
+        os.rename(self.tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return manifest
+
+    def _encode_vectors(self) -> Tuple[List[str], Optional[Dict]]:
+        """Re-encode embeddings.f32 in the target dtype; returns the vector files and the recall report"""
+        vectors_path = os.path.join(self.tmp_path, "embeddings.f32")
+        if self.dtype == 'float32':
+            return [vectors_path], None
+
+        if self.count:
+            embeddings = np.memmap(vectors_path, dtype=np.float32, mode='r', shape=(self.count, self.dim))
+        else:
+            embeddings = np.empty((0, self.dim), dtype=np.float32)
+        matrix = QuantizedMatrix.from_float(embeddings, self.dtype)
+        files = [os.path.join(self.tmp_path, f"embeddings.{FILE_SUFFIX[self.dtype]}")]
+        matrix.data.tofile(files[0])
+        if self.dtype == 'int8':
+            files.append(os.path.join(self.tmp_path, "quant.f32"))
+            np.stack([matrix.scale, matrix.offset]).astype(np.float32).tofile(files[1])
+
+        recall = None
+        if self.count > 1:
+            queries, rows = sample_queries(embeddings, 200)
+            report = recall_report(embeddings, queries, ks=(1, 10), dtypes=(self.dtype,), exclude=rows)
+            recall = {'queries': report['queries'], **{key: value for key, value in report[self.dtype].items()
+                                                       if key.startswith('recall@')}}
+        del embeddings
+        os.remove(vectors_path)
+        return files, recall
+
+
+def write_bundle(path: str, chunks: Sequence[Dict], embeddings: np.ndarray, model_name: str,
+                 drop: Sequence[str] = DEFAULT_DROP, extra: Optional[Dict] = None,
+                 batch_size: int = 4096, dtype: str = 'float32',
+                 projection: Optional[Projection] = None) -> Dict:
+    """Write chunks and their embeddings as a bundle at path; returns the manifest"""
+    writer = BundleWriter(path, model_name, embeddings.shape[1], drop=drop, extra=extra, dtype=dtype,
+                          projection=projection)
+    for start in range(0, len(chunks), batch_size):
+        writer.add(chunks[start:start + batch_size], embeddings[start:start + batch_size])
+    return writer.close()
+
+
+class EmbeddingBundle:
+    """Read-only view of a bundle; embeddings are a memmap and chunks are decoded on access"""
+
+    def __init__(self, path: str, verify: bool = False):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), 'r') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format') != FORMAT or self.manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} {FORMAT}")
+        for name, info in self.manifest['files'].items():
+            size = os.path.getsize(os.path.join(path, name))
+            if size != info['bytes']:
+                raise ValueError(f"{name} in {path} is {size} bytes, manifest says {info['bytes']}")
+        if verify:
+            self.verify()
+
+        self.model_name = self.manifest['model_name']
+        self.dim = self.manifest['dim']
+        self.count = self.manifest['count']
+        self.dtype = self.manifest.get('dtype', 'float32')
+        self.matrix = self._load_matrix()
+        self._dequantized: Optional[np.ndarray] = None
+        projection = self.manifest.get('projection')
+        self.projection = Projection.from_metadata(projection, path) if projection else None
+
+        self._columns = []
+        for column in self.manifest['columns']:
+            base = os.path.join(path, "columns", column['file'])
+            blob = np.memmap(base + ".bin", dtype=np.uint8, mode='r') if os.path.getsize(base + ".bin") else b""
+            offsets = np.fromfile(base + ".offsets", dtype=np.uint64)
+            tags = np.fromfile(base + ".tags", dtype=np.uint8) if column['has_tags'] else None
+            self._columns.append((column['name'], blob, offsets, tags))
+
+    def _load_matrix(self) -> QuantizedMatrix:
+        storage = np.dtype(self.dtype)
+        vectors_path = os.path.join(self.path, f"embeddings.{FILE_SUFFIX[self.dtype]}")
+        if self.count:
+            data = np.memmap(vectors_path, dtype=storage, mode='r', shape=(self.count, self.dim))
+        else:
+            data = np.empty((0, self.dim), dtype=storage)
+        if self.dtype != 'int8':
+            return QuantizedMatrix(data, self.dtype)
+        scale, offset = np.fromfile(os.path.join(self.path, "quant.f32"), dtype=np.float32).reshape(2, self.dim)
+        return QuantizedMatrix(data, 'int8', scale, offset)
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """
+        float32 embeddings: the memmap itself, or a dequantized copy of a
+        reduced-precision bundle (made on first access and kept; it takes 2x/4x
+        the RAM of the stored float16/int8 matrix, so prefer matrix to search)
+        """
+        if self.dtype == 'float32':
+            return self.matrix.data
+        if self._dequantized is None:
+            self._dequantized = self.matrix.dequantize()
+        return self._dequantized
+
+    def __len__(self) -> int:
+        return self.count
+
+    def verify(self):
+        """Recompute every file checksum; raises ValueError on a mismatch"""
+        for name, info in self.manifest['files'].items():
+            if _sha256(os.path.join(self.path, name)) != info['sha256']:
+                raise ValueError(f"Checksum mismatch for {name} in {self.path}")
+
+    def chunk(self, i: int) -> Dict:
+        return self._decode(i, i + 1)[0]
+
+    def _decode(self, start: int, stop: int) -> List[Dict]:
+        """Chunks start..stop, decoded column by column (one blob read per column)"""
+        rows = [{} for _ in range(stop - start)]
+        for name, blob, offsets, tags in self._columns:
+            bounds = offsets[start:stop + 1].tolist()
+            base = bounds[0]
+            raw = bytes(blob[base:bounds[-1]])
+            row_tags = [_STR] * len(rows) if tags is None else tags[start:stop].tolist()
+            for row, tag, lo, hi in zip(rows, row_tags, bounds, bounds[1:]):
+                if tag == _STR:
+                    row[name] = raw[lo - base:hi - base].decode("utf-8")
+                elif tag == _JSON:
+                    row[name] = json.loads(raw[lo - base:hi - base])
+        return rows
+
+    def iter_chunks(self, start: int = 0, stop: Optional[int] = None,
+                    batch_size: int = 4096) -> Iterator[Dict]:
+        stop = self.count if stop is None else min(stop, self.count)
+        for batch_start in range(start, stop, batch_size):
+            yield from self._decode(batch_start, min(batch_start + batch_size, stop))
+
+    def chunks(self) -> List[Dict]:
+        return list(self.iter_chunks())
+
+    def iter_batches(self, batch_size: int = 1024) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+        """(chunks, embeddings) batches in order, e.g. for streaming into a vector store"""
+        for start in range(0, self.count, batch_size):
+            stop = min(start + batch_size, self.count)
+            yield self._decode(start, stop), self.matrix.dequantize(start, stop)
+
+
+def bundle_path(directory: str) -> str:
+    return os.path.join(directory, BUNDLE_DIR)
+
+
+def has_bundle(directory: str) -> bool:
+    return os.path.exists(os.path.join(bundle_path(directory), "manifest.json"))
+
+
+def load_chunks(path: str) -> List[Dict]:
+    """Chunks from a bundle, a directory holding a bundle or legacy files, or a chunks JSON file"""
+    if os.path.isdir(path):
+        if os.path.exists(os.path.join(path, "manifest.json")):
+            return EmbeddingBundle(path).chunks()
+        if has_bundle(path):
+            return EmbeddingBundle(bundle_path(path)).chunks()
+        path = os.path.join(path, "chunks_with_metadata.json")
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def convert_legacy(input_dir: str, output_path: Optional[str] = None, batch_size: int = 4096,
+                   drop: Sequence[str] = DEFAULT_DROP, dtype: str = 'float32') -> Dict:
+    """
+    Convert chunks_with_metadata.json + embeddings.npy (+ embedding_metadata.json)
+    into a bundle, streaming the JSON so the whole list is never held in memory
+
+    Args:
+        input_dir: Directory with the legacy files
+        output_path: Bundle directory (defaults to <input_dir>/bundle)
+        dtype: Embedding storage dtype ('float32', 'float16' or 'int8')
+
+    Returns:
+        The manifest of the new bundle
+    """
+    from scripts.processing.json_stream import iter_json_array
+
+    embeddings = np.load(os.path.join(input_dir, "embeddings.npy"), mmap_mode='r')
+    model_name = ""
+    metadata_file = os.path.join(input_dir, "embedding_metadata.json")
+    if os.path.exists(metadata_file):
+        with open(metadata_file, 'r') as f:
+            metadata = json.load(f)
+        model_name = metadata.get('model_name') or metadata.get('embedding_model') or ""
+
+    writer = BundleWriter(output_path or bundle_path(input_dir), model_name, embeddings.shape[1], drop=drop, dtype=dtype)
+    batch = []
+    for chunk in iter_json_array(os.path.join(input_dir, "chunks_with_metadata.json")):
+        if not model_name and chunk.get('embedding_model'):
+            writer.model_name = model_name = chunk['embedding_model']
+        batch.append(chunk)
+        if len(batch) == batch_size:
+            writer.add(batch, embeddings[writer.count:writer.count + len(batch)])
+            batch = []
+    if batch:
+        writer.add(batch, embeddings[writer.count:writer.count + len(batch)])
+    if writer.count != embeddings.shape[0]:
+        raise ValueError(f"{writer.count} chunks but {embeddings.shape[0]} embeddings in {input_dir}")
+    return writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert chunks_with_metadata.json + embeddings.npy to a bundle")
+    parser.add_argument("command", choices=["convert"])
+    parser.add_argument("embeddings_dir")
+    parser.add_argument("bundle_dir", nargs="?")
+    parser.add_argument("--dtype", choices=list(FILE_SUFFIX), default="float32")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    manifest = convert_legacy(args.embeddings_dir, args.bundle_dir, dtype=args.dtype)
+    size = sum(info['bytes'] for info in manifest['files'].values())
+    print(f"Wrote {manifest['count']} chunks x {manifest['dim']} dims as {manifest['dtype']} "
+          f"({size / 1e6:.1f} MB) in {time.perf_counter() - start_time:.1f}s")
+    if 'recall' in manifest:
+        print(f"Recall vs float32: {manifest['recall']}")
+
+
+if __name__ == "__main__":
+    main()
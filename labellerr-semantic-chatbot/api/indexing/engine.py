@@ -0,0 +1,190 @@
+# api/indexing/engine.py
+import os
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from api.embedding_service import EmbeddingGenerator
+from api.projection import Projection
+from api.qdrant_service import QdrantManager, get_alias_target, load_collection_projection
+from config.settings import settings
+
+
+class IndexProfile:
+    """
+    Everything that distinguishes one index from another: target collection,
+    embedding model, where records come from and how they become chunks.
+
+    Pipeline: source() -> each stage (record -> record, or None to drop)
+    -> chunker (record -> chunks). Without a chunker the source must already
+    yield chunks in the QdrantManager chunk schema.
+    """
+
+    def __init__(self, name: str, collection_name: str, model_name: str,
+                 source: Callable[[], Iterable[Dict]],
+                 stages: Optional[List[Callable[[Dict], Optional[Dict]]]] = None,
+                 chunker: Optional[Callable[[Dict], List[Dict]]] = None,
+                 embed_text: Optional[Callable[[Dict], str]] = None,
+                 probe_queries: Optional[List[str]] = None,
+                 keep_versions: int = 2, batch_size: int = 32,
+                 projection_dim: int = 0, projection_method: str = 'pca'):
+        """
+        Args:
+            name: Profile name used on the command line
+            collection_name: Alias the API reads from
+            model_name: SentenceTransformer model for this index
+            source: Returns an iterable of records (or chunks if chunker is None)
+            stages: Record filters/enrichers applied in order
+            chunker: Splits one record into chunks
+            embed_text: Text to embed for a chunk (default: title/section/content
+                        as built by EmbeddingGenerator.prepare_texts_from_chunks)
+            probe_queries: Queries that must return hits before a rebuild goes live
+            keep_versions: Collection versions kept for rollback
+            batch_size: Encoder batch size
+            projection_dim: Reduce stored vectors to this many dims (0 = full size)
+            projection_method: 'pca' (fitted on each full build) or 'truncate'
+                               (Matryoshka models), see api.projection
+        """
+        self.name = name
+        self.collection_name = collection_name
+        self.model_name = model_name
+        self.source = source
+        self.stages = stages or []
+        self.chunker = chunker
+        self.embed_text = embed_text
+        self.probe_queries = probe_queries or []
+        self.keep_versions = keep_versions
+        self.batch_size = batch_size
+        self.projection_dim = projection_dim
+        self.projection_method = projection_method
+
+
+class Indexer:
+    """Batched indexing engine shared by every index profile"""
+
+    def __init__(self, profile: IndexProfile, qdrant_manager: QdrantManager,
+                 embedder: Optional[EmbeddingGenerator] = None,
+                 embedding_cache_dir: Optional[str] = ".cache/embeddings",
+                 upload_parallel: int = settings.QDRANT_UPLOAD_PARALLEL,
+                 upload_batch_size: int = settings.QDRANT_UPLOAD_BATCH_SIZE,
+                 upload_retries: int = settings.QDRANT_UPLOAD_RETRIES,
+                 embedding_workers: int = 0, threads_per_worker: int = 0):
+        """
+        Args:
+            profile: What to index and where
+            qdrant_manager: Connection; its collection_name is set to the profile's
+            embedder: Pre-built embedder for profile.model_name (loaded if omitted)
+            embedding_cache_dir: Persistent embedding cache (None disables it)
+            upload_parallel: Concurrent upload workers for full builds
+            upload_batch_size: Points per upload request
+            upload_retries: Attempts per upload batch
+            embedding_workers: Encoder processes for a freshly loaded embedder (0/1 = in-process)
+            threads_per_worker: Torch threads per encoder process (0 = cores / workers)
+        """
+        self.profile = profile
+        self.qdrant_manager = qdrant_manager
+        self.qdrant_manager.collection_name = profile.collection_name
+        if embedder is None:
+            embedder = EmbeddingGenerator(model_name=profile.model_name)
+            if embedding_cache_dir:
+                embedder.enable_embedding_cache(embedding_cache_dir)
+            if embedding_workers > 1:
+                embedder.enable_multiprocess(embedding_workers, threads_per_worker)
+        self.embedder = embedder
+        self.upload_parallel = upload_parallel
+        self.upload_batch_size = upload_batch_size
+        self.upload_retries = upload_retries
+        self.projection: Optional[Projection] = None
+
+    def iter_chunks(self) -> Iterator[Dict]:
+        """Run source -> stages -> chunker lazily"""
+        for record in self.profile.source():
+            for stage in self.profile.stages:
+                record = stage(record)
+                if record is None:
+                    break
+            else:
+                chunks = self.profile.chunker(record) if self.profile.chunker else [record]
+                for chunk in chunks:
+                    chunk['embedding_model'] = self.profile.model_name
+                    yield chunk
+
+    def texts_for(self, chunks: List[Dict]) -> List[str]:
+        if self.profile.embed_text is None:
+            return self.embedder.prepare_texts_from_chunks(chunks)
+        return [self.profile.embed_text(chunk) for chunk in chunks]
+
+    def embed(self, chunks: List[Dict], out_path: Optional[str] = None) -> np.ndarray:
+        embeddings = self.embedder.generate_embeddings_batch(self.texts_for(chunks), self.profile.batch_size,
+                                                             out_path=out_path)
+        if self.projection is not None:
+            embeddings = self.projection.apply(embeddings)
+        return embeddings
+
+    def _use_projection(self, projection: Optional[Projection]):
+        """Project stored vectors (embed) and probe/test queries (embedder) alike"""
+        self.projection = projection
+        self.embedder.set_projection(projection)
+
+    def _live_projection(self) -> Optional[Projection]:
+        client = self.qdrant_manager.client
+        live = get_alias_target(client, self.profile.collection_name) or self.profile.collection_name
+        return load_collection_projection(client, live)
+
+    def build(self) -> Dict:
+        """Full blue/green rebuild: embed everything in batches, bulk load, validate, switch"""
+        chunks = list(self.iter_chunks())
+        print(f"[{self.profile.name}] {len(chunks)} chunks")
+        if not chunks:
+            return {'ok': False, 'errors': ['no chunks produced'], 'activated': None}
+
+        # Encoder output goes to a memmap on disk rather than a second in-memory copy
+        with tempfile.TemporaryDirectory(prefix=f"index-{self.profile.name}-") as scratch:
+            start_time = time.perf_counter()
+            self._use_projection(None)
+            embeddings = self.embed(chunks, out_path=os.path.join(scratch, "embeddings.npy"))
+            embed_s = time.perf_counter() - start_time
+
+            projection = None
+            if self.profile.projection_dim:
+                projection = Projection.fit(self.profile.projection_method, embeddings,
+                                            self.profile.projection_dim, self.profile.model_name)
+                embeddings = projection.apply(embeddings)
+                self._use_projection(projection)
+                print(f"[{self.profile.name}] projected to {projection.dim} dims ({projection.method}, "
+                      f"explained variance {projection.explained_variance})")
+
+            probe_embeddings = None
+            if self.profile.probe_queries:
+                probe_embeddings = self.embedder.generate_query_embeddings(self.profile.probe_queries)
+            report = self.qdrant_manager.rebuild_blue_green(
+                chunks, embeddings, probe_embeddings=probe_embeddings,
+                keep_versions=self.profile.keep_versions,
+                upload_parallel=self.upload_parallel, upload_batch_size=self.upload_batch_size,
+                upload_retries=self.upload_retries, projection=projection
+            )
+            report['embed_s'] = round(embed_s, 2)
+            return report
+
+    def sync(self) -> Dict:
+        """Incremental update of the live collection (falls back to build() if there is none)"""
+        client = self.qdrant_manager.client
+        if (get_alias_target(client, self.profile.collection_name) is None
+                and not client.collection_exists(self.profile.collection_name)):
+            print(f"[{self.profile.name}] no live collection yet, running a full build")
+            return self.build()
+
+        projection = self._live_projection()
+        if (projection.dim if projection else 0) != self.profile.projection_dim:
+            print(f"[{self.profile.name}] live collection is projected to {projection.dim if projection else 'full'} "
+                  f"dims, profile wants {self.profile.projection_dim or 'full'}; running a full build")
+            return self.build()
+        self._use_projection(projection)
+
+        chunks = list(self.iter_chunks())
+        print(f"[{self.profile.name}] {len(chunks)} chunks")
+        return self.qdrant_manager.sync_chunks(
+            chunks, self.embed, embedding_model=self.profile.model_name
+        )
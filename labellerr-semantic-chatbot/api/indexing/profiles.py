@@ -0,0 +1,50 @@
+# api/indexing/profiles.py
+from functools import partial
+from typing import Dict
+
+from api.indexing.engine import IndexProfile
+from api.indexing.sources import chunk_record, iter_raw_records
+from api.indexing.updates import updates_stage
+from config.settings import settings
+
+
+def _knowledge_base_source():
+    # Imported lazily: the document processors live with the ingestion scripts
+    from scripts.embedding.process_and_embed import DocumentProcessor, DEFAULT_FILE_CONFIG
+    processor = DocumentProcessor(settings.EMBEDDING_MODEL, max_tokens=settings.MAX_CHUNK_TOKENS,
+                                  overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+                                  boilerplate_min_pages=settings.BOILERPLATE_MIN_PAGES,
+                                  boilerplate_min_share=settings.BOILERPLATE_MIN_SHARE)
+    return processor.process_all_files(DEFAULT_FILE_CONFIG, workers=settings.INGEST_WORKERS)
+
+
+PROFILES: Dict[str, IndexProfile] = {
+    # What the API searches (same model as query embeddings)
+    'knowledge_base': IndexProfile(
+        name='knowledge_base',
+        collection_name='labellerr_knowledge_base',
+        model_name=settings.EMBEDDING_MODEL,
+        source=_knowledge_base_source,
+        probe_queries=["How to create a new project in Labellerr?", "How do I export annotations?"],
+        projection_dim=settings.EMBEDDING_PROJECTION_DIM,
+        projection_method=settings.EMBEDDING_PROJECTION_METHOD,
+    ),
+    # Product updates / release notes from the raw crawl
+    'updates': IndexProfile(
+        name='updates',
+        collection_name='updates_minilm',
+        model_name='all-MiniLM-L6-v2',
+        source=partial(iter_raw_records, "data_ingest/raw"),
+        stages=[updates_stage],
+        chunker=partial(chunk_record, model_name='all-MiniLM-L6-v2', source_type='updates'),
+        embed_text=lambda chunk: chunk['text'],
+        probe_queries=["product update may 2025", "new release changelog"],
+    ),
+}
+
+
+def get_profile(name: str) -> IndexProfile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown index profile '{name}' (available: {', '.join(PROFILES)})")
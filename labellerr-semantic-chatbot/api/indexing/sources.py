@@ -0,0 +1,87 @@
+# api/indexing/sources.py
+"""Record sources and the record chunker used by raw-JSON index profiles"""
+import glob
+import hashlib
+import os
+from functools import lru_cache
+from typing import Dict, Iterator, List
+
+from scripts.processing.chunker import TokenChunker
+from scripts.processing.json_stream import iter_json_records
+
+SKIP_FILE_PATTERNS = ["_links", "summary", "_raw", "failed", "discovered"]
+TEXT_FIELDS = ["content", "full_text", "transcript", "text", "body"]
+
+def iter_raw_records(raw_dir: str = "data_ingest/raw") -> Iterator[Dict]:
+    """
+    Yield every dict record from the JSON/JSONL files under raw_dir, annotated
+    with _source_file and _index (its position in the file). Files are read
+    as streams, so memory does not grow with file size.
+    """
+    root = os.path.abspath(raw_dir)
+    filepaths = [path for pattern in ("**/*.json", "**/*.jsonl")
+                 for path in glob.glob(os.path.join(root, pattern), recursive=True)]
+    for filepath in filepaths:
+        # Skip system files
+        if any(skip in os.path.basename(filepath).lower() for skip in SKIP_FILE_PATTERNS):
+            continue
+        
+        try:
+            for i, record in enumerate(iter_json_records(filepath)):
+                if isinstance(record, dict):
+                    record['_source_file'] = os.path.basename(filepath)
+                    record['_index'] = i
+                    yield record
+        except Exception as e:
+            print(f"Error reading {filepath}: {e}")
+            continue
+
+def fallback_record_id(record: Dict, text: str) -> str:
+    """
+    Stable parent id for a record without one, from its url, title and a hash
+    of its text, so it keeps its id when records before it are added or removed
+    """
+    content_hash = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    return hashlib.md5(
+        f"{record.get('url', '')}|{record.get('title') or record.get('heading') or ''}|{content_hash}".encode()
+    ).hexdigest()
+
+@lru_cache(maxsize=None)
+def get_chunker(model_name: str, max_tokens: int = 0, overlap_tokens: int = 48) -> TokenChunker:
+    """One TokenChunker (and tokenizer load) per model and size"""
+    return TokenChunker.for_model(model_name, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+def chunk_record(record: Dict, model_name: str, max_tokens: int = 0, overlap_tokens: int = 48,
+                 source_type: str = "raw", min_chars: int = 200) -> List[Dict]:
+    """
+    Turn one raw record into chunks in the QdrantManager chunk schema, sized
+    in model_name's tokens.
+    Chunk ids are '<parent id>:<chunk index>', so they are stable across runs;
+    the parent id is the record's own id or fallback_record_id().
+    """
+    text = ""
+    for field in TEXT_FIELDS:
+        if record.get(field) and len(str(record[field]).strip()) > 100:
+            text = str(record[field])
+            break
+    if not text or len(text) < min_chars:
+        return []
+    
+    source_file = record.get('_source_file', '')
+    title = record.get("title") or record.get("heading") or source_file
+    parent_id = record.get("id") or fallback_record_id(record, text)
+    metadata = {**record.get('_metadata', {}), 'parent_id': parent_id, 'source_file': source_file}
+    
+    return [
+        {
+            'id': f"{parent_id}:{chunk_index}",
+            'text': piece.text,
+            'title': title,
+            'url': record.get("url", ""),
+            'heading': "",
+            'source_type': source_type,
+            'chunk_index': chunk_index,
+            'metadata': metadata,
+        }
+        for chunk_index, piece in enumerate(get_chunker(model_name, max_tokens, overlap_tokens).chunk(text))
+    ]
@@ -0,0 +1,70 @@
+# api/indexing/updates.py
+"""Record stage for the product-updates index: keep update-related records and tag them"""
+import re
+from typing import Dict, Optional
+
+UPDATE_KEYWORDS = ["product", "update", "release", "changelog", "whats-new", "announcement"]
+UPDATE_TERMS = UPDATE_KEYWORDS + ["2025"]
+
+MONTHS = {
+    'january': '01', 'february': '02', 'march': '03', 'april': '04',
+    'may': '05', 'june': '06', 'july': '07', 'august': '08',
+    'september': '09', 'october': '10', 'november': '11', 'december': '12'
+}
+
+def parse_date(date_str):
+    """Extract month from date string like '2025-05-15' or 'May 2025'"""
+    if not date_str:
+        return None
+    try:
+        # Try ISO format first
+        if re.match(r'\d{4}-\d{2}-\d{2}', str(date_str)):
+            return str(date_str)[:7]  # 2025-05
+        # Try month year format
+        for month, num in MONTHS.items():
+            if month in str(date_str).lower():
+                year_match = re.search(r'20\d{2}', str(date_str))
+                if year_match:
+                    return f"{year_match.group()}-{num}"
+    except Exception:
+        pass
+    return None
+
+def extract_tags(record):
+    """Extract tags that indicate product updates"""
+    tags = []
+    title = (record.get("title") or "").lower()
+    url = (record.get("url") or "").lower()
+    categories = record.get("categories", [])
+    
+    # Check for update-related keywords
+    for keyword in UPDATE_KEYWORDS:
+        if keyword in title or keyword in url:
+            tags.append(keyword)
+    
+    # Add categories if they exist
+    if isinstance(categories, list):
+        tags.extend([cat.lower() for cat in categories if isinstance(cat, str)])
+    
+    return sorted(set(tags))  # Remove duplicates; sorted so content hashes are stable
+
+def should_include(record):
+    """Filter for update-related content"""
+    title = (record.get("title") or "").lower()
+    url = (record.get("url") or "").lower()
+    
+    # Must contain update-related keywords
+    return any(term in title or term in url for term in UPDATE_TERMS)
+
+def updates_stage(record: Dict) -> Optional[Dict]:
+    """Drop non-update records; attach publication month and tags as chunk metadata"""
+    if not should_include(record):
+        return None
+    published_date = record.get("published_date") or record.get("date") or record.get("created_at")
+    record['_metadata'] = {
+        **record.get('_metadata', {}),
+        'published_date': published_date or "",
+        'month': parse_date(published_date) or "",
+        'tags': extract_tags(record),
+    }
+    return record
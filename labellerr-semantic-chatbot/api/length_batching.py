@@ -0,0 +1,272 @@
+# api/length_batching.py
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+BATCH_SIZE_CANDIDATES = (16, 32, 64, 128, 256)
+
+
+def token_lengths(model, texts: Sequence[str], chunk: int = 1024) -> np.ndarray:
+    """
+    Token count per text as the model will see it (special tokens included,
+    truncated at max_seq_length). Falls back to a word-count estimate when the
+    model exposes no tokenizer.
+    """
+    max_length = getattr(model, "max_seq_length", None) or 512
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None:
+        return np.array([min(int(len(text.split()) * 1.3) + 2, max_length) for text in texts], dtype=np.int64)
+
+    lengths = []
+    for i in range(0, len(texts), chunk):
+        encoded = tokenizer(list(texts[i:i + chunk]), add_special_tokens=True, truncation=True,
+                            max_length=max_length, return_attention_mask=False,
+                            return_token_type_ids=False)
+        lengths.extend(len(ids) for ids in encoded["input_ids"])
+    return np.array(lengths, dtype=np.int64)
+
+
+def length_bucket(length: int, minimum: int = 16) -> int:
+    """Padded-length class of a text: the next power of two >= its token length"""
+    bucket = minimum
+    while bucket < length:
+        bucket *= 2
+    return bucket
+
+
+def padding_efficiency(lengths: np.ndarray, batch_size: int) -> float:
+    """Share of computed positions that are real tokens for fixed-size batches in the given order"""
+    padded = sum(len(lengths[i:i + batch_size]) * int(lengths[i:i + batch_size].max())
+                 for i in range(0, len(lengths), batch_size))
+    return float(lengths.sum()) / padded if padded else 1.0
+
+
+class CudaMemoryProbe:
+    """Free memory and peak activation memory of a batch on a CUDA device (torch.cuda)"""
+
+    def __init__(self, device):
+        import torch
+        self.torch = torch
+        self.device = torch.device(device)
+
+    @classmethod
+    def for_model(cls, model) -> Optional["CudaMemoryProbe"]:
+        """Probe for the model's device, or None when it does not run on CUDA"""
+        device = getattr(model, "device", None)
+        if device is None or getattr(device, "type", str(device).split(":")[0]) != "cuda":
+            return None
+        try:
+            return cls(device)
+        except ImportError:
+            return None
+
+    def headroom(self) -> int:
+        """Bytes a batch can still allocate: free on the device plus cached by torch"""
+        cuda = self.torch.cuda
+        free, _ = cuda.mem_get_info(self.device)
+        return free + cuda.memory_reserved(self.device) - cuda.memory_allocated(self.device)
+
+    def start(self) -> int:
+        """Reset the peak counter before a batch; returns the memory already allocated"""
+        self.torch.cuda.reset_peak_memory_stats(self.device)
+        return self.torch.cuda.memory_allocated(self.device)
+
+    def peak_since(self, baseline: int) -> int:
+        return self.torch.cuda.max_memory_allocated(self.device) - baseline
+
+
+class BatchAutotuner:
+    """
+    Pick a batch size per length bucket from measured throughput.
+
+    Each bucket tries candidate sizes in increasing order (skipping any whose
+    padded tokens exceed the token budget) and settles on the fastest once a
+    larger size stops paying off. Out-of-memory errors cap the bucket below
+    the failing size.
+
+    max_tokens_per_batch is a fixed budget unless set_token_budget() is fed
+    measurements (LengthBucketedEncoder does on CUDA). On CPU the fixed
+    16384 padded tokens are kept: activations of a batch that size take tens
+    of MB, and throughput stops improving long before RAM runs out.
+    """
+
+    def __init__(self, candidates: Sequence[int] = BATCH_SIZE_CANDIDATES,
+                 max_tokens_per_batch: int = 16384, min_gain: float = 0.05):
+        self.candidates = sorted(candidates)
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.min_gain = min_gain
+        self._chosen: Dict[int, int] = {}
+        self._measured: Dict[int, Dict[int, float]] = {}
+        self._ceiling: Dict[int, int] = {}
+
+    def set_token_budget(self, max_tokens: int):
+        """Change the padded-token budget; buckets settled above it are tuned again"""
+        self.max_tokens_per_batch = max(1, int(max_tokens))
+        for bucket, size in list(self._chosen.items()):
+            if size * bucket > self.max_tokens_per_batch:
+                del self._chosen[bucket]
+                measured = self._measured.get(bucket, {})
+                for measured_size in [s for s in measured if s * bucket > self.max_tokens_per_batch]:
+                    del measured[measured_size]
+
+    def _allowed(self, bucket: int) -> List[int]:
+        ceiling = self._ceiling.get(bucket, self.candidates[-1])
+        allowed = [size for size in self.candidates
+                   if size * bucket <= self.max_tokens_per_batch and size <= ceiling]
+        return allowed or [max(1, min(ceiling, self.max_tokens_per_batch // bucket))]
+
+    def batch_size(self, bucket: int) -> int:
+        if bucket in self._chosen:
+            return self._chosen[bucket]
+        measured = self._measured.get(bucket, {})
+        for size in self._allowed(bucket):
+            if size not in measured:
+                return size
+        return self._settle(bucket)
+
+    def record(self, bucket: int, batch_size: int, tokens: int, seconds: float):
+        """Report one full batch; partial batches say nothing about the size"""
+        if bucket in self._chosen or seconds <= 0:
+            return
+        measured = self._measured.setdefault(bucket, {})
+        measured[batch_size] = tokens / seconds
+        previous = [size for size in measured if size < batch_size]
+        if previous:
+            best_before = max(measured[size] for size in previous)
+            if measured[batch_size] < best_before * (1 + self.min_gain):
+                self._settle(bucket)
+
+    def on_oom(self, bucket: int, batch_size: int):
+        self._ceiling[bucket] = max(1, batch_size // 2)
+        self._chosen.pop(bucket, None)
+        measured = self._measured.get(bucket, {})
+        for size in [size for size in measured if size >= batch_size]:
+            del measured[size]
+
+    def _settle(self, bucket: int) -> int:
+        measured = self._measured.get(bucket, {})
+        allowed = self._allowed(bucket)
+        candidates = {size: rate for size, rate in measured.items() if size in allowed}
+        self._chosen[bucket] = max(candidates, key=candidates.get) if candidates else allowed[0]
+        return self._chosen[bucket]
+
+    def chosen(self) -> Dict[int, int]:
+        return dict(sorted(self._chosen.items()))
+
+
+class LengthBucketedEncoder:
+    """
+    Encode texts grouped by token length so each batch pads only to the
+    length of similar texts, with per-bucket batch sizes from BatchAutotuner.
+    Results are returned in the original input order.
+
+    On CUDA the token budget follows measured memory: after each batch the
+    peak bytes per padded token and the device headroom set it to
+    memory_fraction of the headroom.
+    """
+
+    def __init__(self, model, autotuner: Optional[BatchAutotuner] = None,
+                 memory_probe: Optional[CudaMemoryProbe] = None, memory_fraction: float = 0.8):
+        self.model = model
+        self.autotuner = autotuner or BatchAutotuner()
+        self.memory_probe = memory_probe if memory_probe is not None else CudaMemoryProbe.for_model(model)
+        self.memory_fraction = memory_fraction
+        self.bytes_per_token = 0.0
+        self.last_stats: Dict = {}
+
+    def encode(self, texts: List[str], verbose: bool = True, batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Encode texts
+
+        Args:
+            texts: Texts to embed
+            verbose: Print throughput and chosen batch sizes
+            batch_size: Upper bound on texts per batch (None = whatever the autotuner picks)
+
+        Returns:
+            (len(texts), dim) float32 embeddings in input order
+        """
+        start_time = time.perf_counter()
+        lengths = token_lengths(self.model, texts)
+        order = np.argsort(lengths, kind="stable")
+        out = np.empty((len(texts), self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        real_tokens = padded_tokens = batches = 0
+        i = 0
+        while i < len(order):
+            bucket = length_bucket(int(lengths[order[i]]))
+            tuned = self.autotuner.batch_size(bucket)
+            size = min(tuned, batch_size) if batch_size else tuned
+            j = i
+            while j < len(order) and j - i < size and length_bucket(int(lengths[order[j]])) == bucket:
+                j += 1
+            indices = order[i:j]
+
+            padded = len(indices) * int(lengths[indices].max())
+            try:
+                if self.memory_probe is not None:
+                    headroom = self.memory_probe.headroom()
+                    baseline = self.memory_probe.start()
+                embeddings, seconds = self._encode_batch([texts[k] for k in indices])
+                if self.memory_probe is not None:
+                    self._update_token_budget(headroom, self.memory_probe.peak_since(baseline), padded)
+            except RuntimeError as e:
+                if "out of memory" not in str(e).lower() or size == 1:
+                    raise
+                self._release_memory()
+                self.autotuner.on_oom(bucket, size)
+                continue
+
+            out[indices] = embeddings
+            tokens = int(lengths[indices].sum())
+            if len(indices) == size == tuned:
+                self.autotuner.record(bucket, size, tokens, seconds)
+            real_tokens += tokens
+            padded_tokens += padded
+            batches += 1
+            i = j
+
+        elapsed = time.perf_counter() - start_time
+        self.last_stats = {
+            'texts': len(texts),
+            'tokens': real_tokens,
+            'batches': batches,
+            'seconds': round(elapsed, 2),
+            'tokens_per_s': round(real_tokens / elapsed, 1) if elapsed > 0 else 0.0,
+            'padding_efficiency': round(real_tokens / padded_tokens, 3) if padded_tokens else 1.0,
+            'batch_sizes': self.autotuner.chosen(),
+            'max_tokens_per_batch': self.autotuner.max_tokens_per_batch,
+        }
+        if verbose:
+            print(f"Encoded {len(texts)} texts: {self.last_stats['tokens_per_s']} tokens/s, "
+                  f"padding efficiency {self.last_stats['padding_efficiency']:.0%}, "
+                  f"batch sizes by length {self.last_stats['batch_sizes']}")
+        return out
+
+    def _update_token_budget(self, headroom: int, peak_bytes: int, padded_tokens: int):
+        """Budget = share of the headroom / the largest bytes per padded token seen so far"""
+        if peak_bytes <= 0 or padded_tokens <= 0:
+            return
+        self.bytes_per_token = max(self.bytes_per_token, peak_bytes / padded_tokens)
+        self.autotuner.set_token_budget(headroom * self.memory_fraction / self.bytes_per_token)
+
+    def _encode_batch(self, batch: List[str]) -> Tuple[np.ndarray, float]:
+        start_time = time.perf_counter()
+        embeddings = self.model.encode(
+            batch,
+            batch_size=len(batch),
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+        return embeddings, time.perf_counter() - start_time
+
+    @staticmethod
+    def _release_memory():
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
@@ -2,7 +2,7 @@
 import google.generativeai as genai
 from typing import List, Dict, Tuple, Optional
 import json
-from .qdrant_service import QdrantManager
+from .qdrant_service import QdrantManager, is_collection_not_found
 from .embedding_service import EmbeddingGenerator
 
 class LabellerrRAGChatbot:
@@ -33,18 +33,61 @@ class LabellerrRAGChatbot:
         """
         Retrieve relevant context for a query
         """
-        # Generate query embedding
-        query_embedding = self.embedder.generate_single_embedding(query)
-        
-        # Search similar chunks
-        search_results = self.qdrant.search_similar(
-            query_embedding=query_embedding,
-            limit=top_k,
-            source_filter=source_filter,
-            min_score=0.3
-        )
-        
-        # Format results
+        def search(collection, projection):
+            # Generate query embedding
+            query_embedding = self.embedder.generate_single_embedding(query, projection=projection)
+            
+            # Search similar chunks
+            return self.qdrant.search_similar(
+                query_embedding=query_embedding,
+                limit=top_k,
+                source_filter=source_filter,
+                min_score=0.3,
+                collection_name=collection
+            )
+        
+        return self._format_results(self._search_live_index(search))
+
+    def retrieve_context_batch(self, queries: List[str], top_k: int = 5,
+                               source_filter: Optional[str] = None) -> List[List[Dict]]:
+        """
+        Retrieve context for many queries with one encode call and one Qdrant round trip
+        """
+        if not queries:
+            return []
+
+        def search(collection, projection):
+            # Generate all query embeddings at once
+            query_embeddings = self.embedder.generate_query_embeddings(queries, projection=projection)
+
+            # Search similar chunks for every query in a single batch request
+            return self.qdrant.search_similar_batch(
+                query_embeddings=query_embeddings,
+                limit=top_k,
+                source_filter=source_filter,
+                min_score=0.3,
+                collection_name=collection
+            )
+
+        return [self._format_results(search_results) for search_results in self._search_live_index(search)]
+
+    def _search_live_index(self, search):
+        """
+        Run search(collection, projection) against the cached live index; if that
+        collection is gone (alias switched and old version pruned since the last
+        poll), resolve the alias again and retry once
+        """
+        collection, projection = self.qdrant.resolve_live_index(self.embedder.embedding_dim)
+        try:
+            return search(collection, projection)
+        except Exception as e:
+            if not is_collection_not_found(e):
+                raise
+        collection, projection = self.qdrant.resolve_live_index(self.embedder.embedding_dim, refresh=True)
+        return search(collection, projection)
+
+    def _format_results(self, search_results) -> List[Dict]:
+        """Convert Qdrant hits into context chunk dictionaries"""
         context_chunks = []
         for result in search_results:
             chunk = {
@@ -113,6 +156,7 @@ class LabellerrRAGChatbot:
 
     Answer:"""
 
+        fallback = False
         try:
             # Import safety settings
             from google.generativeai.types import HarmCategory, HarmBlockThreshold
@@ -158,13 +202,16 @@ class LabellerrRAGChatbot:
                     answer = candidate.content.parts[0].text
                 else:
                     # Response blocked - let's provide a fallback
+                    fallback = True
                     answer = f"Based on the documentation, Labellerr is an AI data labeling platform that offers: {context_text[:300]}..."
             else:
+                fallback = True
                 answer = "No candidates returned from Gemini."
 
             # At the end of the try block, before the except:
             if not answer or "error" in answer.lower():
                 # Fallback: Create response from context
+                fallback = True
                 answer = f"Based on the Labellerr documentation:\n\n"
                 answer += f"Labellerr is an AI data labeling platform that provides:\n"
                 for ctx in context[:2]:  # Use first 2 contexts
@@ -174,6 +221,7 @@ class LabellerrRAGChatbot:
         except Exception as e:
             print(f"DEBUG: Exception occurred: {e}")
             # Fallback response using context directly
+            fallback = True
             answer = f"Based on the Labellerr documentation provided: {context_text[:500]}..."
         
         # Prepare sources
@@ -193,7 +241,8 @@ class LabellerrRAGChatbot:
             'response': answer,
             'sources': sources,
             'query': query,
-            'context_used': len(context)
+            'context_used': len(context),
+            'fallback': fallback
         }
 
     def chat(self, query: str, source_filter: Optional[str] = None, 
@@ -211,13 +260,17 @@ class LabellerrRAGChatbot:
         result = self.generate_response(query, context)
         
         # Store in conversation history
+        self.record_turn(query, result)
+        
+        return result
+
+    def record_turn(self, query: str, result: Dict):
+        """Store a completed query/response pair in conversation history"""
         self.conversation_history.append({
             'query': query,
             'response': result['response'],
             'sources_count': len(result['sources'])
         })
-        
-        return result
     
     def get_conversation_history(self) -> List[Dict]:
         """Get conversation history"""
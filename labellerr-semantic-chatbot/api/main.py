@@ -5,21 +5,33 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+import asyncio
+import hashlib
 import time
 import uuid
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import google.generativeai as genai
 
 from config.settings import settings
-from api.models.schemas import ChatRequest, ChatResponse, SearchResultItem
+from api.models.schemas import (
+    ChatRequest, ChatResponse, SearchResultItem,
+    BatchSearchRequest, BatchSearchItem, BatchChatRequest, BatchChatItem
+)
 from api.embedding_service import EmbeddingGenerator
-from api.qdrant_service import QdrantManager
+from api.qdrant_service import QdrantManager, IndexMismatchError
 from api.llm_service import LabellerrRAGChatbot
 from api.query_parser import parse_temporal_query, extract_keywords
+from api.utils.shared_cache import TieredCache, cache_key, create_cache_backend
+from api.utils.admission import AdmissionController, AdmissionRejected
+from api.utils.compression import CompressionMiddleware
+from api.utils.responses import FastJSONResponse
+from api.utils.pools import BulkheadPool, PRIORITY_INTERACTIVE, PRIORITY_CHAT, PRIORITY_BATCH
+from api.utils.singleflight import SingleFlight, normalize_query
 
 # Configure logging
 logging.basicConfig(
@@ -29,7 +41,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
-app = FastAPI(title=settings.APP_NAME, version=settings.VERSION)
+app = FastAPI(title=settings.APP_NAME, version=settings.VERSION, default_response_class=FastJSONResponse)
 app.mount("/app", StaticFiles(directory="frontend", html=True), name="app")
 
 # Add CORS middleware
@@ -41,16 +53,79 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated brotli/gzip compression for larger payloads
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+)
+
 # Global service variables
 embedding_service = None
 qdrant_service = None
 llm_service = None
 chatbot = None
 
+# Per-worker admission control: bounded in-flight work plus a short queue
+search_admission = AdmissionController(
+    "search",
+    max_in_flight=settings.SEARCH_MAX_IN_FLIGHT,
+    max_queue=settings.SEARCH_MAX_QUEUE,
+    max_wait_s=settings.SEARCH_MAX_QUEUE_WAIT_S,
+    initial_latency_s=0.1
+)
+rag_admission = AdmissionController(
+    "rag",
+    max_in_flight=settings.RAG_MAX_IN_FLIGHT,
+    max_queue=settings.RAG_MAX_QUEUE,
+    max_wait_s=settings.RAG_MAX_QUEUE_WAIT_S,
+    initial_latency_s=3.0
+)
+
+# Bulkheads: the CPU-bound encoder + vector search never waits behind Gemini calls
+retrieval_pool = BulkheadPool(
+    "retrieval",
+    workers=settings.RETRIEVAL_POOL_WORKERS,
+    max_queue=settings.RETRIEVAL_POOL_QUEUE
+)
+generation_pool = BulkheadPool(
+    "generation",
+    workers=settings.GENERATION_POOL_WORKERS,
+    max_queue=settings.GENERATION_POOL_QUEUE
+)
+
+# Request coalescing for identical in-flight queries
+search_flight = SingleFlight("search")
+rag_flight = SingleFlight("rag")
+
+# Cache tiers: in-process LRU in front of the shared backend (created on startup).
+# Keys include collection name + version and model names, see cache_key().
+search_cache = TieredCache(l1_size=settings.SEARCH_CACHE_SIZE)
+answer_cache = TieredCache(l1_size=256)
+embedding_cache = TieredCache(l1_size=4096)
+version_watcher = None
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request, exc: AdmissionRejected):
+    """Shed load fast with a Retry-After hint instead of queueing indefinitely"""
+    logger.warning(f"[ADMISSION] {exc.name} rejected {request.url.path}: {exc.reason}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": f"Server busy ({exc.reason}), retry later"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(IndexMismatchError)
+async def index_mismatch_handler(request, exc: IndexMismatchError):
+    """Refuse to search with query vectors that do not match the live collection"""
+    logger.error(f"[INDEX] {request.url.path}: {exc}")
+    return JSONResponse(status_code=503, content={"detail": f"Index unavailable: {exc}"})
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
-    global embedding_service, qdrant_service, llm_service, chatbot
+    global embedding_service, qdrant_service, llm_service, chatbot, version_watcher
     
     try:
         logger.info("Initializing services...")
@@ -58,8 +133,19 @@ async def startup_event():
         # Configure Gemini
         genai.configure(api_key=settings.GEMINI_API_KEY)
         
+        # Shared cache tier (all workers on the node, or across nodes with redis)
+        shared_backend = create_cache_backend(
+            settings.CACHE_BACKEND,
+            sqlite_path=settings.CACHE_SQLITE_PATH,
+            redis_url=settings.CACHE_REDIS_URL
+        )
+        for cache in (search_cache, answer_cache, embedding_cache):
+            cache.backend = shared_backend
+        logger.info(f"Shared cache backend: {shared_backend.name}")
+        
         # Initialize services
         embedding_service = EmbeddingGenerator(model_name=settings.EMBEDDING_MODEL)
+        embedding_service.enable_query_cache(embedding_cache, settings.CACHE_EMBEDDING_TTL_S)
         qdrant_service = QdrantManager(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT)
         
         # Initialize chatbot
@@ -70,12 +156,49 @@ async def startup_event():
             model="gemini-2.5-pro" 
         )
         
+        # Track the collection version so caches invalidate automatically on reindex
+        qdrant_service.refresh_collection_version()
+        try:
+            qdrant_service.refresh_live_index()
+        except Exception as e:
+            # Nothing indexed yet: resolved on first search
+            logger.warning(f"Live index not resolved at startup: {e}")
+        version_watcher = asyncio.create_task(_watch_collection_version())
+        
         logger.info("✅ Services initialized successfully")
         
     except Exception as e:
         logger.error(f"❌ Failed to initialize services: {e}")
         raise
 
+async def _watch_collection_version():
+    """Poll the collection version and live index; drop cached results when the version changes"""
+    while True:
+        await asyncio.sleep(settings.COLLECTION_VERSION_POLL_S)
+        previous = qdrant_service.collection_version
+        try:
+            current = await asyncio.to_thread(qdrant_service.refresh_collection_version)
+        except Exception as e:
+            logger.warning(f"Collection version refresh failed: {e}")
+            continue
+        if current != previous:
+            logger.info(f"Collection version changed {previous} -> {current}, clearing local caches")
+            search_cache.clear_local()
+            answer_cache.clear_local()
+        try:
+            # Searches use this cached alias target and projection instead of looking them up
+            await asyncio.to_thread(qdrant_service.refresh_live_index)
+        except Exception as e:
+            logger.warning(f"Live index refresh failed: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and execution pool workers"""
+    if version_watcher:
+        version_watcher.cancel()
+    retrieval_pool.shutdown()
+    generation_pool.shutdown()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -86,44 +209,137 @@ async def health_check():
         "embedding_model": settings.EMBEDDING_MODEL,
         "qdrant_host": settings.QDRANT_HOST,
         "debug_mode": settings.DEBUG,
-        "services_initialized": chatbot is not None
+        "services_initialized": chatbot is not None,
+        "admission": {
+            "search": search_admission.stats(),
+            "rag": rag_admission.stats()
+        }
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Admission and execution pool metrics for this worker"""
+    return {
+        "pid": os.getpid(),
+        "admission": {
+            "search": search_admission.stats(),
+            "rag": rag_admission.stats()
+        },
+        "pools": {
+            "retrieval": retrieval_pool.stats(),
+            "generation": generation_pool.stats()
+        },
+        "coalescing": {
+            "search": search_flight.stats(),
+            "rag": rag_flight.stats()
+        },
+        "caches": {
+            "search": search_cache.stats(),
+            "answer": answer_cache.stats(),
+            "embedding": embedding_cache.stats()
+        },
+        "collection_version": qdrant_service.collection_version if qdrant_service else None
     }
 
 @app.get("/search", response_model=List[SearchResultItem])
 async def search_endpoint(
+    request: Request,
     q: str = Query(..., description="Search query"),
-    k: int = Query(8, ge=1, le=20, description="Number of results")
+    k: int = Query(8, ge=1, le=20, description="Number of results"),
+    source_filter: Optional[str] = Query(None, description="Restrict results to a source type")
 ):
     """Search-only endpoint for debugging retrieval"""
     if not chatbot:
         raise HTTPException(status_code=503, detail="Services not initialized")
     
+    # Results only change when the collection is rewritten, so the version is the validator
+    version = qdrant_service.collection_version
+    normalized = normalize_query(q)
+    etag = _search_etag(version, normalized, k, source_filter)
+    cache_headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.SEARCH_CACHE_MAX_AGE_S}"
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+    
+    key = cache_key(
+        "search", qdrant_service.collection_name, version, settings.EMBEDDING_MODEL,
+        normalized, k, source_filter
+    )
+    body = await search_cache.aget(key)
+    if body is not None:
+        return Response(content=body, media_type="application/json", headers=cache_headers)
+    
     try:
         logger.info(f"Search query: '{q}' with k={k}")
         
-        # Use chatbot's retrieve_context method
-        context = chatbot.retrieve_context(q, k)
+        # Identical concurrent searches (same normalized query) share one encode +
+        # Qdrant round trip; the leader embeds the query as its caller typed it
+        context = await search_flight.do(
+            ("search", version, normalized, k, source_filter),
+            lambda: _search_pipeline(q, k, source_filter)
+        )
         
         # Convert to SearchResultItem format
-        results = []
-        for ctx in context:
-            result = SearchResultItem(
-                title=ctx.get('title'),
-                url=ctx.get('url'),
-                content=ctx.get('text', ''),
-                distance=1.0 - ctx.get('score', 0.0),  # Convert similarity to distance
-                source_file=ctx.get('source_type'),
-                chunk_id=ctx.get('id')
-            )
-            results.append(result)
+        results = [_context_to_item(ctx) for ctx in context]
         
         logger.info(f"Search '{q}' returned {len(results)} results")
-        return results
+        response = FastJSONResponse(results, headers=cache_headers)
+        await search_cache.aset(key, response.body, settings.CACHE_SEARCH_TTL_S)
+        return response
         
+    except (AdmissionRejected, IndexMismatchError):
+        raise
     except Exception as e:
         logger.exception(f"Search failed: {e}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+def _search_etag(version: int, normalized_query: str, k: int, source_filter: Optional[str]) -> str:
+    """
+    Weak ETag for a search: same collection version + parameters => same
+    results. Weak because the bytes differ between the identity, gzip and
+    brotli encodings CompressionMiddleware negotiates.
+    """
+    digest = hashlib.sha1(f"{normalized_query}|{k}|{source_filter or ''}".encode("utf-8")).hexdigest()[:20]
+    return f'W/"v{version}-{digest}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against our ETag (weak comparison, as RFC 9110 requires)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == opaque for tag in candidates)
+
+async def _search_pipeline(q: str, k: int, source_filter: Optional[str] = None) -> List[Dict]:
+    """Admitted retrieval for /search; runs once per coalesced group"""
+    async with search_admission.admit():
+        return await retrieval_pool.run(
+            chatbot.retrieve_context, q, k, source_filter, priority=PRIORITY_INTERACTIVE
+        )
+
+def _context_to_item(ctx: Dict, max_chars: Optional[int] = None) -> SearchResultItem:
+    """Convert a retrieved context chunk into a SearchResultItem"""
+    text = ctx.get('text', '')
+    return SearchResultItem(
+        title=ctx.get('title'),
+        url=ctx.get('url'),
+        content=text if max_chars is None else text[:max_chars],
+        distance=1.0 - ctx.get('score', 0.0),  # Convert similarity to distance
+        source_file=ctx.get('source_type'),
+        chunk_id=ctx.get('id')
+    )
+
+def _context_items(sources: List[Dict], include_context: bool = True,
+                   max_chars: int = 1000) -> List[SearchResultItem]:
+    """Build context_used for a chat response, honouring the request's size options"""
+    if not include_context:
+        return []
+    return [_context_to_item(source, max_chars=max(max_chars, 0)) for source in sources]
+
 def _trim(text: str, max_chars: int = 1000) -> str:
     """Trim text to max_chars"""
     if not text or len(text) <= max_chars:
@@ -142,40 +358,190 @@ async def rag_endpoint(request: ChatRequest) -> ChatResponse:
     logger.info(f"[RAG] qid={conversation_id} | msg='{request.message[:80]}' | k={request.context_k}")
     
     try:
-        # Use the chatbot's chat method
-        result = chatbot.chat(request.message, top_k=request.context_k)
-        
-        # Convert context to SearchResultItem format with ACTUAL content
-        context_used = []
-        for source in result.get('sources', []):
-            # Get the actual text from the original context
-            actual_text = source.get('text', '')  # This should contain the actual content
-            
-            item = SearchResultItem(
-                title=source.get('title'),
-                url=source.get('url'),
-                content=actual_text[:1000],  # First 1000 chars of actual content
-                distance=1.0 - source.get('score', 0.0),
-                source_file=source.get('source_type'),
-                chunk_id=source.get('id')
+        normalized = normalize_query(request.message)
+        version = qdrant_service.collection_version
+        answer_key = cache_key(
+            "answer", qdrant_service.collection_name, version,
+            settings.EMBEDDING_MODEL, chatbot.model, normalized, request.context_k
+        )
+        result = await answer_cache.aget_json(answer_key)
+        if result is None:
+            # Identical concurrent questions (same normalized text) share one retrieval +
+            # Gemini generation of the question as asked; a reindex starts a new group
+            # instead of joining an old one. normalized only keys the flight and cache.
+            result = await rag_flight.do(
+                ("rag", version, normalized, request.context_k),
+                lambda: _rag_pipeline(request.message, request.context_k, answer_key)
             )
-            context_used.append(item)
+        chatbot.record_turn(request.message, result)
+        
+        # Convert context to SearchResultItem format with ACTUAL content (shortened or omitted on request)
+        context_used = _context_items(
+            result.get('sources', []), request.include_context, request.context_max_chars
+        )
         
         processing_time = round((time.time() - start_time) * 1000.0, 2)
         
-        logger.info(f"[RAG] qid={conversation_id} | retrieved={len(context_used)} | {processing_time}ms")
+        logger.info(f"[RAG] qid={conversation_id} | retrieved={len(result.get('sources', []))} | {processing_time}ms")
         
-        return ChatResponse(
+        return FastJSONResponse(ChatResponse(
             response=result['response'],
             context_used=context_used,
             conversation_id=conversation_id,
             processing_time_ms=processing_time
-        )
+        ))
         
+    except (AdmissionRejected, IndexMismatchError):
+        raise
     except Exception as e:
         logger.exception(f"[RAG] qid={conversation_id} failed: {e}")
         raise HTTPException(status_code=500, detail=f"RAG failed: {str(e)}")
 
+async def _rag_pipeline(message: str, context_k: int, answer_key: str) -> Dict:
+    """Admitted retrieval + generation for /rag; runs once per coalesced group"""
+    async with rag_admission.admit():
+        # Retrieval and generation run on separate pools
+        enhanced_query = chatbot.enhance_query(message)
+        context = await retrieval_pool.run(
+            chatbot.retrieve_context, enhanced_query, context_k, priority=PRIORITY_CHAT
+        )
+        result = await generation_pool.run(
+            chatbot.generate_response, message, context, priority=PRIORITY_CHAT
+        )
+    
+    # Don't pin degraded fallback answers in the shared cache
+    if not result.get('fallback'):
+        await answer_cache.aset_json(answer_key, result, settings.CACHE_ANSWER_TTL_S)
+    return result
+
+
+def _check_batch_size(size: int):
+    """Reject empty or oversized batch requests"""
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one item")
+    if size > settings.BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {size} exceeds limit of {settings.BATCH_MAX_QUERIES}"
+        )
+
+@app.post("/search/batch")
+async def search_batch_endpoint(request: BatchSearchRequest) -> StreamingResponse:
+    """
+    Batch search endpoint. Encodes all queries in one call, searches Qdrant in one
+    round trip and streams back one NDJSON line (BatchSearchItem) per query.
+    Admitted like that many /search requests.
+    """
+    if not chatbot:
+        raise HTTPException(status_code=503, detail="Services not initialized")
+    _check_batch_size(len(request.queries))
+
+    logger.info(f"[SEARCH-BATCH] {len(request.queries)} queries | k={request.k}")
+
+    try:
+        async with search_admission.admit(weight=len(request.queries)):
+            contexts = await retrieval_pool.run(
+                chatbot.retrieve_context_batch, request.queries, request.k, request.source_filter,
+                priority=PRIORITY_BATCH
+            )
+    except (AdmissionRejected, IndexMismatchError):
+        raise
+    except Exception as e:
+        logger.exception(f"Batch search failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Batch search failed: {str(e)}")
+
+    async def stream():
+        for index, (query, context) in enumerate(zip(request.queries, contexts)):
+            item = BatchSearchItem(
+                index=index,
+                query=query,
+                results=[_context_to_item(ctx) for ctx in context]
+            )
+            yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/rag/batch")
+async def rag_batch_endpoint(request: BatchChatRequest) -> StreamingResponse:
+    """
+    Batch RAG endpoint. Retrieval for every message is batched into one encode call
+    and one Qdrant round trip; generation is fanned out concurrently (capped by
+    BATCH_RAG_CONCURRENCY). Each NDJSON line (BatchChatItem) is streamed as soon as
+    its answer is ready, so results arrive in completion order, tagged with index.
+    
+    Admitted like as many /rag requests as it generates at once, and holds
+    those slots until its last answer is done.
+    """
+    if not chatbot:
+        raise HTTPException(status_code=503, detail="Services not initialized")
+    _check_batch_size(len(request.messages))
+
+    logger.info(f"[RAG-BATCH] {len(request.messages)} messages | k={request.context_k}")
+
+    units = await rag_admission.acquire(min(len(request.messages), settings.BATCH_RAG_CONCURRENCY))
+    admitted_at = time.monotonic()
+    try:
+        try:
+            enhanced = [chatbot.enhance_query(message) for message in request.messages]
+            contexts = await retrieval_pool.run(
+                chatbot.retrieve_context_batch, enhanced, request.context_k, request.source_filter,
+                priority=PRIORITY_BATCH
+            )
+        except (AdmissionRejected, IndexMismatchError):
+            raise
+        except Exception as e:
+            logger.exception(f"Batch RAG retrieval failed: {e}")
+            raise HTTPException(status_code=500, detail=f"RAG batch failed: {str(e)}")
+    except BaseException:
+        rag_admission.release(weight=units)
+        raise
+
+    semaphore = asyncio.Semaphore(settings.BATCH_RAG_CONCURRENCY)
+
+    async def answer(index: int, message: str, context: List[Dict]) -> BatchChatItem:
+        async with semaphore:
+            start_time = time.time()
+            try:
+                result = await generation_pool.run(
+                    chatbot.generate_response, message, context, priority=PRIORITY_BATCH
+                )
+            except Exception as e:
+                logger.exception(f"[RAG-BATCH] item {index} failed: {e}")
+                return BatchChatItem(index=index, message=message, error=str(e))
+
+            response = ChatResponse(
+                response=result['response'],
+                context_used=_context_items(
+                    result.get('sources', []), request.include_context, request.context_max_chars
+                ),
+                conversation_id=str(uuid.uuid4()),
+                processing_time_ms=round((time.time() - start_time) * 1000.0, 2)
+            )
+            return BatchChatItem(index=index, message=message, response=response)
+
+    # Started here, not in stream(), so the slots are freed even if the body is never read
+    tasks = [
+        asyncio.create_task(answer(index, message, context))
+        for index, (message, context) in enumerate(zip(request.messages, contexts))
+    ]
+    asyncio.gather(*tasks, return_exceptions=True).add_done_callback(
+        lambda _: rag_admission.release(
+            (time.monotonic() - admitted_at) * units / len(request.messages), weight=units
+        )
+    )
+
+    async def stream():
+        try:
+            for finished in asyncio.as_completed(tasks):
+                item = await finished
+                yield item.model_dump_json() + "\n"
+        finally:
+            # Client went away: don't keep generating answers nobody will read
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 
 @app.get("/")
 async def root():
@@ -187,6 +553,9 @@ async def root():
             "health": "/health",
             "search": "/search",
             "chat": "/rag",
+            "search_batch": "/search/batch",
+            "chat_batch": "/rag/batch",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
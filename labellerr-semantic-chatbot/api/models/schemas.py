@@ -6,6 +6,8 @@ class ChatRequest(BaseModel):
     message: str
     context_k: int = 5
     conversation_id: Optional[str] = None
+    include_context: bool = True  # False omits context_used entirely
+    context_max_chars: int = 1000  # Characters of source text per context item (0 = metadata only)
 
 class SearchResultItem(BaseModel):
     title: Optional[str] = None
@@ -20,3 +22,27 @@ class ChatResponse(BaseModel):
     context_used: List[SearchResultItem] = []
     conversation_id: Optional[str] = None
     processing_time_ms: Optional[float] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    k: int = 8
+    source_filter: Optional[str] = None
+
+class BatchSearchItem(BaseModel):
+    index: int
+    query: str
+    results: List[SearchResultItem] = []
+    error: Optional[str] = None
+
+class BatchChatRequest(BaseModel):
+    messages: List[str]
+    context_k: int = 5
+    source_filter: Optional[str] = None
+    include_context: bool = True
+    context_max_chars: int = 1000
+
+class BatchChatItem(BaseModel):
+    index: int
+    message: str
+    response: Optional[ChatResponse] = None
+    error: Optional[str] = None
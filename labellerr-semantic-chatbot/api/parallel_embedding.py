@@ -0,0 +1,142 @@
+# api/parallel_embedding.py
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+import numpy as np
+
+# Model replica of the current worker process (set by _init_worker)
+_worker_model = None
+
+
+@contextmanager
+def _worker_environment(threads: int):
+    """
+    Thread-pool limits for the spawned workers. A spawned process re-imports
+    the parent's main module (and with it torch) before the pool initializer
+    runs, and OpenMP/MKL read these variables once when torch is loaded, so
+    they must already be in the environment the workers inherit.
+    """
+    values = {var: str(threads) for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")}
+    values["TOKENIZERS_PARALLELISM"] = "false"
+    saved = {var: os.environ.get(var) for var in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def _init_worker(model_name: str, device: str, threads: int):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    global _worker_model
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name, device=device)
+
+
+def _encode_shard(task):
+    indices, texts, batch_size, out_path = task
+    embeddings = _worker_model.encode(
+        texts,
+        batch_size=batch_size,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+    # Write straight into the shared output file at the texts' original positions
+    out = np.load(out_path, mmap_mode='r+')
+    out[indices] = embeddings
+    out.flush()
+    del out
+    return len(texts)
+
+
+class ParallelEncoder:
+    """
+    Encode with one SentenceTransformer replica per worker process.
+
+    Inputs are sorted by length and cut into shards that workers pull as they
+    become free, so each shard pads little; each worker writes its rows at the
+    texts' original positions in a shared .npy memmap, so output order matches
+    input order without shipping vectors through pipes.
+    Each worker is limited to `threads_per_worker` intra-op threads, so
+    workers x threads never oversubscribes the machine.
+    """
+
+    def __init__(self, model_name: str, dim: int, workers: int, threads_per_worker: int = 0,
+                 device: str = "cpu", shard_size: int = 256):
+        self.model_name = model_name
+        self.dim = dim
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.shard_size = shard_size
+        print(f"Starting {workers} embedding workers x {self.threads_per_worker} threads ({model_name})")
+        # Workers are started here; torch.set_num_threads in each covers intra-op threads
+        with _worker_environment(self.threads_per_worker):
+            self._pool = mp.get_context("spawn").Pool(
+                workers, initializer=_init_worker,
+                initargs=(model_name, device, self.threads_per_worker)
+            )
+
+    def encode(self, texts: List[str], batch_size: int = 32, out_path: Optional[str] = None,
+               verbose: bool = True) -> np.ndarray:
+        """
+        Encode texts across all workers
+
+        Args:
+            texts: Texts to encode
+            batch_size: Encoder batch size inside each worker
+            out_path: .npy file to write into (e.g. embeddings.npy); the result is
+                      then a read-only memmap of it. Without it a temp file is used
+                      and the result is loaded into memory.
+            verbose: Print progress
+
+        Returns:
+            float32 array of shape (len(texts), dim), in input order
+        """
+        temp_path = None
+        if out_path is None:
+            fd, temp_path = tempfile.mkstemp(suffix=".npy")
+            os.close(fd)
+            out_path = temp_path
+
+        try:
+            out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32,
+                                            shape=(len(texts), self.dim))
+            del out  # header and size are on disk; workers reopen it
+
+            # Character length is a cheap proxy for token length here
+            order = np.argsort([len(text) for text in texts], kind="stable")
+            tasks = []
+            for start in range(0, len(texts), self.shard_size):
+                indices = order[start:start + self.shard_size]
+                tasks.append((indices, [texts[i] for i in indices], batch_size, out_path))
+            done = 0
+            start_time = time.perf_counter()
+            for count in self._pool.imap_unordered(_encode_shard, tasks):
+                done += count
+                if verbose:
+                    rate = done / max(time.perf_counter() - start_time, 1e-9)
+                    print(f"\rEncoded {done}/{len(texts)} texts ({rate:.0f}/s)", end="", flush=True)
+            if verbose and tasks:
+                print()
+
+            if temp_path is None:
+                return np.load(out_path, mmap_mode='r')
+            return np.load(out_path)
+        finally:
+            if temp_path is not None:
+                os.remove(temp_path)
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
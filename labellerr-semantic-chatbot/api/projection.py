@@ -0,0 +1,251 @@
+# api/projection.py
+"""
+Learned dimensionality reduction for stored vectors and queries.
+
+    pca       project onto the top principal directions of the corpus
+              (uncentered, so dot products / cosine ranking are preserved
+              rather than distances from the corpus mean)
+    truncate  keep the first dims (Matryoshka-trained models only)
+
+Projected vectors are re-normalized, so cosine search works unchanged.
+A projection is saved as projection.json + projection.f32, either in its
+own directory or inside an embedding bundle (see api.embedding_store), and
+as a payload next to the version record of the Qdrant collection it was
+built for (see api.qdrant_service.save_collection_projection).
+"""
+import base64
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from api.quantization import QuantizedMatrix
+
+PROJECTION_METHODS = ('pca', 'truncate')
+
+# Models trained with a Matryoshka loss, whose leading dims are usable on their own
+MATRYOSHKA_MODELS = {
+    'nomic-embed-text-v1.5',
+    'mxbai-embed-large-v1',
+    'text-embedding-3-small',
+    'text-embedding-3-large',
+}
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class Projection:
+    """
+    Linear map from dim_in to dim followed by re-normalization.
+
+    Args:
+        method: 'pca' or 'truncate'
+        dim_in: Dimension of the model's embeddings
+        dim: Dimension after projection
+        components: (dim, dim_in) projection matrix (pca only)
+        explained_variance: Share of the corpus' energy kept (pca only)
+        model_name: Model the projection was fitted for
+    """
+
+    def __init__(self, method: str, dim_in: int, dim: int, components: Optional[np.ndarray] = None,
+                 explained_variance: Optional[float] = None, model_name: str = ""):
+        if method not in PROJECTION_METHODS:
+            raise ValueError(f"Unknown projection method '{method}' (use one of {PROJECTION_METHODS})")
+        if not 0 < dim <= dim_in:
+            raise ValueError(f"Projection dim must be in 1..{dim_in}, got {dim}")
+        if method == 'pca' and (components is None or components.shape != (dim, dim_in)):
+            raise ValueError(f"pca projection needs a ({dim}, {dim_in}) component matrix")
+        self.method = method
+        self.dim_in = dim_in
+        self.dim = dim
+        self.components = None if components is None else np.ascontiguousarray(components, dtype=np.float32)
+        self.explained_variance = explained_variance
+        self.model_name = model_name
+
+    @classmethod
+    def fit_pca(cls, embeddings: np.ndarray, dim: int, sample: int = 100000, seed: int = 0,
+                model_name: str = "", block_rows: int = 8192) -> "Projection":
+        """
+        Fit on (a sample of) the corpus vectors
+
+        Args:
+            embeddings: (rows, dim_in) corpus embeddings (a memmap is fine)
+            dim: Target dimension
+            sample: Rows used for fitting (0 = all)
+        """
+        rows, dim_in = embeddings.shape
+        if sample and rows > sample:
+            index = np.sort(np.random.default_rng(seed).choice(rows, size=sample, replace=False))
+        else:
+            index = np.arange(rows)
+
+        # Second-moment matrix accumulated block by block in float64
+        moment = np.zeros((dim_in, dim_in), dtype=np.float64)
+        for start in range(0, len(index), block_rows):
+            block = np.asarray(embeddings[index[start:start + block_rows]], dtype=np.float64)
+            moment += block.T @ block
+        eigenvalues, eigenvectors = np.linalg.eigh(moment)
+        order = np.argsort(eigenvalues)[::-1]
+        eigenvalues, eigenvectors = eigenvalues[order], eigenvectors[:, order]
+
+        total = float(eigenvalues.sum())
+        explained = float(eigenvalues[:dim].sum()) / total if total > 0 else 0.0
+        return cls('pca', dim_in, dim, eigenvectors[:, :dim].T, round(explained, 4), model_name)
+
+    @classmethod
+    def truncate(cls, dim_in: int, dim: int, model_name: str = "") -> "Projection":
+        """Matryoshka truncation to the first dim components"""
+        if model_name and model_name.split("/")[-1] not in MATRYOSHKA_MODELS:
+            print(f"Warning: {model_name} is not known to be Matryoshka-trained; "
+                  f"truncating it to {dim} dims may lose much more than PCA")
+        return cls('truncate', dim_in, dim, model_name=model_name)
+
+    @classmethod
+    def fit(cls, method: str, embeddings: np.ndarray, dim: int, model_name: str = "") -> "Projection":
+        if method == 'truncate':
+            return cls.truncate(embeddings.shape[1], dim, model_name)
+        return cls.fit_pca(embeddings, dim, model_name=model_name)
+
+    @property
+    def fingerprint(self) -> str:
+        """Changes whenever the map does (used in query-cache keys)"""
+        h = hashlib.sha1(f"{self.method}/{self.dim_in}/{self.dim}".encode("ascii"))
+        if self.components is not None:
+            h.update(self.components.tobytes())
+        return h.hexdigest()[:16]
+
+    def apply(self, vectors: np.ndarray, block_rows: int = 8192) -> np.ndarray:
+        """Project (dim_in,) or (rows, dim_in) vectors to re-normalized float32 (…, dim)"""
+        vectors = np.asarray(vectors)
+        if vectors.ndim == 1:
+            return self.apply(vectors[None, :])[0]
+        out = np.empty((len(vectors), self.dim), dtype=np.float32)
+        for start in range(0, len(vectors), block_rows):
+            block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+            if self.method == 'truncate':
+                projected = block[:, :self.dim]
+            else:
+                projected = block @ self.components.T
+            out[start:start + len(block)] = _normalize(projected)
+        return out
+
+    def metadata(self) -> Dict:
+        return {
+            'method': self.method,
+            'dim_in': self.dim_in,
+            'dim': self.dim,
+            'explained_variance': self.explained_variance,
+            'model_name': self.model_name,
+            'fingerprint': self.fingerprint,
+        }
+
+    def save(self, directory: str):
+        """Write projection.json (+ projection.f32 for pca) into directory"""
+        os.makedirs(directory, exist_ok=True)
+        if self.components is not None:
+            tmp = os.path.join(directory, "projection.f32.tmp")
+            self.components.tofile(tmp)
+            os.replace(tmp, os.path.join(directory, "projection.f32"))
+        tmp = os.path.join(directory, "projection.json.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(self.metadata(), f, indent=2)
+        os.replace(tmp, os.path.join(directory, "projection.json"))
+
+    @classmethod
+    def from_metadata(cls, metadata: Dict, directory: str) -> "Projection":
+        components = None
+        if metadata['method'] == 'pca':
+            components = np.fromfile(os.path.join(directory, "projection.f32"), dtype=np.float32)
+            components = components.reshape(metadata['dim'], metadata['dim_in'])
+        return cls(metadata['method'], metadata['dim_in'], metadata['dim'], components,
+                   metadata.get('explained_variance'), metadata.get('model_name', ""))
+
+    def to_payload(self) -> Dict:
+        """JSON-safe form (metadata + base64 float32 components) for a Qdrant payload"""
+        payload = self.metadata()
+        if self.components is not None:
+            payload['components'] = base64.b64encode(self.components.tobytes()).decode('ascii')
+        return payload
+
+    @classmethod
+    def from_payload(cls, payload: Dict) -> "Projection":
+        components = None
+        if payload['method'] == 'pca':
+            components = np.frombuffer(base64.b64decode(payload['components']), dtype=np.float32)
+            components = components.reshape(payload['dim'], payload['dim_in'])
+        projection = cls(payload['method'], payload['dim_in'], payload['dim'], components,
+                         payload.get('explained_variance'), payload.get('model_name', ""))
+        if payload.get('fingerprint') and payload['fingerprint'] != projection.fingerprint:
+            raise ValueError("Stored projection does not match its fingerprint")
+        return projection
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["Projection"]:
+        """Projection saved in directory (standalone or in a bundle manifest), or None"""
+        manifest_file = os.path.join(directory, "manifest.json")
+        if os.path.exists(manifest_file):
+            with open(manifest_file, 'r') as f:
+                metadata = json.load(f).get('projection')
+            return cls.from_metadata(metadata, directory) if metadata else None
+        metadata_file = os.path.join(directory, "projection.json")
+        if not os.path.exists(metadata_file):
+            return None
+        with open(metadata_file, 'r') as f:
+            return cls.from_metadata(json.load(f), directory)
+
+
+def projection_report(embeddings: np.ndarray, queries: np.ndarray, dims: Sequence[int],
+                      method: str = 'pca', ks: Sequence[int] = (1, 10),
+                      exclude: Optional[np.ndarray] = None, model_name: str = "") -> Dict:
+    """
+    Recall@k and brute-force search time of projected search against full-dimension search
+
+    Args:
+        embeddings: (rows, dim_in) corpus embeddings
+        queries: (n_queries, dim_in) query embeddings
+        dims: Target dimensions to evaluate
+        method: 'pca' or 'truncate'
+        ks: Cut-offs to report
+        exclude: Optional row index per query to leave out of every ranking
+
+    Returns:
+        Dict keyed by dimension ('full' for the baseline)
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    depth = max(ks)
+    full = QuantizedMatrix(np.asarray(embeddings, dtype=np.float32))
+    start_time = time.perf_counter()
+    truth, _ = full.top_k(queries, depth, exclude=exclude)
+    report = {'full': {
+        'dim': embeddings.shape[1],
+        'bytes_per_vector': embeddings.shape[1] * 4,
+        'search_ms': round((time.perf_counter() - start_time) * 1000 / len(queries), 3),
+    }}
+
+    for dim in dims:
+        start_time = time.perf_counter()
+        projection = Projection.fit(method, embeddings, dim, model_name)
+        corpus = QuantizedMatrix(projection.apply(embeddings))
+        fit_s = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        found, _ = corpus.top_k(projection.apply(queries), depth, exclude=exclude)
+        entry = {
+            'dim': dim,
+            'bytes_per_vector': dim * 4,
+            'explained_variance': projection.explained_variance,
+            'fit_s': round(fit_s, 2),
+            'search_ms': round((time.perf_counter() - start_time) * 1000 / len(queries), 3),
+        }
+        for k in ks:
+            hits = [len(set(a[:k]) & set(b[:k])) for a, b in zip(truth.tolist(), found.tolist())]
+            entry[f'recall@{k}'] = round(sum(hits) / (min(k, truth.shape[1]) * len(hits)), 4)
+        report[dim] = entry
+    return report
@@ -1,12 +1,382 @@
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, SearchRequest
+from qdrant_client.models import CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation, PointIdsList
+from qdrant_client.models import FilterSelector, HasIdCondition, OptimizersConfigDiff, CollectionStatus
+from qdrant_client.http.exceptions import UnexpectedResponse
+import hashlib
+import re
+import time
 import uuid
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Tuple
 import json
+from datetime import datetime
+
+from api.projection import Projection
+from config.settings import settings
+
+# Small side collection holding one generation counter per indexed collection.
+# Every rewrite of a collection bumps its counter; the API keys caches on it.
+# It also keeps the projection each physical collection's vectors went through.
+VERSIONS_COLLECTION = "labellerr_collection_versions"
+
+
+class IndexMismatchError(RuntimeError):
+    """Query vectors cannot be searched against the live collection (dimension/projection mismatch)"""
+
+
+def _version_point_id(collection_name: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"collection-version/{collection_name}"))
+
+def _projection_point_id(collection_name: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"collection-projection/{collection_name}"))
+
+def _ensure_versions_collection(client: QdrantClient):
+    if not client.collection_exists(VERSIONS_COLLECTION):
+        client.create_collection(
+            collection_name=VERSIONS_COLLECTION,
+            vectors_config=VectorParams(size=1, distance=Distance.DOT)
+        )
+
+def get_collection_version(client: QdrantClient, collection_name: str) -> int:
+    """Return the current generation number of a collection (0 if never recorded)"""
+    try:
+        points = client.retrieve(
+            collection_name=VERSIONS_COLLECTION,
+            ids=[_version_point_id(collection_name)],
+            with_payload=True
+        )
+    except Exception:
+        return 0
+    return int(points[0].payload.get('version', 0)) if points else 0
+
+def bump_collection_version(client: QdrantClient, collection_name: str) -> int:
+    """Increment and return the generation number of a collection"""
+    _ensure_versions_collection(client)
+    version = get_collection_version(client, collection_name) + 1
+    client.upsert(
+        collection_name=VERSIONS_COLLECTION,
+        points=[PointStruct(
+            id=_version_point_id(collection_name),
+            vector=[0.0],
+            payload={
+                'collection': collection_name,
+                'version': version,
+                'updated_at': datetime.now().isoformat()
+            }
+        )],
+        wait=True
+    )
+    return version
+
+def save_collection_projection(client: QdrantClient, collection_name: str,
+                               projection: Optional[Projection]):
+    """
+    Record the projection the vectors of a physical collection went through
+    
+    Args:
+        client: Qdrant client
+        collection_name: Physical (versioned) collection, not the alias
+        projection: Projection applied to its stored vectors (None = full-size vectors)
+    """
+    _ensure_versions_collection(client)
+    client.upsert(
+        collection_name=VERSIONS_COLLECTION,
+        points=[PointStruct(
+            id=_projection_point_id(collection_name),
+            vector=[0.0],
+            payload={
+                'collection': collection_name,
+                'projection': projection.to_payload() if projection is not None else None,
+                'updated_at': datetime.now().isoformat()
+            }
+        )],
+        wait=True
+    )
+
+def load_collection_projection(client: QdrantClient, collection_name: str) -> Optional[Projection]:
+    """Projection recorded for a physical collection (None if it stores full-size vectors)"""
+    if not client.collection_exists(VERSIONS_COLLECTION):
+        return None
+    points = client.retrieve(
+        collection_name=VERSIONS_COLLECTION,
+        ids=[_projection_point_id(collection_name)],
+        with_payload=True
+    )
+    payload = points[0].payload.get('projection') if points else None
+    return Projection.from_payload(payload) if payload else None
+
+def get_alias_target(client: QdrantClient, alias_name: str) -> Optional[str]:
+    """Return the collection an alias currently points at, if any"""
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == alias_name:
+            return alias.collection_name
+    return None
+
+def is_collection_not_found(error: Exception) -> bool:
+    """Whether a Qdrant call failed because the collection does not exist (any longer)"""
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code == 404
+    # Local (in-process) client
+    return isinstance(error, ValueError) and "not found" in str(error).lower()
+
+def list_versioned_collections(client: QdrantClient, alias_name: str) -> List[str]:
+    """List physical collections built for an alias, oldest first"""
+    pattern = re.compile(rf"^{re.escape(alias_name)}_v\d{{14}}$")
+    names = [c.name for c in client.get_collections().collections if pattern.match(c.name)]
+    return sorted(names)
+
+def legacy_version_name(alias_name: str) -> str:
+    """Versioned name a pre-alias collection is kept under; sorts before every real version"""
+    return f"{alias_name}_v{'0' * 14}"
+
+def copy_collection(client: QdrantClient, source: str, destination: str, page_size: int = 256) -> int:
+    """
+    Copy every point (vectors and payload) of source into a new collection
+    
+    Returns:
+        Number of points copied
+    """
+    client.create_collection(
+        collection_name=destination,
+        vectors_config=client.get_collection(source).config.params.vectors
+    )
+    copied = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=source,
+            limit=page_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        if points:
+            client.upsert(
+                collection_name=destination,
+                points=[PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points],
+                wait=True
+            )
+            copied += len(points)
+        if offset is None:
+            return copied
+
+def switch_alias(client: QdrantClient, alias_name: str, collection_name: str) -> Optional[str]:
+    """
+    Atomically point alias_name at collection_name and return the previous target.
+    
+    One-time migration of a legacy physical collection that still carries the
+    alias name: Qdrant refuses an alias that shares a collection's name, so it
+    has to go before the alias can exist. Its points are first copied to
+    legacy_version_name() (returned as the previous target, so rollback() can
+    go back to it), and it is dropped only once the new collection is known to
+    exist, right before the alias is created. resolve_live_index() serves the
+    newest version in between.
+    """
+    previous = get_alias_target(client, alias_name)
+    if previous is None and client.collection_exists(alias_name):
+        if collection_name == alias_name or not client.collection_exists(collection_name):
+            raise ValueError(f"Cannot migrate '{alias_name}' to an alias of missing collection '{collection_name}'")
+        previous = legacy_version_name(alias_name)
+        if client.collection_exists(previous):
+            client.delete_collection(collection_name=previous)  # left by an interrupted migration
+        copied = copy_collection(client, alias_name, previous)
+        save_collection_projection(client, previous, load_collection_projection(client, alias_name))
+        print(f"Migrating legacy collection '{alias_name}' to an alias ({copied} points kept as {previous})")
+        client.delete_collection(collection_name=alias_name)
+        client.update_collection_aliases(change_aliases_operations=[CreateAliasOperation(
+            create_alias=CreateAlias(collection_name=collection_name, alias_name=alias_name)
+        )])
+        return previous
+    
+    operations = []
+    if previous is not None:
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias_name)))
+    operations.append(CreateAliasOperation(
+        create_alias=CreateAlias(collection_name=collection_name, alias_name=alias_name)
+    ))
+    client.update_collection_aliases(change_aliases_operations=operations)
+    return previous
+
+def prune_versioned_collections(client: QdrantClient, alias_name: str, keep: int = 2) -> List[str]:
+    """Delete old versioned collections, keeping the newest `keep` and the live one"""
+    live = get_alias_target(client, alias_name)
+    versions = list_versioned_collections(client, alias_name)
+    stale = [name for name in versions[:-keep] if name != live] if keep > 0 else []
+    for name in stale:
+        client.delete_collection(collection_name=name)
+        print(f"Deleted old collection version: {name}")
+    if stale and client.collection_exists(VERSIONS_COLLECTION):
+        client.delete(
+            collection_name=VERSIONS_COLLECTION,
+            points_selector=PointIdsList(points=[_projection_point_id(name) for name in stale]),
+            wait=True
+        )
+    return stale
+
+# Fixed namespace so the same chunk id always maps to the same point id
+CHUNK_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "labellerr/chunk")
+
+# Chunk fields that affect the stored payload or the embedded text
+HASHED_CHUNK_FIELDS = ('text', 'title', 'url', 'heading', 'source_type',
+                       'chunk_index', 'page_title', 'heading_level')
+
+def chunk_point_id(chunk_id: str) -> str:
+    """Deterministic Qdrant point id (UUID string) for a chunk id"""
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, str(chunk_id)))
+
+def chunk_content_hash(chunk: Dict, embedding_model: str = "") -> str:
+    """Hash of everything that would change a chunk's point (content, metadata, model)"""
+    fields = {field: chunk.get(field) for field in HASHED_CHUNK_FIELDS}
+    fields['embedding_model'] = embedding_model
+    if chunk.get('metadata'):
+        fields['metadata'] = chunk['metadata']
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def fallback_chunk_id(chunk: Dict) -> str:
+    """Stable id for chunks produced without one (never the list position)"""
+    return hashlib.md5(
+        f"{chunk.get('url', '')}_{chunk.get('heading', '')}_{chunk.get('chunk_index', 0)}_"
+        f"{chunk.get('source_type', '')}_{chunk.get('text', '')}".encode()
+    ).hexdigest()
+
+def fetch_content_hashes(client: QdrantClient, collection_name: str,
+                         page_size: int = 1000) -> Dict[str, str]:
+    """Map point id -> content_hash for every point in a collection (payload only, no vectors)"""
+    hashes = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=['content_hash'],
+            with_vectors=False
+        )
+        for point in points:
+            hashes[str(point.id)] = (point.payload or {}).get('content_hash', '')
+        if offset is None:
+            return hashes
+
+def diff_content_hashes(existing: Dict[str, str],
+                        incoming: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """
+    Compare stored and desired {point_id: content_hash} maps
+    
+    Returns:
+        (point ids to upsert because they are new or changed, point ids to delete)
+    """
+    changed = [point_id for point_id, content_hash in incoming.items()
+               if existing.get(point_id) != content_hash]
+    removed = [point_id for point_id in existing if point_id not in incoming]
+    return changed, removed
+
+def delete_points(client: QdrantClient, collection_name: str, point_ids: List[str],
+                  batch_size: int = 1000):
+    """Delete points by id in batches"""
+    for i in range(0, len(point_ids), batch_size):
+        client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=point_ids[i:i + batch_size])
+        )
+
+# Never used as a real point id; deleting it with wait=True is a no-op write barrier
+BARRIER_POINT_ID = str(uuid.uuid5(uuid.NAMESPACE_URL, "labellerr/write-barrier"))
+
+def write_barrier(client: QdrantClient, collection_name: str):
+    """
+    Block until every write already sent to the collection has been applied.
+    
+    Updates are applied in WAL order, so a waited no-op delete returns only
+    after all earlier (wait=False) upserts are visible.
+    """
+    client.delete(
+        collection_name=collection_name,
+        points_selector=FilterSelector(filter=Filter(must=[HasIdCondition(has_id=[BARRIER_POINT_ID])])),
+        wait=True
+    )
+
+# Qdrant's default: segments above this many KB of vectors get an HNSW index
+DEFAULT_INDEXING_THRESHOLD = 20000
+
+def enable_indexing(client: QdrantClient, collection_name: str,
+                    indexing_threshold: int = DEFAULT_INDEXING_THRESHOLD):
+    """Turn HNSW indexing back on for a collection created with indexing deferred"""
+    client.update_collection(
+        collection_name=collection_name,
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=indexing_threshold)
+    )
+
+# Bytes per stored vector component, by Qdrant datatype
+_DATATYPE_BYTES = {'float32': 4, 'float16': 2, 'uint8': 1}
+
+def _builds_index(info) -> bool:
+    """Whether the optimizer will build an HNSW index for a collection at all"""
+    config = getattr(info, 'config', None)
+    vectors = getattr(getattr(config, 'params', None), 'vectors', None)
+    threshold = getattr(getattr(config, 'optimizer_config', None), 'indexing_threshold', None)
+    if threshold is None or not hasattr(vectors, 'size'):
+        return True  # unknown (e.g. named vectors): rely on the counts
+    if threshold == 0:
+        return False  # indexing disabled
+    datatype = getattr(vectors.datatype, 'value', vectors.datatype) or 'float32'
+    kilobytes = (info.points_count or 0) * vectors.size * _DATATYPE_BYTES.get(datatype, 4) / 1024
+    return kilobytes >= threshold
+
+def wait_until_indexed(client: QdrantClient, collection_name: str,
+                       expected_vectors: Optional[int] = None,
+                       timeout_s: float = 1800.0, poll_s: float = 1.0, settle_polls: int = 10) -> int:
+    """
+    Block until the optimizer has built the HNSW index of a collection
+    
+    A collection is still green right after indexing is enabled, before the
+    optimizer picks the change up, so green alone is not enough. Done once
+    indexed_vectors_count reaches expected_vectors; segments below the indexing
+    threshold are never indexed, so also done at once when the whole collection
+    is below it, or once the status went yellow/grey and back to green with a
+    settled count, or stayed green with an unchanged count for settle_polls polls.
+    
+    Args:
+        client: Qdrant client
+        collection_name: Collection to wait for
+        expected_vectors: Vectors that should end up indexed (default: its point count)
+        timeout_s: Give up (TimeoutError) after this long
+        poll_s: Seconds between status checks
+        settle_polls: Green polls without progress accepted when the optimizer was never seen running
+    
+    Returns:
+        Final indexed_vectors_count
+    """
+    deadline = time.monotonic() + timeout_s
+    optimizing_seen = False
+    unchanged = 0
+    last_indexed = None
+    while True:
+        info = client.get_collection(collection_name)
+        indexed = info.indexed_vectors_count or 0
+        if info.status == CollectionStatus.RED:
+            raise RuntimeError(f"Collection {collection_name} is red: {info.optimizer_status}")
+        if info.status == CollectionStatus.GREEN:
+            target = expected_vectors if expected_vectors is not None else (info.points_count or 0)
+            if indexed >= target or not _builds_index(info):
+                return indexed
+            unchanged = unchanged + 1 if indexed == last_indexed else 0
+            if unchanged >= (1 if optimizing_seen else settle_polls):
+                print(f"Collection {collection_name} settled with {indexed}/{target} vectors indexed "
+                      f"(the rest is in segments below the indexing threshold)")
+                return indexed
+        else:
+            optimizing_seen = True
+            unchanged = 0
+        last_indexed = indexed
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Collection {collection_name} still {info.status} after {timeout_s}s "
+                               f"({info.indexed_vectors_count}/{info.points_count} vectors indexed)")
+        time.sleep(poll_s)
 
 class QdrantManager:
-    def __init__(self, host: str = "localhost", port: int = 6333, api_key: str = None):
+    def __init__(self, host: str = "localhost", port: int = 6333, api_key: str = None,
+                 collection_name: str = "labellerr_knowledge_base"):
         """
         Initialize Qdrant client
         
@@ -14,23 +384,38 @@ class QdrantManager:
             host: Qdrant server host
             port: Qdrant server port
             api_key: API key for Qdrant Cloud (optional)
+            collection_name: Name the API reads from; an alias once blue/green
+                             rebuilds are used (see rebuild_blue_green)
         """
         if api_key:
             self.client = QdrantClient(url=f"https://{host}", api_key=api_key)
         else:
             self.client = QdrantClient(host=host, port=port)
         
-        self.collection_name = "labellerr_knowledge_base"
+        self.collection_name = collection_name
+        self.collection_version = 0
+        # (physical collection, projection, vector size) queries go to; resolved by
+        # refresh_live_index(), not per query (see resolve_live_index)
+        self._live_index: Optional[Tuple[str, Optional[Projection], int]] = None
         print(f"Connected to Qdrant at {host}:{port}")
     
     def create_collection(self, vector_size: int = 768, distance: Distance = Distance.COSINE):
         """
-        Create collection for storing embeddings
+        Create collection for storing embeddings.
+        
+        Destructive: drops the live collection first. Prefer rebuild_blue_green()
+        for anything serving traffic. When collection_name is an alias nothing is
+        dropped: the alias is pointed at a new, empty versioned collection and
+        the old one is kept for rollback().
         
         Args:
             vector_size: Dimension of embeddings (768 for all-mpnet-base-v2, 384 for all-MiniLM-L6-v2)
             distance: Distance metric for similarity search
         """
+        if get_alias_target(self.client, self.collection_name) is not None:
+            self.activate_collection(self.create_versioned_collection(vector_size=vector_size, distance=distance))
+            return
+        
         try:
             # Delete collection if exists
             self.client.delete_collection(collection_name=self.collection_name)
@@ -44,52 +429,236 @@ class QdrantManager:
             vectors_config=VectorParams(size=vector_size, distance=distance)
         )
         print(f"Created collection: {self.collection_name} with vector size: {vector_size}")
+        self.bump_collection_version()
     
-    def store_chunks_with_embeddings(self, chunks: List[Dict], embeddings: np.ndarray):
+    def store_chunks_with_embeddings(self, chunks: List[Dict], embeddings: np.ndarray,
+                                     collection_name: Optional[str] = None):
         """
         Store chunks and their embeddings in Qdrant
         
         Args:
             chunks: List of chunk dictionaries with metadata
             embeddings: Numpy array of embeddings
+            collection_name: Target collection (defaults to the live collection;
+                             pass a staging collection during blue/green builds)
         """
-        points = []
+        target = collection_name or self.collection_name
+        self.bulk_upload(chunks, embeddings, collection_name=target)
         
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            point = PointStruct(
-                id=str(uuid.uuid4()),
-                vector=embedding.tolist(),
-                payload={
-                    'chunk_id': chunk.get('id', f"chunk_{i}"),
-                    'text': chunk.get('text', ''),
-                    'title': chunk.get('title', ''),
-                    'url': chunk.get('url', ''),
-                    'heading': chunk.get('heading', ''),
-                    'source_type': chunk.get('source_type', 'unknown'),
-                    'chunk_index': chunk.get('chunk_index', 0),
-                    'page_title': chunk.get('page_title', ''),
-                    'heading_level': chunk.get('heading_level', 0),
-                    'embedding_model': chunk.get('embedding_model', ''),
-                    'char_count': len(chunk.get('text', '')),
-                    'word_count': len(chunk.get('text', '').split())
-                }
-            )
-            points.append(point)
+        print(f"Successfully stored {len(chunks)} chunks in Qdrant")
+        if target == self.collection_name:
+            self.bump_collection_version()
+    
+    def bulk_upload(self, chunks: List[Dict], embeddings: np.ndarray,
+                    collection_name: Optional[str] = None, embedding_model: Optional[str] = None,
+                    batch_size: int = settings.QDRANT_UPLOAD_BATCH_SIZE,
+                    parallel: int = settings.QDRANT_UPLOAD_PARALLEL,
+                    max_retries: int = settings.QDRANT_UPLOAD_RETRIES) -> int:
+        """
+        Upload many chunks as fast as the server accepts them
+        
+        Vectors go to the client as one float32 array (no per-point lists built
+        here), batches are sent by `parallel` worker processes without waiting
+        for each write to be applied, failed batches are retried up to
+        max_retries times, and a final write barrier makes the whole upload
+        visible before returning.
+        
+        Args:
+            chunks: Chunk dictionaries with metadata
+            embeddings: Array of shape (len(chunks), dim)
+            collection_name: Target collection (defaults to the live collection)
+            embedding_model: Model name for the payload (defaults to the chunk's own)
+            batch_size: Points per request
+            parallel: Concurrent upload workers
+            max_retries: Attempts per batch before the upload fails
+            
+        Returns:
+            Number of points sent
+        """
+        target = collection_name or self.collection_name
+        ids, payloads = [], []
+        for chunk in chunks:
+            point_id, payload = self._chunk_payload(chunk, embedding_model)
+            ids.append(point_id)
+            payloads.append(payload)
+        
+        start_time = time.perf_counter()
+        self.client.upload_collection(
+            collection_name=target,
+            vectors=np.ascontiguousarray(embeddings, dtype=np.float32),
+            payload=payloads,
+            ids=ids,
+            batch_size=batch_size,
+            parallel=parallel,
+            max_retries=max_retries,
+            wait=False
+        )
+        write_barrier(self.client, target)
+        elapsed = time.perf_counter() - start_time
+        print(f"Uploaded {len(ids)} points to {target} in {elapsed:.1f}s "
+              f"({len(ids) / max(elapsed, 1e-9):.0f} points/s, {parallel} workers)")
+        return len(ids)
+    
+    def upsert_chunks(self, chunks: List[Dict], embeddings: np.ndarray,
+                      collection_name: Optional[str] = None,
+                      embedding_model: Optional[str] = None, wait: bool = True) -> List[str]:
+        """
+        Upsert one batch of chunks without bumping the collection version;
+        for streaming writers that decide themselves when a load is complete.
+        With wait=False, call write_barrier() once all batches are sent.
+        
+        Returns:
+            Point ids written
+        """
+        points = [self._chunk_point(chunk, embedding, embedding_model)
+                  for chunk, embedding in zip(chunks, embeddings)]
+        self.client.upsert(collection_name=collection_name or self.collection_name,
+                           points=points, wait=wait)
+        return [point.id for point in points]
+    
+    def _chunk_point(self, chunk: Dict, embedding: np.ndarray,
+                     embedding_model: Optional[str] = None) -> PointStruct:
+        """Build the point for a chunk; its id is derived from the chunk id, not generated"""
+        point_id, payload = self._chunk_payload(chunk, embedding_model)
+        return PointStruct(id=point_id, vector=embedding.tolist(), payload=payload)
+    
+    def _chunk_payload(self, chunk: Dict, embedding_model: Optional[str] = None) -> Tuple[str, Dict]:
+        """Point id and payload for a chunk"""
+        chunk_id = chunk.get('id') or fallback_chunk_id(chunk)
+        embedding_model = embedding_model if embedding_model is not None else chunk.get('embedding_model', '')
+        return chunk_point_id(chunk_id), {
+            # Profile-specific fields (e.g. month/tags for the updates index) go first,
+            # so a metadata key can never replace the text, url or ids below
+            **chunk.get('metadata', {}),
+            'chunk_id': chunk_id,
+            'text': chunk.get('text', ''),
+            'title': chunk.get('title', ''),
+            'url': chunk.get('url', ''),
+            'heading': chunk.get('heading', ''),
+            'source_type': chunk.get('source_type', 'unknown'),
+            'chunk_index': chunk.get('chunk_index', 0),
+            'page_title': chunk.get('page_title', ''),
+            'heading_level': chunk.get('heading_level', 0),
+            'embedding_model': embedding_model,
+            'content_hash': chunk_content_hash(chunk, embedding_model),
+            'char_count': len(chunk.get('text', '')),
+            'word_count': len(chunk.get('text', '').split()),
+        }
+    
+    def sync_chunks(self, chunks: List[Dict], embed_chunks: Callable[[List[Dict]], np.ndarray],
+                    embedding_model: str, collection_name: Optional[str] = None,
+                    batch_size: int = 100) -> Dict:
+        """
+        Incrementally bring a collection in line with a chunk set
+        
+        Only new or changed chunks (by content hash) are embedded and upserted;
+        points whose chunk disappeared are deleted. Changing the embedding
+        model changes every hash, so it degrades to a full re-embed.
+        
+        Args:
+            chunks: The complete, current chunk set
+            embed_chunks: Called with the chunks that need vectors; returns one row per chunk
+            embedding_model: Model name recorded in the payload and the content hash
+            collection_name: Target collection (defaults to the live collection)
+            batch_size: Points per upsert request
+            
+        Returns:
+            Dict with upserted / deleted / unchanged counts
+        """
+        target = collection_name or self.collection_name
+        
+        incoming = {}
+        by_point_id = {}
+        for chunk in chunks:
+            point_id = chunk_point_id(chunk.get('id') or fallback_chunk_id(chunk))
+            if point_id in by_point_id:
+                print(f"Warning: duplicate chunk id {chunk.get('id')}, keeping the last occurrence")
+            by_point_id[point_id] = chunk
+            incoming[point_id] = chunk_content_hash(chunk, embedding_model)
+        
+        existing = fetch_content_hashes(self.client, target)
+        changed, removed = diff_content_hashes(existing, incoming)
+        print(f"Sync {target}: {len(changed)} new/changed, {len(removed)} removed, "
+              f"{len(incoming) - len(changed)} unchanged")
         
-        # Upload points in batches
-        batch_size = 100
-        for i in range(0, len(points), batch_size):
-            batch = points[i:i + batch_size]
+        for i in range(0, len(changed), batch_size):
+            batch_chunks = [by_point_id[point_id] for point_id in changed[i:i + batch_size]]
+            embeddings = embed_chunks(batch_chunks)
             self.client.upsert(
-                collection_name=self.collection_name,
-                points=batch
+                collection_name=target,
+                points=[self._chunk_point(chunk, embedding, embedding_model)
+                        for chunk, embedding in zip(batch_chunks, embeddings)]
             )
-            print(f"Uploaded batch {i//batch_size + 1}/{(len(points) + batch_size - 1)//batch_size}")
+        delete_points(self.client, target, removed)
+        
+        if (changed or removed) and target == self.collection_name:
+            self.bump_collection_version()
+        return {
+            'upserted': len(changed),
+            'deleted': len(removed),
+            'unchanged': len(incoming) - len(changed)
+        }
+    
+    def refresh_live_index(self) -> Tuple[str, Optional[Projection], int]:
+        """
+        Look up the physical collection the alias points at, the projection its
+        vectors went through and their size, together so a query is never mapped
+        with one version's basis and searched against another. Costs a few Qdrant
+        round trips: the API calls it from the collection version poll, not per query.
+        """
+        target = get_alias_target(self.client, self.collection_name)
+        if target is None:
+            target = self.collection_name
+            if not self.client.collection_exists(target):
+                # Between dropping a legacy collection and creating its alias (switch_alias)
+                versions = list_versioned_collections(self.client, self.collection_name)
+                target = versions[-1] if versions else target
+        projection = load_collection_projection(self.client, target)
+        vector_size = self.client.get_collection(target).config.params.vectors.size
+        self._live_index = (target, projection, vector_size)
+        return self._live_index
+    
+    def resolve_live_index(self, embedding_dim: int, refresh: bool = False) -> Tuple[str, Optional[Projection]]:
+        """
+        Collection to search and the projection to map queries with, from the
+        last refresh_live_index() (made here only on first use, when asked to, or
+        once more when the cached index does not fit the queries)
+        
+        Args:
+            embedding_dim: Dimension of the model's (unprojected) query embeddings
+            refresh: Look the alias up again first (e.g. after a collection-not-found
+                     error from searching the cached target)
         
-        print(f"Successfully stored {len(points)} chunks in Qdrant")
+        Returns:
+            (collection name, projection or None); search that collection by name
+        
+        Raises:
+            IndexMismatchError: Projected queries would not match its vector size
+        """
+        if refresh or self._live_index is None:
+            self.refresh_live_index()
+            return self._check_live_index(embedding_dim)
+        try:
+            return self._check_live_index(embedding_dim)
+        except IndexMismatchError:
+            # The cache may predate an alias switch made since the last poll
+            self.refresh_live_index()
+            return self._check_live_index(embedding_dim)
+    
+    def _check_live_index(self, embedding_dim: int) -> Tuple[str, Optional[Projection]]:
+        target, projection, vector_size = self._live_index
+        if projection is not None and projection.dim_in != embedding_dim:
+            raise IndexMismatchError(f"{target} was projected from {projection.dim_in}-d embeddings, "
+                                     f"the query model produces {embedding_dim}-d")
+        query_dim = projection.dim if projection is not None else embedding_dim
+        if query_dim != vector_size:
+            raise IndexMismatchError(f"{target} stores {vector_size}-d vectors but queries would be "
+                                     f"{query_dim}-d (no projection recorded for it?)")
+        return target, projection
     
     def search_similar(self, query_embedding: np.ndarray, limit: int = 5, 
-                      source_filter: Optional[str] = None, min_score: float = 0.0):
+                      source_filter: Optional[str] = None, min_score: float = 0.0,
+                      collection_name: Optional[str] = None):
         """
         Search for similar chunks
         
@@ -98,28 +667,298 @@ class QdrantManager:
             limit: Number of results to return
             source_filter: Filter by source type (e.g., 'documentation', 'blog', 'youtube')
             min_score: Minimum similarity score
+            collection_name: Collection to search (defaults to the live alias)
         """
-        search_filter = None
-        if source_filter:
-            search_filter = Filter(
-                must=[
-                    FieldCondition(
-                        key="source_type",
-                        match=MatchValue(value=source_filter)
-                    )
-                ]
-            )
-        
         search_result = self.client.search(
-            collection_name=self.collection_name,
+            collection_name=collection_name or self.collection_name,
             query_vector=query_embedding.tolist(),
-            query_filter=search_filter,
+            query_filter=self._source_filter(source_filter),
             limit=limit,
             score_threshold=min_score
         )
-        
+
         return search_result
-    
+
+    def search_similar_batch(self, query_embeddings: np.ndarray, limit: int = 5,
+                             source_filter: Optional[str] = None, min_score: float = 0.0,
+                             collection_name: Optional[str] = None):
+        """
+        Search for similar chunks for many queries in a single round trip
+
+        Args:
+            query_embeddings: Array of query vectors, one row per query
+            limit: Number of results to return per query
+            source_filter: Filter by source type (applied to every query)
+            min_score: Minimum similarity score
+            collection_name: Collection to search (defaults to the live alias)
+
+        Returns:
+            List of result lists, in the same order as query_embeddings
+        """
+        search_filter = self._source_filter(source_filter)
+        requests = [
+            SearchRequest(
+                vector=embedding.tolist(),
+                filter=search_filter,
+                limit=limit,
+                score_threshold=min_score,
+                with_payload=True
+            )
+            for embedding in query_embeddings
+        ]
+
+        return self.client.search_batch(
+            collection_name=collection_name or self.collection_name,
+            requests=requests
+        )
+
+    def _source_filter(self, source_filter: Optional[str]) -> Optional[Filter]:
+        """Build the payload filter for a source type, if any"""
+        if not source_filter:
+            return None
+        return Filter(
+            must=[
+                FieldCondition(
+                    key="source_type",
+                    match=MatchValue(value=source_filter)
+                )
+            ]
+        )
+
+    def refresh_collection_version(self) -> int:
+        """Re-read the collection generation number from Qdrant"""
+        self.collection_version = get_collection_version(self.client, self.collection_name)
+        return self.collection_version
+
+    def bump_collection_version(self) -> int:
+        """Mark the collection as rewritten so cached search results are invalidated"""
+        self.collection_version = bump_collection_version(self.client, self.collection_name)
+        self._live_index = None  # the alias may point elsewhere now; resolved again on next use
+        print(f"Collection {self.collection_name} is now at version {self.collection_version}")
+        return self.collection_version
+
+    def create_versioned_collection(self, vector_size: int = 768,
+                                    distance: Distance = Distance.COSINE,
+                                    defer_indexing: bool = False) -> str:
+        """
+        Create a new, empty, timestamped collection for a blue/green build
+        
+        Args:
+            vector_size: Dimension of embeddings
+            distance: Distance metric for similarity search
+            defer_indexing: Create with indexing_threshold=0 so no HNSW graph is
+                            built while loading; call finish_bulk_load() afterwards
+        
+        Returns:
+            Name of the new collection, e.g. labellerr_knowledge_base_v20250101120000
+        """
+        name = f"{self.collection_name}_v{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        self.client.create_collection(
+            collection_name=name,
+            vectors_config=VectorParams(size=vector_size, distance=distance),
+            optimizers_config=OptimizersConfigDiff(indexing_threshold=0) if defer_indexing else None
+        )
+        print(f"Created staging collection: {name} with vector size: {vector_size}"
+              f"{' (indexing deferred)' if defer_indexing else ''}")
+        return name
+
+    def finish_bulk_load(self, collection_name: str,
+                         indexing_threshold: int = DEFAULT_INDEXING_THRESHOLD,
+                         timeout_s: float = 1800.0, expected_vectors: Optional[int] = None) -> float:
+        """
+        Re-enable indexing on a bulk-loaded collection and wait for the optimizer
+        
+        Args:
+            expected_vectors: Vectors that must be indexed (default: the collection's point count)
+        
+        Returns:
+            Seconds spent building the index
+        """
+        start_time = time.perf_counter()
+        enable_indexing(self.client, collection_name, indexing_threshold)
+        wait_until_indexed(self.client, collection_name, expected_vectors=expected_vectors,
+                           timeout_s=timeout_s)
+        elapsed = time.perf_counter() - start_time
+        print(f"Indexed {collection_name} in {elapsed:.1f}s")
+        return elapsed
+
+    def bulk_load(self, chunks: List[Dict], embeddings: np.ndarray,
+                  distance: Distance = Distance.COSINE,
+                  parallel: int = settings.QDRANT_UPLOAD_PARALLEL,
+                  batch_size: int = settings.QDRANT_UPLOAD_BATCH_SIZE,
+                  timeout_s: float = 1800.0,
+                  max_retries: int = settings.QDRANT_UPLOAD_RETRIES) -> Dict:
+        """
+        Load a new versioned collection with HNSW construction deferred until
+        every point is in, which is much faster than indexing while inserting
+        
+        Args:
+            parallel, batch_size, max_retries: Upload settings (see bulk_upload;
+                                               defaults from QDRANT_UPLOAD_*)
+        
+        Returns:
+            Dict with the collection name, point count and per-phase seconds
+        """
+        start_time = time.perf_counter()
+        name = self.create_versioned_collection(vector_size=embeddings.shape[1], distance=distance,
+                                                defer_indexing=True)
+        created = time.perf_counter()
+        try:
+            points = self.bulk_upload(chunks, embeddings, collection_name=name,
+                                      batch_size=batch_size, parallel=parallel,
+                                      max_retries=max_retries)
+            uploaded = time.perf_counter()
+            # Every stored point must be indexed (chunks sharing an id are one point)
+            index_s = self.finish_bulk_load(name, timeout_s=timeout_s)
+        except Exception:
+            self.client.delete_collection(collection_name=name)
+            raise
+        
+        timings = {
+            'collection': name,
+            'points': points,
+            'create_s': round(created - start_time, 2),
+            'upload_s': round(uploaded - created, 2),
+            'index_s': round(index_s, 2),
+            'total_s': round(time.perf_counter() - start_time, 2)
+        }
+        print(f"Bulk load timings: {timings}")
+        return timings
+
+    def validate_collection(self, collection_name: str, expected_count: int,
+                            probe_embeddings: Optional[np.ndarray] = None,
+                            max_latency_ms: float = 500.0) -> Dict:
+        """
+        Check a staging collection before it goes live
+        
+        Args:
+            collection_name: Collection to validate
+            expected_count: Number of points that must be present
+            probe_embeddings: Query vectors that must each return at least one hit
+            max_latency_ms: Slowest acceptable probe search
+            
+        Returns:
+            Report dict with an 'ok' flag and the list of failed checks
+        """
+        errors = []
+        count = self.client.count(collection_name=collection_name, exact=True).count
+        if count != expected_count:
+            errors.append(f"point count {count} != expected {expected_count}")
+        
+        latencies = []
+        empty_probes = 0
+        for embedding in (probe_embeddings if probe_embeddings is not None else []):
+            start_time = time.perf_counter()
+            hits = self.client.search(
+                collection_name=collection_name,
+                query_vector=embedding.tolist(),
+                limit=5
+            )
+            latencies.append((time.perf_counter() - start_time) * 1000.0)
+            if not hits:
+                empty_probes += 1
+        
+        if empty_probes:
+            errors.append(f"{empty_probes} probe queries returned no results")
+        slowest = max(latencies) if latencies else 0.0
+        if slowest > max_latency_ms:
+            errors.append(f"slowest probe {slowest:.1f}ms > {max_latency_ms}ms")
+        
+        return {
+            'ok': not errors,
+            'collection': collection_name,
+            'count': count,
+            'expected_count': expected_count,
+            'probes': len(latencies),
+            'max_probe_latency_ms': round(slowest, 2),
+            'errors': errors
+        }
+
+    def activate_collection(self, collection_name: str) -> Optional[str]:
+        """Atomically switch the live alias to collection_name; returns the previous target"""
+        previous = switch_alias(self.client, self.collection_name, collection_name)
+        print(f"Alias {self.collection_name}: {previous} -> {collection_name}")
+        self.bump_collection_version()
+        return previous
+
+    def rollback(self) -> Optional[str]:
+        """Point the live alias back at the previous collection version"""
+        live = get_alias_target(self.client, self.collection_name)
+        older = [name for name in list_versioned_collections(self.client, self.collection_name)
+                 if live is None or name < live]
+        if not older:
+            print("No previous collection version to roll back to")
+            return None
+        self.activate_collection(older[-1])
+        return older[-1]
+
+    def rebuild_blue_green(self, chunks: List[Dict], embeddings: np.ndarray,
+                           probe_embeddings: Optional[np.ndarray] = None,
+                           max_latency_ms: float = 500.0, keep_versions: int = 2,
+                           upload_parallel: int = settings.QDRANT_UPLOAD_PARALLEL,
+                           upload_batch_size: int = settings.QDRANT_UPLOAD_BATCH_SIZE,
+                           upload_retries: int = settings.QDRANT_UPLOAD_RETRIES,
+                           before_activate: Optional[Callable[[str], None]] = None,
+                           projection: Optional[Projection] = None) -> Dict:
+        """
+        Zero-downtime rebuild: load into a new versioned collection, validate it,
+        then atomically switch the alias. The live collection is untouched until
+        the switch, and the previous version is kept for rollback().
+        
+        Args:
+            upload_parallel, upload_batch_size, upload_retries: Passed to bulk_load
+            before_activate: Called with the loaded staging collection's name
+                             before validation (e.g. to store files that belong
+                             to that version)
+            projection: Projection the embeddings went through; recorded for the
+                        new version before the switch so queries are mapped with it
+        
+        Returns:
+            Validation report, plus 'activated' and 'previous' collection names
+        """
+        load = self.bulk_load(chunks, embeddings, parallel=upload_parallel, batch_size=upload_batch_size,
+                              max_retries=upload_retries)
+        save_collection_projection(self.client, load['collection'], projection)
+        if before_activate is not None:
+            before_activate(load['collection'])
+        
+        # Chunks sharing an id collapse into one point
+        unique_points = len({chunk.get('id') or fallback_chunk_id(chunk) for chunk in chunks})
+        report = self.activate_if_valid(load['collection'], unique_points, probe_embeddings=probe_embeddings,
+                                        max_latency_ms=max_latency_ms, keep_versions=keep_versions)
+        report['load'] = load
+        return report
+
+    def activate_if_valid(self, staging: str, expected_count: int,
+                          probe_embeddings: Optional[np.ndarray] = None,
+                          max_latency_ms: float = 500.0, keep_versions: int = 2) -> Dict:
+        """
+        Validate a fully loaded staging collection and switch the alias to it,
+        or drop it and leave the live collection alone
+        
+        Returns:
+            Validation report, plus 'activated' and 'previous' collection names
+        """
+        try:
+            report = self.validate_collection(
+                staging, expected_count=expected_count,
+                probe_embeddings=probe_embeddings, max_latency_ms=max_latency_ms
+            )
+        except Exception:
+            self.client.delete_collection(collection_name=staging)
+            raise
+        
+        if not report['ok']:
+            print(f"Validation failed for {staging}: {report['errors']} (live alias unchanged)")
+            self.client.delete_collection(collection_name=staging)
+            report.update({'activated': None, 'previous': get_alias_target(self.client, self.collection_name)})
+            return report
+        
+        previous = self.activate_collection(staging)
+        prune_versioned_collections(self.client, self.collection_name, keep=keep_versions)
+        report.update({'activated': staging, 'previous': previous})
+        return report
+
     def get_collection_info(self):
         """Get information about the collection"""
         try:
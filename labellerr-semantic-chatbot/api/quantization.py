@@ -0,0 +1,272 @@
+# api/quantization.py
+"""
+Reduced-precision embedding matrices for storage and local search.
+
+float16 halves and per-dimension int8 quarters the size of a float32
+matrix. Scoring never materializes a float32 copy: rows are widened one
+block at a time inside the matrix product, and for int8 the per-dimension
+scale is folded into the query instead of into every row:
+
+    x = q * scale + offset   =>   x . y = q . (scale * y) + offset . y
+
+    python -m api.quantization embeddings_output --sample 500
+"""
+import argparse
+import json
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+STORAGE_DTYPES = {'float32': np.float32, 'float16': np.float16, 'int8': np.int8}
+FILE_SUFFIX = {'float32': 'f32', 'float16': 'f16', 'int8': 'i8'}
+
+
+class QuantizedMatrix:
+    """
+    Row-major embedding matrix stored as float32, float16 or int8.
+
+    Args:
+        data: (rows, dim) array in the storage dtype (may be a memmap)
+        dtype: 'float32', 'float16' or 'int8'
+        scale: Per-dimension step of the int8 codes
+        offset: Per-dimension value of code 0 (int8 only)
+        block_rows: Rows widened to float32 at a time while scoring
+    """
+
+    def __init__(self, data: np.ndarray, dtype: str = 'float32', scale: Optional[np.ndarray] = None,
+                 offset: Optional[np.ndarray] = None, block_rows: int = 4096):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype '{dtype}' (use one of {list(STORAGE_DTYPES)})")
+        if dtype == 'int8' and (scale is None or offset is None):
+            raise ValueError("int8 embeddings need a per-dimension scale and offset")
+        self.data = data
+        self.dtype = dtype
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float32)
+        self.offset = None if offset is None else np.asarray(offset, dtype=np.float32)
+        self.block_rows = block_rows
+
+    @classmethod
+    def from_float(cls, embeddings: np.ndarray, dtype: str = 'float32', block_rows: int = 4096) -> "QuantizedMatrix":
+        """Encode a float matrix; int8 maps each dimension's [min, max] onto the 256 codes"""
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype '{dtype}' (use one of {list(STORAGE_DTYPES)})")
+        if dtype != 'int8':
+            return cls(np.asarray(embeddings, dtype=STORAGE_DTYPES[dtype]), dtype, block_rows=block_rows)
+
+        rows, dim = embeddings.shape
+        low = np.zeros(dim, dtype=np.float32)
+        high = np.zeros(dim, dtype=np.float32)
+        if rows:
+            low = np.full(dim, np.inf, dtype=np.float32)
+            high = np.full(dim, -np.inf, dtype=np.float32)
+            for start in range(0, rows, block_rows):
+                block = np.asarray(embeddings[start:start + block_rows], dtype=np.float32)
+                np.minimum(low, block.min(axis=0), out=low)
+                np.maximum(high, block.max(axis=0), out=high)
+        scale = (high - low) / 255.0
+        scale[scale == 0] = 1.0  # constant dimension: every code decodes to low
+        offset = low + 128.0 * scale
+
+        codes = np.empty((rows, dim), dtype=np.int8)
+        for start in range(0, rows, block_rows):
+            block = np.asarray(embeddings[start:start + block_rows], dtype=np.float32)
+            codes[start:start + block_rows] = np.clip(np.rint((block - offset) / scale), -128, 127)
+        return cls(codes, 'int8', scale, offset, block_rows=block_rows)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.data.shape
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.shape[0] * self.data.shape[1] * self.data.dtype.itemsize
+
+    def dequantize(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """float32 copy of rows start..stop"""
+        block = np.asarray(self.data[start:stop], dtype=np.float32)
+        if self.dtype == 'int8':
+            block *= self.scale
+            block += self.offset
+        return block
+
+    def take(self, rows: Sequence[int]) -> np.ndarray:
+        """float32 copy of the given rows"""
+        block = np.asarray(self.data[np.asarray(rows, dtype=np.int64)], dtype=np.float32)
+        if self.dtype == 'int8':
+            block *= self.scale
+            block += self.offset
+        return block
+
+    def _prepare(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(query matrix to multiply the stored codes with, per-query constant term)"""
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.dtype == 'int8':
+            return (queries * self.scale).T, queries @ self.offset
+        return queries.T, np.zeros(len(queries), dtype=np.float32)
+
+    def _block_scores(self, start: int, weights: np.ndarray, bias: np.ndarray) -> np.ndarray:
+        block = self.data[start:start + self.block_rows]
+        scores = np.asarray(block, dtype=np.float32) @ weights
+        scores += bias
+        return scores.T
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Dot products of queries with every row
+
+        Args:
+            queries: (dim,) or (n_queries, dim) float query vectors
+
+        Returns:
+            (rows,) or (n_queries, rows) float32 scores
+        """
+        single = np.ndim(queries) == 1
+        weights, bias = self._prepare(np.atleast_2d(queries))
+        scores = np.empty((weights.shape[1], len(self)), dtype=np.float32)
+        for start in range(0, len(self), self.block_rows):
+            block = self._block_scores(start, weights, bias)
+            scores[:, start:start + block.shape[1]] = block
+        return scores[0] if single else scores
+
+    def top_k(self, queries: np.ndarray, k: int = 5,
+              exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Best k rows per query, keeping only k candidates per block in memory
+
+        Args:
+            queries: (dim,) or (n_queries, dim) float query vectors
+            k: Results per query
+            exclude: Optional row index per query to leave out (e.g. the
+                     query's own row when queries are sampled from the matrix)
+
+        Returns:
+            (indices, scores), each (k,) or (n_queries, k), best first
+        """
+        single = np.ndim(queries) == 1
+        weights, bias = self._prepare(np.atleast_2d(queries))
+        n_queries = weights.shape[1]
+        k = min(k, len(self))
+        best_idx = np.empty((n_queries, 0), dtype=np.int64)
+        best_scores = np.empty((n_queries, 0), dtype=np.float32)
+        rows = np.arange(n_queries)
+
+        for start in range(0, len(self), self.block_rows):
+            block = self._block_scores(start, weights, bias)
+            if exclude is not None:
+                local = np.asarray(exclude) - start
+                hit = (local >= 0) & (local < block.shape[1])
+                block[rows[hit], local[hit]] = -np.inf
+            idx = np.concatenate([best_idx, np.broadcast_to(
+                np.arange(start, start + block.shape[1]), block.shape)], axis=1)
+            scores = np.concatenate([best_scores, block], axis=1)
+            if scores.shape[1] > k:
+                keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                idx = np.take_along_axis(idx, keep, axis=1)
+                scores = np.take_along_axis(scores, keep, axis=1)
+            best_idx, best_scores = idx, scores
+
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        best_idx = np.take_along_axis(best_idx, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        return (best_idx[0], best_scores[0]) if single else (best_idx, best_scores)
+
+
+def sample_queries(embeddings: np.ndarray, n: int = 200, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows of the matrix to use as queries, with their indices (to exclude self-matches)"""
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(embeddings), size=min(n, len(embeddings)), replace=False))
+    return np.asarray(embeddings[rows], dtype=np.float32), rows
+
+
+def recall_report(embeddings: np.ndarray, queries: np.ndarray, ks: Sequence[int] = (1, 5, 10),
+                  dtypes: Sequence[str] = ('float16', 'int8'), exclude: Optional[np.ndarray] = None) -> Dict:
+    """
+    Recall@k of reduced-precision search against exact float32 search
+
+    Args:
+        embeddings: float32 (rows, dim) matrix
+        queries: (n_queries, dim) query vectors
+        ks: Cut-offs to report
+        dtypes: Storage dtypes to compare
+        exclude: Optional row index per query to leave out of both rankings
+
+    Returns:
+        Dict with size, search time and recall@k per dtype
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    exact = QuantizedMatrix.from_float(embeddings, 'float32')
+    depth = max(ks)
+
+    start_time = time.perf_counter()
+    truth, _ = exact.top_k(queries, depth, exclude=exclude)
+    report = {
+        'rows': len(exact),
+        'queries': len(queries),
+        'float32': {'bytes': exact.nbytes,
+                    'search_ms': round((time.perf_counter() - start_time) * 1000 / max(len(queries), 1), 3)},
+    }
+
+    for dtype in dtypes:
+        matrix = QuantizedMatrix.from_float(embeddings, dtype)
+        start_time = time.perf_counter()
+        found, _ = matrix.top_k(queries, depth, exclude=exclude)
+        elapsed = time.perf_counter() - start_time
+        entry = {
+            'bytes': matrix.nbytes,
+            'size_ratio': round(matrix.nbytes / exact.nbytes, 3) if exact.nbytes else 0.0,
+            'search_ms': round(elapsed * 1000 / max(len(queries), 1), 3),
+        }
+        for k in ks:
+            k_eff = min(k, truth.shape[1])
+            hits = [len(set(a[:k_eff]) & set(b[:k_eff])) for a, b in zip(truth.tolist(), found.tolist())]
+            entry[f'recall@{k}'] = round(sum(hits) / (k_eff * len(hits)), 4) if hits and k_eff else 1.0
+        report[dtype] = entry
+    return report
+
+
+def main():
+    """Recall@k report of float16/int8 search against float32 for a saved embeddings directory"""
+    from api.embedding_store import EmbeddingBundle, bundle_path, has_bundle
+
+    parser = argparse.ArgumentParser(description="Reduced-precision recall report")
+    parser.add_argument("embeddings_dir", nargs="?", default="embeddings_output")
+    parser.add_argument("--queries", help="text file with one query per line (default: sample stored rows)")
+    parser.add_argument("--sample", type=int, default=200, help="rows sampled as queries without --queries")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--out", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    if has_bundle(args.embeddings_dir):
+        bundle = EmbeddingBundle(bundle_path(args.embeddings_dir))
+        if bundle.dtype != 'float32':
+            print(f"Warning: bundle is stored as {bundle.dtype}; the reference is its dequantized copy")
+        embeddings, model_name = bundle.embeddings, bundle.model_name or "all-mpnet-base-v2"
+        projection = bundle.projection
+    else:
+        embeddings = np.load(f"{args.embeddings_dir}/embeddings.npy", mmap_mode='r')
+        model_name, projection = "all-mpnet-base-v2", None
+
+    exclude = None
+    if args.queries:
+        from api.embedding_service import EmbeddingGenerator
+
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+        # Stored vectors may be projected; map the queries into the same space
+        queries = EmbeddingGenerator(model_name).generate_query_embeddings(texts, projection=projection)
+    else:
+        queries, exclude = sample_queries(embeddings, args.sample)
+
+    report = recall_report(embeddings, queries, ks=args.k, exclude=exclude)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
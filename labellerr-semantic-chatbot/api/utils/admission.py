@@ -0,0 +1,176 @@
+# api/utils/admission.py
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, name: str, status_code: int, retry_after: int, reason: str):
+        super().__init__(f"{name}: {reason}")
+        self.name = name
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Per-worker admission control for one endpoint.
+
+    Capacity is counted in units: a single request takes one, a batch takes
+    one per query (capped at `max_in_flight`, so any batch can run alone). At
+    most `max_in_flight` units run at once and queued requests are served
+    FIFO. The queue holds at most `max_queue` units, and no more than observed
+    latency says can start within `max_wait_s` (see queue_limit()); anything
+    beyond is rejected immediately: 429 when the queue is full, 503 when the
+    wait would be too long or a queued request times out. Latency is an EWMA
+    of how long a slot is held per query (a batch's time scaled by units per
+    query), which also sets Retry-After.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, max_wait_s: float,
+                 initial_latency_s: float = 1.0, ewma_alpha: float = 0.2):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+        self.ewma_alpha = ewma_alpha
+        self.latency_s = initial_latency_s
+
+        self._in_flight = 0
+        self._waiters = deque()  # (future, weight), FIFO
+        self._queued = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    def weight_of(self, weight: int) -> int:
+        """Units a request of this weight takes"""
+        return max(1, min(int(weight), self.max_in_flight))
+
+    def estimated_wait(self, units: Optional[int] = None) -> float:
+        """Estimate seconds until a request with `units` units queued ahead of or in it gets a slot"""
+        if units is None:
+            units = self._queued + 1
+        return self.latency_s * units / max(self.max_in_flight, 1)
+
+    def queue_limit(self) -> int:
+        """Queued units that can start within max_wait_s at the observed latency (at most max_queue)"""
+        startable = int(self.max_wait_s * max(self.max_in_flight, 1) / max(self.latency_s, 1e-6))
+        return min(self.max_queue, startable)
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.estimated_wait()))
+
+    def _reject(self, status_code: int, reason: str) -> AdmissionRejected:
+        self._rejected += 1
+        return AdmissionRejected(self.name, status_code, self._retry_after(), reason)
+
+    async def acquire(self, weight: int = 1) -> int:
+        """
+        Wait for slots or raise AdmissionRejected
+
+        Args:
+            weight: Queries in the request
+
+        Returns:
+            Units taken; pass them back to release()
+        """
+        units = self.weight_of(weight)
+        if self._in_flight + units <= self.max_in_flight and not self._waiters:
+            self._in_flight += units
+            self._admitted += 1
+            return units
+
+        if self._queued + units > self.max_queue:
+            raise self._reject(429, "queue full")
+
+        # Don't queue work that observed latency says cannot start in time
+        if self._queued + units > self.queue_limit():
+            raise self._reject(503, "estimated wait exceeds limit")
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (waiter, units)
+        self._waiters.append(entry)
+        self._queued += units
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait_s)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Slots were handed over just as we timed out; give them back
+                self.release(weight=units)
+            else:
+                waiter.cancel()
+            self._timed_out += 1
+            raise self._reject(503, "timed out waiting for a slot")
+        except asyncio.CancelledError:
+            # Client disconnected while queued
+            if waiter.done() and not waiter.cancelled():
+                self.release(weight=units)
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                self._queued -= units
+                # A large request leaving the head may unblock smaller ones behind it
+                self._grant()
+
+        self._admitted += 1
+        return units
+
+    def release(self, latency_s: Optional[float] = None, weight: int = 1):
+        """
+        Free a request's slots, hand them to waiters and record the latency
+
+        Args:
+            latency_s: Seconds a slot was held per query (see admit())
+            weight: Units acquire() returned
+        """
+        if latency_s is not None:
+            self.latency_s += self.ewma_alpha * (latency_s - self.latency_s)
+        self._in_flight -= weight
+        self._grant()
+
+    def _grant(self):
+        """Admit waiters in FIFO order while their units fit"""
+        while self._waiters:
+            waiter, units = self._waiters[0]
+            if not waiter.done() and self._in_flight + units > self.max_in_flight:
+                return
+            self._waiters.popleft()
+            self._queued -= units
+            if not waiter.done():
+                self._in_flight += units
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, weight: int = 1):
+        """Context manager that holds slots for the duration of the block"""
+        units = await self.acquire(weight)
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release((time.monotonic() - start_time) * units / max(weight, 1), weight=units)
+
+    def stats(self) -> Dict:
+        """Current admission counters for health/metrics reporting"""
+        return {
+            'in_flight': self._in_flight,
+            'queued': self._queued,
+            'max_in_flight': self.max_in_flight,
+            'max_queue': self.max_queue,
+            'queue_limit': self.queue_limit(),
+            'max_wait_s': self.max_wait_s,
+            'latency_ewma_ms': round(self.latency_s * 1000.0, 2),
+            'admitted': self._admitted,
+            'rejected': self._rejected,
+            'timed_out': self._timed_out,
+        }
@@ -0,0 +1,152 @@
+# api/utils/compression.py
+import zlib
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/x-ndjson", "text/", "application/javascript"
+)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}"""
+    codings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[name.strip().lower()] = q
+    return codings
+
+
+class _Encoder:
+    """Incremental gzip or brotli encoder"""
+
+    def __init__(self, coding: str, gzip_level: int, brotli_quality: int):
+        self.coding = coding
+        if coding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 -> gzip container
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        if self.coding == "br":
+            out = self._compressor.process(data)
+            return out + self._compressor.flush() if flush else out
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self) -> bytes:
+        if self.coding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli or gzip, negotiated via Accept-Encoding.
+
+    Single-body responses are compressed only above `minimum_size` bytes.
+    Streaming responses (e.g. NDJSON batch results) are compressed
+    incrementally and flushed after every chunk so items still arrive as soon
+    as they are produced. A strong ETag on a compressed response is weakened:
+    it names the identity bytes, not the encoded ones.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024,
+                 gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def choose_coding(self, accept_encoding: str) -> Optional[str]:
+        codings = parse_accept_encoding(accept_encoding)
+        if brotli is not None and codings.get("br", 0) > 0:
+            return "br"
+        if codings.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        coding = self.choose_coding(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, encoder, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if encoder is None:
+                headers = Headers(raw=start_message["headers"])
+                content_type = headers.get("content-type", "")
+                skip = (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                )
+                if skip:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                encoder = _Encoder(coding, self.gzip_level, self.brotli_quality)
+                mutable = MutableHeaders(raw=start_message["headers"])
+                mutable["Content-Encoding"] = coding
+                mutable.add_vary_header("Accept-Encoding")
+                etag = mutable.get("etag")
+                if etag and not etag.startswith("W/"):
+                    mutable["ETag"] = f"W/{etag}"
+
+                if not more_body:
+                    compressed = encoder.compress(body) + encoder.finish()
+                    mutable["Content-Length"] = str(len(compressed))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+                # Streaming: length is unknown once compressed
+                del mutable["Content-Length"]
+                await send(start_message)
+
+            if more_body:
+                chunk = encoder.compress(body, flush=True)
+            else:
+                chunk = encoder.compress(body) + encoder.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,122 @@
+# api/utils/pools.py
+import asyncio
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict
+
+from api.utils.admission import AdmissionRejected
+
+# Lower value runs first within a pool
+PRIORITY_INTERACTIVE = 0
+PRIORITY_CHAT = 1
+PRIORITY_BATCH = 2
+
+
+class BulkheadPool:
+    """
+    Fixed-size worker pool with its own bounded priority queue.
+
+    Each kind of work (e.g. embedding/search vs. LLM generation) gets its own
+    pool so that one kind can never occupy the other's threads. Inside a pool,
+    queued work is served by priority, then FIFO. When the queue is full new
+    work is rejected with a 503 instead of piling up.
+    """
+
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._stats = {
+            'submitted': 0, 'completed': 0, 'failed': 0, 'cancelled': 0, 'rejected': 0,
+            'queue_wait_s': 0.0, 'run_s': 0.0
+        }
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn: Callable, *args, priority: int = PRIORITY_CHAT, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) and return a concurrent Future for its result"""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._stats['rejected'] += 1
+                raise AdmissionRejected(self.name, 503, self._retry_after(), "pool queue full")
+            self._queued += 1
+            self._stats['submitted'] += 1
+
+        future = Future()
+        self._queue.put((priority, next(self._sequence), time.monotonic(), future, fn, args, kwargs))
+        return future
+
+    async def run(self, fn: Callable, *args, priority: int = PRIORITY_CHAT, **kwargs):
+        """Await fn(*args, **kwargs) executed on this pool"""
+        return await asyncio.wrap_future(self.submit(fn, *args, priority=priority, **kwargs))
+
+    def _worker(self):
+        while True:
+            _, _, queued_at, future, fn, args, kwargs = self._queue.get()
+            if fn is None:
+                return
+
+            started_at = time.monotonic()
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._stats['queue_wait_s'] += started_at - queued_at
+
+            # Skip work whose caller already gave up
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                    outcome = 'completed'
+                except BaseException as e:
+                    future.set_exception(e)
+                    outcome = 'failed'
+            else:
+                outcome = 'cancelled'
+
+            with self._lock:
+                self._active -= 1
+                self._stats[outcome] += 1
+                self._stats['run_s'] += time.monotonic() - started_at
+
+    def _retry_after(self) -> int:
+        finished = self._stats['completed'] + self._stats['failed'] + self._stats['cancelled']
+        avg_run_s = self._stats['run_s'] / finished if finished else 1.0
+        return max(1, int(avg_run_s * (self._queued + 1) / max(self.workers, 1)) + 1)
+
+    def shutdown(self):
+        """Stop workers after the queued work has drained"""
+        for _ in self._threads:
+            self._queue.put((float('inf'), next(self._sequence), 0.0, None, None, (), {}))
+
+    def stats(self) -> Dict:
+        """Pool sizing and counters for the metrics endpoint"""
+        with self._lock:
+            started = self._stats['submitted'] - self._queued
+            finished = self._stats['completed'] + self._stats['failed'] + self._stats['cancelled']
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'active': self._active,
+                'queued': self._queued,
+                'submitted': self._stats['submitted'],
+                'completed': self._stats['completed'],
+                'failed': self._stats['failed'],
+                'cancelled': self._stats['cancelled'],
+                'rejected': self._stats['rejected'],
+                'avg_queue_wait_ms': round(self._stats['queue_wait_s'] * 1000.0 / started, 2) if started else 0.0,
+                'avg_run_ms': round(self._stats['run_s'] * 1000.0 / finished, 2) if finished else 0.0,
+            }
@@ -0,0 +1,35 @@
+# api/utils/responses.py
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional dependency, fall back to the stdlib encoder
+    orjson = None
+
+
+def _orjson_default(obj: Any):
+    """Let orjson serialize pydantic models nested in plain containers"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response that skips FastAPI's jsonable_encoder round trip.
+
+    Pydantic models are serialized directly by pydantic-core; lists/dicts go
+    through orjson when it is installed. Return an instance of this class from
+    an endpoint so the response_model is only used for the OpenAPI schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        if orjson is not None:
+            return orjson.dumps(content, default=_orjson_default)
+        return super().render(jsonable_encoder(content))
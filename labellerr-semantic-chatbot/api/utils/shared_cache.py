@@ -0,0 +1,318 @@
+# api/utils/shared_cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+from api.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(kind: str, *parts: Any) -> str:
+    """
+    Build a shared-cache key. Callers pass everything the value depends on
+    (collection name + version, model names, normalized query, parameters)
+    so a reindex or model change naturally moves to fresh keys.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f"labellerr:{kind}:{digest}"
+
+
+class CacheBackend:
+    """Interface for shared cache backends (values are raw bytes)"""
+
+    name = "none"
+
+    def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def set(self, key: str, value: bytes, ttl_s: float):
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Process-local stand-in for a shared backend (single worker, development
+    and tests): same TTL semantics, nothing shared between processes.
+    """
+
+    name = "memory"
+
+    def __init__(self, purge_every: int = 1000):
+        self.purge_every = purge_every
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] < time.time():
+            return None
+        return entry[0]
+
+    def set(self, key: str, value: bytes, ttl_s: float):
+        with self._lock:
+            self._entries[key] = (bytes(value), time.time() + ttl_s)
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                now = time.time()
+                self._entries = {k: entry for k, entry in self._entries.items() if entry[1] >= now}
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Node-local cache shared by all uvicorn workers through one SQLite file
+    in WAL mode. Survives restarts; expired rows are purged opportunistically.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, purge_every: int = 1000):
+        self.path = path
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=2.0, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def set(self, key: str, value: bytes, ttl_s: float):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, sqlite3.Binary(value), time.time() + ttl_s)
+        )
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+        conn.commit()
+
+
+class RedisError(Exception):
+    pass
+
+
+class _RespConnection:
+    """Minimal RESP2 client connection (enough for GET/SET/AUTH/SELECT)"""
+
+    def __init__(self, host: str, port: int, password: Optional[str], db: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.reader = self.sock.makefile("rb")
+        if password:
+            self.command("AUTH", password)
+        if db:
+            self.command("SELECT", db)
+
+    def command(self, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode("utf-8")
+            elif isinstance(arg, int):
+                arg = str(arg).encode("ascii")
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self.sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise RedisError(rest.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            return self.reader.read(length + 2)[:-2]
+        if kind == b"*":
+            count = int(rest)
+            if count < 0:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise RedisError(f"unexpected reply type {kind!r}")
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cross-node cache over the Redis protocol (Redis, Valkey, KeyDB or any
+    local RESP-speaking stand-in). One connection per thread, reconnecting
+    after errors; no client library required.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = "redis://localhost:6379/0", timeout: float = 0.5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _call(self, *args):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _RespConnection(self.host, self.port, self.password, self.db, self.timeout)
+            self._local.conn = conn
+        try:
+            return conn.command(*args)
+        except (OSError, ConnectionError):
+            conn.close()
+            self._local.conn = None
+            raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._call("GET", key)
+
+    def set(self, key: str, value: bytes, ttl_s: float):
+        self._call("SET", key, value, "PX", max(int(ttl_s * 1000), 1))
+
+
+class TieredCache:
+    """
+    In-process LRU (L1) in front of an optional shared backend (L2).
+
+    Backend failures are logged and treated as misses: the cache must never
+    turn a working request into a failing one.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, l1_size: int = 1024,
+                 error_backoff_s: float = 5.0):
+        self.backend = backend or CacheBackend()
+        self.l1 = LRUCache(maxsize=l1_size)
+        self.error_backoff_s = error_backoff_s
+        self._backend_down_until = 0.0
+        self._l2_hits = 0
+        self._l2_errors = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        return self._get_shared(key)
+
+    def set(self, key: str, value: bytes, ttl_s: float):
+        self.l1.set(key, value)
+        self._set_shared(key, value, ttl_s)
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        """Like get(), but the shared lookup runs off the event loop"""
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        return await asyncio.to_thread(self._get_shared, key)
+
+    async def aset(self, key: str, value: bytes, ttl_s: float):
+        """Like set(), but the shared write runs off the event loop"""
+        self.l1.set(key, value)
+        await asyncio.to_thread(self._set_shared, key, value, ttl_s)
+
+    def _backend_failed(self, operation: str, error: Exception):
+        # Skip the backend for a while instead of paying a timeout on every request
+        self._l2_errors += 1
+        self._backend_down_until = time.monotonic() + self.error_backoff_s
+        logger.warning(f"Shared cache {operation} failed ({self.backend.name}): {error}")
+
+    def _get_shared(self, key: str) -> Optional[bytes]:
+        if time.monotonic() < self._backend_down_until:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            self._backend_failed("get", e)
+            return None
+        if value is not None:
+            self._l2_hits += 1
+            self.l1.set(key, value)
+        return value
+
+    def _set_shared(self, key: str, value: bytes, ttl_s: float):
+        if time.monotonic() < self._backend_down_until:
+            return
+        try:
+            self.backend.set(key, value, ttl_s)
+        except Exception as e:
+            self._backend_failed("set", e)
+
+    async def aget_json(self, key: str) -> Optional[Any]:
+        value = await self.aget(key)
+        return json.loads(value) if value is not None else None
+
+    async def aset_json(self, key: str, value: Any, ttl_s: float):
+        await self.aset(key, json.dumps(value, ensure_ascii=False).encode("utf-8"), ttl_s)
+
+    def get_vector(self, key: str) -> Optional[np.ndarray]:
+        value = self.get(key)
+        return np.frombuffer(value, dtype=np.float32) if value is not None else None
+
+    def set_vector(self, key: str, vector: np.ndarray, ttl_s: float):
+        self.set(key, np.asarray(vector, dtype=np.float32).tobytes(), ttl_s)
+
+    def clear_local(self):
+        self.l1.clear()
+
+    def stats(self) -> Dict:
+        return {
+            'backend': self.backend.name,
+            'l1': self.l1.stats(),
+            'l2_hits': self._l2_hits,
+            'l2_errors': self._l2_errors,
+        }
+
+
+def create_cache_backend(kind: str, sqlite_path: str = ".cache/shared_cache.db",
+                         redis_url: str = "redis://localhost:6379/0") -> CacheBackend:
+    """Build the configured shared cache backend ('sqlite', 'redis', 'memory' or 'none')"""
+    kind = (kind or "none").lower()
+    if kind == "memory":
+        return MemoryCacheBackend()
+    if kind == "sqlite":
+        return SQLiteCacheBackend(sqlite_path)
+    if kind == "redis":
+        return RedisCacheBackend(redis_url)
+    return CacheBackend()
@@ -0,0 +1,52 @@
+# api/utils/singleflight.py
+import asyncio
+import re
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a user query for use in coalescing/cache keys"""
+    return re.sub(r'\s+', ' ', query).strip().lower()
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work as its own task; callers that
+    arrive while it is running await the same task and receive the same result
+    (or exception). The work is shielded, so a disconnecting caller does not
+    cancel it for the others. Once it finishes the key is forgotten, so later
+    calls start fresh.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._executions = 0
+        self._coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._executions += 1
+            task.add_done_callback(lambda finished, key=key: self._forget(key, finished))
+        else:
+            self._coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict:
+        return {
+            'in_flight': len(self._inflight),
+            'executions': self._executions,
+            'coalesced': self._coalesced,
+        }
@@ -26,7 +26,59 @@ class Config:
     
     # Embedding settings
     EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'all-mpnet-base-v2')
-    MAX_CHUNK_SIZE = int(os.getenv('MAX_CHUNK_SIZE', 800))
-    CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', 100))
+    MAX_CHUNK_TOKENS = int(os.getenv('MAX_CHUNK_TOKENS', 0))  # 0 = model's max_seq_length
+    CHUNK_OVERLAP_TOKENS = int(os.getenv('CHUNK_OVERLAP_TOKENS', 48))
+    INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', 0))  # 0 = one per core, 1 = serial
+    BOILERPLATE_MIN_PAGES = int(os.getenv('BOILERPLATE_MIN_PAGES', 5))  # 0 = keep repeated lines/blocks
+    BOILERPLATE_MIN_SHARE = float(os.getenv('BOILERPLATE_MIN_SHARE', 0.1))
+    EMBEDDING_STORE_DTYPE = os.getenv('EMBEDDING_STORE_DTYPE', 'float32')  # float32 | float16 | int8
+    EMBEDDING_PROJECTION_DIM = int(os.getenv('EMBEDDING_PROJECTION_DIM', 0))  # 0 = store full-size vectors
+    EMBEDDING_PROJECTION_METHOD = os.getenv('EMBEDDING_PROJECTION_METHOD', 'pca')  # pca | truncate
+    
+    # Batch query settings
+    BATCH_MAX_QUERIES = int(os.getenv('BATCH_MAX_QUERIES', 256))
+    BATCH_RAG_CONCURRENCY = int(os.getenv('BATCH_RAG_CONCURRENCY', 4))
+    
+    # Admission control (per worker)
+    SEARCH_MAX_IN_FLIGHT = int(os.getenv('SEARCH_MAX_IN_FLIGHT', 16))
+    SEARCH_MAX_QUEUE = int(os.getenv('SEARCH_MAX_QUEUE', 32))
+    SEARCH_MAX_QUEUE_WAIT_S = float(os.getenv('SEARCH_MAX_QUEUE_WAIT_S', 0.5))
+    RAG_MAX_IN_FLIGHT = int(os.getenv('RAG_MAX_IN_FLIGHT', 8))
+    RAG_MAX_QUEUE = int(os.getenv('RAG_MAX_QUEUE', 16))
+    RAG_MAX_QUEUE_WAIT_S = float(os.getenv('RAG_MAX_QUEUE_WAIT_S', 2.0))
+    
+    # Execution pools (bulkheads): embedding/search vs. Gemini generation
+    RETRIEVAL_POOL_WORKERS = int(os.getenv('RETRIEVAL_POOL_WORKERS', 4))
+    RETRIEVAL_POOL_QUEUE = int(os.getenv('RETRIEVAL_POOL_QUEUE', 64))
+    GENERATION_POOL_WORKERS = int(os.getenv('GENERATION_POOL_WORKERS', 8))
+    GENERATION_POOL_QUEUE = int(os.getenv('GENERATION_POOL_QUEUE', 32))
+    
+    # Response compression
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+    
+    # Search result caching (keyed on collection version)
+    SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', 2048))
+    SEARCH_CACHE_MAX_AGE_S = int(os.getenv('SEARCH_CACHE_MAX_AGE_S', 60))
+    COLLECTION_VERSION_POLL_S = float(os.getenv('COLLECTION_VERSION_POLL_S', 5.0))
+    
+    # Shared cache tier for embeddings, search results and answers
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'sqlite')  # sqlite | redis | memory | none
+    CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', '.cache/shared_cache.db')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_EMBEDDING_TTL_S = int(os.getenv('CACHE_EMBEDDING_TTL_S', 7 * 24 * 3600))
+    CACHE_SEARCH_TTL_S = int(os.getenv('CACHE_SEARCH_TTL_S', 24 * 3600))
+    CACHE_ANSWER_TTL_S = int(os.getenv('CACHE_ANSWER_TTL_S', 3600))
+    
+    # Persistent document-embedding cache for the indexing pipeline
+    EMBEDDING_CACHE_DIR = os.getenv('EMBEDDING_CACHE_DIR', '.cache/embeddings')
+    EMBEDDING_WORKERS = int(os.getenv('EMBEDDING_WORKERS', 0))  # 0/1 = single process
+    EMBEDDING_THREADS_PER_WORKER = int(os.getenv('EMBEDDING_THREADS_PER_WORKER', 0))  # 0 = cores / workers
+    
+    # Bulk upload to Qdrant during indexing
+    QDRANT_UPLOAD_BATCH_SIZE = int(os.getenv('QDRANT_UPLOAD_BATCH_SIZE', 256))
+    QDRANT_UPLOAD_PARALLEL = int(os.getenv('QDRANT_UPLOAD_PARALLEL', 4))
+    QDRANT_UPLOAD_RETRIES = int(os.getenv('QDRANT_UPLOAD_RETRIES', 3))
 
 settings = Config()
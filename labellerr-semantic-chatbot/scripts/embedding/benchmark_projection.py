@@ -0,0 +1,145 @@
+# scripts/embedding/benchmark_projection.py
+"""
+Recall/latency trade-off of storing projected (PCA or truncated) vectors,
+per target dimension, on the real corpus.
+
+Recall@k is measured against exact full-dimension search. Brute-force
+latency is always reported; with --qdrant each dimension is also loaded
+into a temporary HNSW collection to measure what the API would see.
+
+    python scripts/embedding/benchmark_projection.py --embeddings embeddings_output --dims 128 256 384
+    python scripts/embedding/benchmark_projection.py --queries eval_queries.txt --qdrant
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, OptimizersConfigDiff, VectorParams
+
+from api.embedding_store import EmbeddingBundle, bundle_path, has_bundle
+from api.projection import Projection, projection_report
+from api.qdrant_service import enable_indexing, wait_until_indexed
+from api.quantization import QuantizedMatrix, sample_queries
+from config.settings import settings
+
+
+def load_embeddings(directory: str):
+    """(embeddings, model_name, projection already applied) from a bundle or the legacy embeddings.npy"""
+    if has_bundle(directory):
+        bundle = EmbeddingBundle(bundle_path(directory))
+        if bundle.projection is not None:
+            print(f"Warning: bundle is already projected to {bundle.dim} dims; "
+                  f"recall is measured against the projected vectors")
+        return bundle.embeddings, bundle.model_name or settings.EMBEDDING_MODEL, bundle.projection
+    return np.load(os.path.join(directory, "embeddings.npy"), mmap_mode='r'), settings.EMBEDDING_MODEL, None
+
+
+def qdrant_trade_off(client: QdrantClient, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray,
+                     ks, exclude) -> dict:
+    """Load vectors into a temporary HNSW collection and time/score the queries against it"""
+    name = f"projection_benchmark_{vectors.shape[1]}"
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=VectorParams(size=vectors.shape[1], distance=Distance.COSINE),
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=0)
+    )
+    try:
+        start_time = time.perf_counter()
+        client.upload_collection(name, vectors=vectors, ids=list(range(len(vectors))),
+                                 batch_size=settings.QDRANT_UPLOAD_BATCH_SIZE, parallel=settings.QDRANT_UPLOAD_PARALLEL,
+                                 max_retries=settings.QDRANT_UPLOAD_RETRIES, wait=True)
+        # Force an HNSW graph even for corpora below Qdrant's default indexing threshold
+        enable_indexing(client, name, indexing_threshold=1)
+        wait_until_indexed(client, name, expected_vectors=len(vectors))
+        load_s = time.perf_counter() - start_time
+
+        depth = max(ks)
+        latencies, found = [], []
+        for i, query in enumerate(queries):
+            start_time = time.perf_counter()
+            hits = client.search(collection_name=name, query_vector=query.tolist(), limit=depth + 1)
+            latencies.append((time.perf_counter() - start_time) * 1000.0)
+            ids = [hit.id for hit in hits if exclude is None or hit.id != exclude[i]]
+            found.append(ids[:depth])
+    finally:
+        client.delete_collection(name)
+
+    entry = {
+        'load_s': round(load_s, 2),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+    }
+    for k in ks:
+        hits = [len(set(a[:k]) & set(b[:k])) for a, b in zip(truth.tolist(), found)]
+        entry[f'recall@{k}'] = round(sum(hits) / (k * len(hits)), 4)
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latency per projected dimension")
+    parser.add_argument("--embeddings", default="embeddings_output", help="bundle or embeddings directory")
+    parser.add_argument("--dims", type=int, nargs="+", default=[128, 256, 384])
+    parser.add_argument("--method", choices=["pca", "truncate"], default=settings.EMBEDDING_PROJECTION_METHOD)
+    parser.add_argument("--queries", help="text file with one query per line (default: sample stored rows)")
+    parser.add_argument("--sample", type=int, default=200, help="rows sampled as queries without --queries")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--qdrant", action="store_true", help="also measure HNSW search in Qdrant")
+    parser.add_argument("--out", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    embeddings, model_name, stored_projection = load_embeddings(args.embeddings)
+    exclude = None
+    if args.queries:
+        from api.embedding_service import EmbeddingGenerator
+
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+        queries = EmbeddingGenerator(model_name).generate_query_embeddings(texts)
+        if stored_projection is not None:
+            queries = stored_projection.apply(queries)
+    else:
+        queries, exclude = sample_queries(embeddings, args.sample)
+    dims = [dim for dim in args.dims if dim < embeddings.shape[1]]
+    print(f"{len(embeddings)} vectors x {embeddings.shape[1]} dims, {len(queries)} queries, "
+          f"{args.method} to {dims}")
+
+    report = projection_report(embeddings, queries, dims, method=args.method, ks=args.k,
+                               exclude=exclude, model_name=model_name)
+
+    if args.qdrant:
+        client = QdrantClient(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT, timeout=600)
+        full = np.asarray(embeddings, dtype=np.float32)
+        truth, _ = QuantizedMatrix(full).top_k(queries, max(args.k), exclude=exclude)
+        report['full']['qdrant'] = qdrant_trade_off(client, full, queries, truth, args.k, exclude)
+        for dim in dims:
+            projection = Projection.fit(args.method, embeddings, dim, model_name)
+            report[dim]['qdrant'] = qdrant_trade_off(client, projection.apply(embeddings),
+                                                     projection.apply(queries), truth, args.k, exclude)
+
+    print(f"\n{'dim':>6} {'bytes':>7} {'energy':>7} {'brute ms':>9} "
+          + " ".join(f"{'R@' + str(k):>7}" for k in args.k)
+          + (f" {'hnsw p50':>9} {'hnsw p95':>9} " + " ".join(f"{'hR@' + str(k):>7}" for k in args.k)
+             if args.qdrant else ""))
+    for entry in report.values():
+        row = (f"{entry['dim']:>6} {entry['bytes_per_vector']:>7} {entry.get('explained_variance') or 1.0:>7.3f} "
+               f"{entry['search_ms']:>9.2f} " + " ".join(f"{entry.get(f'recall@{k}', 1.0):>7.3f}" for k in args.k))
+        if 'qdrant' in entry:
+            q = entry['qdrant']
+            row += f" {q['p50_ms']:>9.2f} {q['p95_ms']:>9.2f} " + " ".join(f"{q[f'recall@{k}']:>7.3f}" for k in args.k)
+        print(row)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({str(key): value for key, value in report.items()}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
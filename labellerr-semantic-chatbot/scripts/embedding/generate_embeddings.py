@@ -1,7 +1,12 @@
 import json
-import numpy as np
 import os
-from sentence_transformers import SentenceTransformer
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api.embedding_service import EmbeddingGenerator
+from api.embedding_store import bundle_path, write_bundle
+from api.projection import Projection
+from config.settings import settings
 
 def generate_embeddings():
     # Load processed chunks
@@ -10,33 +15,55 @@ def generate_embeddings():
     
     print(f"Loaded {len(chunks)} chunks")
     
-    # Initialize embedding model
-    model = SentenceTransformer("all-mpnet-base-v2")
-    print(f"Model loaded: {model}")
+    # Initialize embedding model; only texts missing from the embedding cache are encoded
+    embedder = EmbeddingGenerator("all-mpnet-base-v2")
+    embedder.enable_embedding_cache(settings.EMBEDDING_CACHE_DIR)
     
     # Extract texts for embedding
     texts = [chunk["text"] for chunk in chunks]
     
-    # Generate embeddings
-    print("Generating embeddings...")
-    embeddings = model.encode(texts, show_progress_bar=True, batch_size=32)
-    
     # Create output directory
     os.makedirs("../../embeddings_output", exist_ok=True)
+    # Workers write their rows straight into this memmap; the bundle is written from it
+    encoded_path = "../../embeddings_output/encoded.tmp.npy"
     
-    # Save embeddings and chunks
-    np.save("../../embeddings_output/embeddings.npy", embeddings)
+    try:
+        embedder.enable_multiprocess(settings.EMBEDDING_WORKERS, settings.EMBEDDING_THREADS_PER_WORKER)
+        
+        # Generate embeddings
+        print("Generating embeddings...")
+        # No batch_size: single-process runs let the length-bucket autotuner size batches
+        embeddings = embedder.generate_embeddings_batch(texts, out_path=encoded_path)
+    finally:
+        embedder.close()
     
-    with open("../../embeddings_output/chunks_with_metadata.json", "w", encoding="utf-8") as f:
-        json.dump(chunks, f, indent=2, ensure_ascii=False)
+    try:
+        # Optionally reduce the stored vectors; the projection is saved with the bundle
+        projection = None
+        if settings.EMBEDDING_PROJECTION_DIM:
+            projection = Projection.fit(settings.EMBEDDING_PROJECTION_METHOD, embeddings,
+                                        settings.EMBEDDING_PROJECTION_DIM, "all-mpnet-base-v2")
+            embeddings = projection.apply(embeddings)
+            print(f"Projected to {projection.dim} dims (explained variance {projection.explained_variance})")
+        
+        # Save embeddings and chunks as one memory-mappable bundle
+        manifest = write_bundle(bundle_path("../../embeddings_output"), chunks, embeddings, "all-mpnet-base-v2",
+                                dtype=settings.EMBEDDING_STORE_DTYPE, projection=projection)
+        dim = embeddings.shape[1]
+    finally:
+        del embeddings
+        os.remove(encoded_path)
     
     # Save metadata
     metadata = {
         "total_chunks": len(chunks),
         "embedding_model": "all-mpnet-base-v2", 
-        "embedding_dimension": embeddings.shape[1],
+        "embedding_dimension": dim,
+        "storage_dtype": manifest["dtype"],
         "source_distribution": {}
     }
+    if "recall" in manifest:
+        metadata["recall_vs_float32"] = manifest["recall"]
     
     for chunk in chunks:
         source = chunk.get("source_type", "unknown")
@@ -45,8 +72,8 @@ def generate_embeddings():
     with open("../../embeddings_output/embedding_metadata.json", "w", encoding="utf-8") as f:
         json.dump(metadata, f, indent=2)
     
-    print(f"✅ Saved {len(embeddings)} embeddings to embeddings_output/")
-    print(f"Embedding shape: {embeddings.shape}")
+    print(f"✅ Saved {len(chunks)} embeddings to embeddings_output/")
+    print(f"Embedding shape: ({len(chunks)}, {dim})")
     print(f"Metadata: {metadata}")
 
 if __name__ == "__main__":
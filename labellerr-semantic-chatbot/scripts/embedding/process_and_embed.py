@@ -1,19 +1,97 @@
+import os
 import re
+import sys
 import json
+import time
 import hashlib
-from typing import List, Dict, Any
-from bs4 import BeautifulSoup
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Iterator, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from scripts.processing.boilerplate import BoilerplateDetector
+from scripts.processing.chunker import TokenChunker, embedding_header
+from scripts.processing.html_text import sections_text
+from scripts.processing.json_stream import iter_json_records
+
+# File types whose JSON records can be split across worker processes
+JSON_FILE_TYPES = {'structured_documentation', 'blog_json', 'youtube_json', 'website_content'}
+
+# Raw inputs and how to parse each of them
+DEFAULT_FILE_CONFIG = {
+    'data/labellerr_documentation_complete.json': 'structured_documentation',
+    'data/documentation_complete_with_selenium.json': 'structured_documentation', 
+    'data/labellerr_docs_structured.json': 'structured_documentation',
+    'data/all_blog_posts_content.json': 'blog_json',
+    'data/youtube_videos_with_transcripts.json': 'youtube_json',
+    'data/all_documentation_text.txt': 'txt',
+    'data/docs_html_content.html': 'html',
+    'data/website_content_extracted.json': 'website_content'
+}
+
+_INLINE_SPACE_RE = re.compile(r'[^\S\n]+')
+_LINE_EDGE_RE = re.compile(r' ?\n ?')
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+# Processor copy of the current worker process (set by _init_worker)
+_worker_processor = None
+
+
+def _init_worker(processor: "DocumentProcessor"):
+    global _worker_processor
+    _worker_processor = processor
+
+
+def _process_task(task):
+    filepath, file_type, data = task
+    _worker_processor.chunker.reset_stats()
+    if _worker_processor.boilerplate is not None:
+        _worker_processor.boilerplate.reset_stats()
+    start_time = time.perf_counter()
+    try:
+        chunks = _worker_processor.process_file(filepath, file_type, data)
+        error = None
+    except Exception as e:
+        chunks, error = [], f"{type(e).__name__}: {e}"
+    strip_stats = _worker_processor.boilerplate.stats if _worker_processor.boilerplate is not None else None
+    return chunks, time.perf_counter() - start_time, _worker_processor.chunker.stats, strip_stats, error
+
 
 class DocumentProcessor:
-    def __init__(self, chunk_size=1000, chunk_overlap=200):
-        self.chunk_size = chunk_size
-        self.chunk_overlap = chunk_overlap
+    def __init__(self, model_name: str = "all-mpnet-base-v2", max_tokens: int = 0,
+                 overlap_tokens: int = 48, chunker: Optional[TokenChunker] = None,
+                 boilerplate_min_pages: int = 0, boilerplate_min_share: float = 0.1):
+        """
+        Args:
+            model_name: Embedding model the chunks are sized for
+            max_tokens: Cap on content tokens per chunk (0 = the model's sequence limit)
+            overlap_tokens: Tokens shared between consecutive chunks
+            chunker: Ready TokenChunker (overrides the three arguments above)
+            boilerplate_min_pages: Strip lines/blocks repeated on at least this many
+                                   pages of the JSON inputs (0 = off)
+            boilerplate_min_share: ...and on at least this share of those pages
+        """
+        self.chunker = chunker or TokenChunker.for_model(model_name, max_tokens=max_tokens,
+                                                         overlap_tokens=overlap_tokens)
+        self.boilerplate = None
+        if boilerplate_min_pages > 0:
+            self.boilerplate = BoilerplateDetector(boilerplate_min_pages, boilerplate_min_share)
 
     def clean_text(self, text: str) -> str:
         if not text:
             return ""
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
+        # Drop corpus-wide boilerplate while the line structure is still there
+        if self.boilerplate is not None and self.boilerplate.fitted:
+            text = self.boilerplate.strip(text)
+        # Collapse whitespace within lines only: line and paragraph breaks are
+        # where the chunker prefers to cut, and short lines before a blank line
+        # are its headings
+        text = _INLINE_SPACE_RE.sub(' ', text)
+        text = _LINE_EDGE_RE.sub('\n', text)
+        text = _BLANK_LINES_RE.sub('\n\n', text)
         # Remove navigation/footer/header
         text = re.sub(r'(Navigation|Footer|Header).*?(?=\n|$)', '', text, flags=re.IGNORECASE)
         return text.strip()
@@ -21,34 +99,126 @@ class DocumentProcessor:
     def chunk_text(self, text: str, url: str, title: str, source_type: str = "doc", heading: str = "") -> List[Dict]:
         if not text.strip():
             return []
-            
-        chunks = []
-        words = text.split()
         
-        for i in range(0, len(words), self.chunk_size - self.chunk_overlap):
-            chunk_words = words[i:i + self.chunk_size]
-            chunk_text = ' '.join(chunk_words)
-            
+        # The title/section header is embedded with every chunk, so it comes out of the token budget
+        pieces = self.chunker.chunk(text, header=embedding_header(title, heading))
+        chunks = []
+        for chunk_index, piece in enumerate(pieces):
             # Create unique chunk ID
-            chunk_id = hashlib.md5(f"{url}_{heading}_{i}_{source_type}".encode()).hexdigest()
+            chunk_id = hashlib.md5(f"{url}_{heading}_{chunk_index}_{source_type}".encode()).hexdigest()
             
             chunks.append({
                 'id': chunk_id,
-                'text': chunk_text,
+                'text': piece.text,
                 'url': url,
                 'title': title,
                 'heading': heading,
-                'chunk_index': i // (self.chunk_size - self.chunk_overlap),
+                'chunk_index': chunk_index,
+                'token_count': piece.tokens,
                 'source_type': source_type
             })
         
         return chunks
 
-    def load_json(self, filepath: str) -> Any:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    def iter_records(self, filepath: str, file_type: str) -> Iterator[Any]:
+        """
+        Stream the records of a JSON array or JSONL file without loading it whole.
+        Website dumps may wrap the array as {"pages": [...]}; other top-level
+        objects hold no records.
+        """
+        key = "pages" if file_type == "website_content" else None
+        return iter_json_records(filepath, key=key, object_as_record=False)
+
+    def iter_record_batches(self, filepath: str, file_type: str, batch_size: int) -> Iterator[List[Any]]:
+        records = self.iter_records(filepath, file_type)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return
+            yield batch
 
-    def process_structured_documentation_json(self, filepath: str) -> List[Dict]:
+    def page_text(self, maybe_html_or_text: str) -> str:
+        """Visible text of an HTML-like field, other text as is (not cleaned yet)"""
+        if not maybe_html_or_text:
+            return ""
+        if "<" in maybe_html_or_text and ">" in maybe_html_or_text:
+            # Headings and content blocks on lines of their own, blank lines between
+            return sections_text(maybe_html_or_text)
+        return maybe_html_or_text
+
+    @staticmethod
+    def website_body(entry: Dict) -> str:
+        """
+        Whole-page content of a website record. Scraped dumps keep the page as
+        flattened `text_content` (or only its `paragraphs`).
+        """
+        body = (
+            entry.get("text")
+            or entry.get("content")
+            or entry.get("body")
+            or entry.get("markdown")
+            or entry.get("html")
+            or entry.get("text_content")
+            or ""
+        )
+        if not body and isinstance(entry.get("paragraphs"), list):
+            body = "\n".join(p for p in entry["paragraphs"] if isinstance(p, str))
+        return body
+
+    def iter_page_texts(self, filepath: str, file_type: str) -> Iterator[str]:
+        """
+        Text of every page of an input, from the same fields its processor
+        chunks (a website page's sections are joined into one text; a txt or
+        html file is one page)
+        """
+        if file_type == "txt":
+            with open(filepath, 'r', encoding='utf-8') as f:
+                yield f.read()
+            return
+        if file_type == "html":
+            with open(filepath, 'r', encoding='utf-8') as f:
+                yield self.page_text(f.read())
+            return
+        for entry in self.iter_records(filepath, file_type):
+            if not isinstance(entry, dict):
+                continue
+            if file_type == "structured_documentation":
+                parts = [entry.get('content', '')]
+            elif file_type == "blog_json":
+                parts = [entry.get('content', entry.get('body', entry.get('text', '')))]
+            elif file_type == "youtube_json":
+                parts = [entry.get('transcript', entry.get('content', entry.get('text', '')))]
+            else:
+                sections = entry.get("sections") if isinstance(entry.get("sections"), list) else []
+                if sections:
+                    parts = [sec.get("text") or sec.get("content") or sec.get("html") or ""
+                             for sec in sections if isinstance(sec, dict)]
+                else:
+                    parts = [self.website_body(entry)]
+            yield "\n".join(self.page_text(part) for part in parts if isinstance(part, str))
+
+    def fit_boilerplate(self, file_config: Dict[str, str]):
+        """
+        First pass over the inputs: learn the lines/blocks/phrases repeated
+        across pages, so clean_text can strip them before chunking. Does nothing when
+        boilerplate stripping is off or the detector is already fitted.
+        """
+        if self.boilerplate is None or self.boilerplate.fitted:
+            return
+        start_time = time.perf_counter()
+        for filepath, file_type in file_config.items():
+            try:
+                for text in self.iter_page_texts(filepath, file_type):
+                    self.boilerplate.add_page(text)
+            except Exception as e:
+                print(f"Skipping {filepath} for boilerplate detection: {e}")
+        self.boilerplate.finalize()
+        report = self.boilerplate.report()
+        print(f"Boilerplate: {report['boilerplate_fingerprints']} repeated lines/blocks/phrases "
+              f"(on >= {report['threshold_pages']} of {report['pages']} pages) "
+              f"in {time.perf_counter() - start_time:.1f}s")
+
+    def process_structured_documentation_json(self, filepath: str, data: Any = None) -> List[Dict]:
         """
         Process your specific JSON structure:
         [
@@ -62,7 +232,7 @@ class DocumentProcessor:
           }
         ]
         """
-        data = self.load_json(filepath)
+        data = self.iter_records(filepath, "structured_documentation") if data is None else data
         all_chunks = []
         
         for entry in data:
@@ -108,28 +278,19 @@ class DocumentProcessor:
         
         return all_chunks
     
-    def process_website_content_json(self, filepath: str) -> List[Dict]:
+    def process_website_content_json(self, filepath: str, data: Any = None) -> List[Dict]:
         """
         Accepts flexible shapes like:
         1) [{"url": "...", "title": "...", "text"/"content"/"html": "...", "sections": [{"heading": "...", "text"/"html": "..."}]}]
         2) {"pages": [ ...same as above... ]}
         3) Any entry may carry "page_title", "level"
         """
-        data = self.load_json(filepath)
-        pages = data.get("pages") if isinstance(data, dict) else data
-        if not isinstance(pages, list):
-            return []
+        pages = self.iter_records(filepath, "website_content") if data is None else data
 
         all_chunks = []
 
         def extract_text(maybe_html_or_text: str) -> str:
-            if not maybe_html_or_text:
-                return ""
-            # If HTML-like, strip tags
-            if "<" in maybe_html_or_text and ">" in maybe_html_or_text:
-                soup = BeautifulSoup(maybe_html_or_text, "html.parser")
-                return self.clean_text(soup.get_text(separator=" ", strip=True))
-            return self.clean_text(maybe_html_or_text)
+            return self.clean_text(self.page_text(maybe_html_or_text))
 
         for entry in pages:
             if not isinstance(entry, dict):
@@ -140,15 +301,7 @@ class DocumentProcessor:
             level = int(entry.get("level", 2))
 
             # Whole-page content
-            raw_body = (
-                entry.get("text")
-                or entry.get("content")
-                or entry.get("body")
-                or entry.get("markdown")
-                or entry.get("html")
-                or ""
-            )
-            body = extract_text(raw_body)
+            body = extract_text(self.website_body(entry))
 
             # Sectioned content
             sections = entry.get("sections") if isinstance(entry.get("sections"), list) else []
@@ -198,66 +351,64 @@ class DocumentProcessor:
         return all_chunks
 
 
-    def process_blog_json_structured(self, filepath: str) -> List[Dict]:
+    def process_blog_json_structured(self, filepath: str, data: Any = None) -> List[Dict]:
         """
         Process blog JSON with similar structure or different structure
         """
-        data = self.load_json(filepath)
+        data = self.iter_records(filepath, "blog_json") if data is None else data
         all_chunks = []
         
-        # Handle if it's a list of blog posts
-        if isinstance(data, list):
-            for entry in data:
-                if isinstance(entry, dict):
-                    content = entry.get('content', entry.get('body', entry.get('text', '')))
-                    title = entry.get('title', entry.get('heading', ''))
-                    url = entry.get('url', entry.get('link', ''))
-                    
-                    if content.strip():
-                        cleaned_content = self.clean_text(content)
-                        chunks = self.chunk_text(
-                            text=cleaned_content,
-                            url=url,
-                            title=title,
-                            source_type="blog"
-                        )
-                        all_chunks.extend(chunks)
-        
+        # Blog posts, one record at a time
+        for entry in data:
+            if isinstance(entry, dict):
+                content = entry.get('content', entry.get('body', entry.get('text', '')))
+                title = entry.get('title', entry.get('heading', ''))
+                url = entry.get('url', entry.get('link', ''))
+                
+                if content.strip():
+                    cleaned_content = self.clean_text(content)
+                    chunks = self.chunk_text(
+                        text=cleaned_content,
+                        url=url,
+                        title=title,
+                        source_type="blog"
+                    )
+                    all_chunks.extend(chunks)
+    
         return all_chunks
 
-    def process_youtube_transcripts_structured(self, filepath: str) -> List[Dict]:
+    def process_youtube_transcripts_structured(self, filepath: str, data: Any = None) -> List[Dict]:
         """
         Process YouTube transcripts JSON
         """
-        data = self.load_json(filepath)
+        data = self.iter_records(filepath, "youtube_json") if data is None else data
         all_chunks = []
         
-        if isinstance(data, list):
-            for entry in data:
-                if isinstance(entry, dict):
-                    transcript = entry.get('transcript', entry.get('content', entry.get('text', '')))
-                    title = entry.get('title', '')
-                    url = entry.get('url', entry.get('video_url', ''))
-                    duration = entry.get('duration', '')
+        for entry in data:
+            if isinstance(entry, dict):
+                transcript = entry.get('transcript', entry.get('content', entry.get('text', '')))
+                title = entry.get('title', '')
+                url = entry.get('url', entry.get('video_url', ''))
+                duration = entry.get('duration', '')
+                
+                if transcript.strip():
+                    cleaned_transcript = self.clean_text(transcript)
+                    chunks = self.chunk_text(
+                        text=cleaned_transcript,
+                        url=url,
+                        title=f"Video: {title}",
+                        source_type="youtube"
+                    )
                     
-                    if transcript.strip():
-                        cleaned_transcript = self.clean_text(transcript)
-                        chunks = self.chunk_text(
-                            text=cleaned_transcript,
-                            url=url,
-                            title=f"Video: {title}",
-                            source_type="youtube"
-                        )
-                        
-                        # Add video metadata
-                        for chunk in chunks:
-                            chunk.update({
-                                'video_duration': duration,
-                                'video_title': title
-                            })
-                        
-                        all_chunks.extend(chunks)
-        
+                    # Add video metadata
+                    for chunk in chunks:
+                        chunk.update({
+                            'video_duration': duration,
+                            'video_title': title
+                        })
+                    
+                    all_chunks.extend(chunks)
+    
         return all_chunks
 
     def process_txt(self, filepath: str, default_url: str = '', default_title: str = '') -> List[Dict]:
@@ -281,8 +432,7 @@ class DocumentProcessor:
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        soup = BeautifulSoup(content, "html.parser")
-        text = soup.get_text(separator=' ', strip=True)
+        text = self.page_text(content)
         cleaned_text = self.clean_text(text)
         
         url = default_url or filepath
@@ -295,36 +445,139 @@ class DocumentProcessor:
             source_type="html"
         )
 
-    def process_all_files(self, file_config: Dict[str, str]) -> List[Dict]:
-        all_chunks = []
+    def process_file(self, filepath: str, file_type: str, data: Any = None) -> List[Dict]:
+        """
+        Dispatch one input file to the processor for its type
+
+        Args:
+            filepath: Input file
+            file_type: One of the DEFAULT_FILE_CONFIG types
+            data: Already-parsed records of a JSON file (or a shard of them);
+                  loaded from filepath when omitted
+        """
+        if file_type == "structured_documentation":
+            return self.process_structured_documentation_json(filepath, data)
+        elif file_type == "blog_json":
+            return self.process_blog_json_structured(filepath, data)
+        elif file_type == "youtube_json":
+            return self.process_youtube_transcripts_structured(filepath, data)
+        elif file_type == "txt":
+            return self.process_txt(filepath, filepath, f"Text File: {filepath}")
+        elif file_type == "html":
+            return self.process_html(filepath, filepath, f"HTML File: {filepath}")
+        elif file_type == "website_content":
+            return self.process_website_content_json(filepath, data)  # NEW
+        raise ValueError(f"Unknown file type: {file_type}")
+
+    def iter_file_chunks(self, filepath: str, file_type: str, batch_size: int = 100) -> Iterator[Dict]:
+        """Chunks of one file; JSON/JSONL records are streamed in batches instead of loading the file"""
+        if file_type not in JSON_FILE_TYPES:
+            yield from self.process_file(filepath, file_type)
+            return
+        for records in self.iter_record_batches(filepath, file_type, batch_size):
+            yield from self.process_file(filepath, file_type, records)
+
+    def iter_chunks(self, file_config: Dict[str, str]) -> Iterator[Dict]:
+        """
+        Yield chunks record batch by record batch, so memory stays flat however
+        large a file is (used by the streaming ingestion pipeline)
+        """
+        self.fit_boilerplate(file_config)
         for filepath, file_type in file_config.items():
             print(f"Processing {filepath} as {file_type}...")
+            count = 0
             try:
-                if file_type == "structured_documentation":
-                    chunks = self.process_structured_documentation_json(filepath)
-                elif file_type == "blog_json":
-                    chunks = self.process_blog_json_structured(filepath)
-                elif file_type == "youtube_json":
-                    chunks = self.process_youtube_transcripts_structured(filepath)
-                elif file_type == "txt":
-                    chunks = self.process_txt(filepath, filepath, f"Text File: {filepath}")
-                elif file_type == "html":
-                    chunks = self.process_html(filepath, filepath, f"HTML File: {filepath}")
-                elif file_type == "website_content":
-                    chunks = self.process_website_content_json(filepath)  # NEW
-                else:
-                    print(f"Unknown file type: {file_type} for {filepath}")
-                    continue
-
-                all_chunks.extend(chunks)
-                print(f"  -> Generated {len(chunks)} chunks from {filepath}")
+                for chunk in self.iter_file_chunks(filepath, file_type):
+                    count += 1
+                    yield chunk
+            except ValueError as e:
+                print(f"{e} for {filepath}")
+                continue
             except Exception as e:
                 print(f"Error processing {filepath}: {e}")
                 continue
+            print(f"  -> Generated {count} chunks from {filepath}")
+        print(f"Chunking stats: {self.chunker.stats}")
+        if self.boilerplate is not None:
+            print(f"Boilerplate stripped: {self.boilerplate.stats}")
+
+    def process_all_files(self, file_config: Dict[str, str], workers: int = 1,
+                          shard_size: int = 200) -> List[Dict]:
+        """
+        Process every file in file_config
+
+        Args:
+            file_config: {filepath: file_type}
+            workers: Worker processes (1 = serial in this process, 0 = one per core)
+            shard_size: Records per task when a JSON file is split across workers
+
+        Returns:
+            All chunks, in file_config order and record order within each file
+            (identical to the serial result). In parallel mode per-file timings
+            and errors are also kept in self.last_report.
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1:
+            return list(self.iter_chunks(file_config))
+
+        # Fitted here so every worker gets the same detector with the processor
+        self.fit_boilerplate(file_config)
+        start_time = time.perf_counter()
+        report = {filepath: {'file_type': file_type, 'tasks': 0, 'chunks': 0, 'seconds': 0.0, 'errors': []}
+                  for filepath, file_type in file_config.items()}
+        all_chunks = []
+
+        def collect(filepath, future):
+            chunks, seconds, stats, strip_stats, error = future.result()
+            entry = report[filepath]
+            entry['tasks'] += 1
+            entry['chunks'] += len(chunks)
+            entry['seconds'] += seconds
+            if error:
+                entry['errors'].append(error)
+            self.chunker.merge_stats(stats)
+            if strip_stats:
+                self.boilerplate.merge_stats(strip_stats)
+            all_chunks.extend(chunks)
+
+        print(f"Processing {len(file_config)} files on {workers} workers...")
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(self,)) as executor:
+            # Shards are read lazily and at most 2 per worker are in flight, so
+            # input memory stays flat; collecting in submission order keeps the
+            # merge deterministic
+            pending = deque()
+            for task in self._iter_tasks(file_config, shard_size, report):
+                pending.append((task[0], executor.submit(_process_task, task)))
+                if len(pending) >= 2 * workers:
+                    collect(*pending.popleft())
+            while pending:
+                collect(*pending.popleft())
+
+        for filepath, entry in report.items():
+            entry['seconds'] = round(entry['seconds'], 2)
+            status = f"FAILED ({'; '.join(entry['errors'])})" if entry['errors'] else "ok"
+            print(f"  {filepath}: {entry['chunks']} chunks from {entry['tasks']} tasks "
+                  f"in {entry['seconds']}s worker time - {status}")
+        print(f"Processed {len(all_chunks)} chunks in {time.perf_counter() - start_time:.1f}s")
+        print(f"Chunking stats: {self.chunker.stats}")
+        if self.boilerplate is not None:
+            print(f"Boilerplate stripped: {self.boilerplate.stats}")
+        self.last_report = report
         return all_chunks
 
-        
-        
+    def _iter_tasks(self, file_config: Dict[str, str], shard_size: int, report: Dict) -> Iterator[tuple]:
+        """(filepath, file_type, records) tasks; JSON files are streamed into record shards, others are one task"""
+        for filepath, file_type in file_config.items():
+            if file_type not in JSON_FILE_TYPES:
+                yield (filepath, file_type, None)
+                continue
+            try:
+                for records in self.iter_record_batches(filepath, file_type, shard_size):
+                    yield (filepath, file_type, records)
+            except Exception as e:
+                report[filepath]['errors'].append(f"{type(e).__name__}: {e}")
 
     def save_chunks(self, chunks: List[Dict], output_file: str = "processed_chunks.json"):
         """Save processed chunks to JSON file"""
@@ -342,7 +595,10 @@ class DocumentProcessor:
             "source_types": {},
             "avg_chunk_length": sum(len(chunk['text']) for chunk in chunks) / len(chunks),
             "urls_count": len(set(chunk['url'] for chunk in chunks)),
-            "sample_chunk": chunks[0] if chunks else None
+            "sample_chunk": chunks[0] if chunks else None,
+            "truncation": self.chunker.truncation_report(
+                [embedding_header(c.get('title', ''), c.get('heading', '')) + c['text'] for c in chunks]
+            )
         }
         
         # Count by source type
@@ -354,28 +610,24 @@ class DocumentProcessor:
 
 # Usage Example:
 if __name__ == "__main__":
-    processor = DocumentProcessor(chunk_size=800, chunk_overlap=100)
+    from config.settings import settings
+    processor = DocumentProcessor(settings.EMBEDDING_MODEL, max_tokens=settings.MAX_CHUNK_TOKENS,
+                                  overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+                                  boilerplate_min_pages=settings.BOILERPLATE_MIN_PAGES,
+                                  boilerplate_min_share=settings.BOILERPLATE_MIN_SHARE)
     
     # Define your files with the correct types based on your structure
-    files_to_process = {
-        'data/labellerr_documentation_complete.json': 'structured_documentation',
-        'data/documentation_complete_with_selenium.json': 'structured_documentation', 
-        'data/labellerr_docs_structured.json': 'structured_documentation',
-        'data/all_blog_posts_content.json': 'blog_json',
-        'data/youtube_videos_with_transcripts.json': 'youtube_json',
-        'data/all_documentation_text.txt': 'txt',
-        'data/docs_html_content.html': 'html',
-        'data/website_content_extracted.json': 'website_content'
-    }
+    files_to_process = DEFAULT_FILE_CONFIG
     
     # Process all files
-    all_chunks = processor.process_all_files(files_to_process)
+    all_chunks = processor.process_all_files(files_to_process, workers=settings.INGEST_WORKERS)
     
     # Get statistics
     stats = processor.get_summary_stats(all_chunks)
     print(f"\n=== Processing Summary ===")
     print(f"Total chunks: {stats['total_chunks']}")
     print(f"Average chunk length: {stats['avg_chunk_length']:.1f} characters")
+    print(f"Truncated by the encoder: {stats['truncation']['truncated_chunks']} chunks")
     print(f"Unique URLs: {stats['urls_count']}")
     print(f"Source distribution: {stats['source_types']}")
     
@@ -3,22 +3,67 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from api.qdrant_service import QdrantManager
+import numpy as np
+
+from api.qdrant_service import QdrantManager, fallback_chunk_id
 from api.embedding_service import EmbeddingGenerator
+from api.embedding_store import EmbeddingBundle, bundle_path, has_bundle
+from api.quantization import QuantizedMatrix
+
+EMBEDDINGS_DIR = "../../embeddings_output/"
+
+PROBE_QUERIES = [
+    "How to create a new project in Labellerr?",
+    "How do I export annotations?",
+]
+
+def sync_qdrant():
+    """Incrementally update the live collection: upsert only new/changed chunks"""
+    embedder = EmbeddingGenerator()
+    chunks, embeddings = embedder.load_embeddings_and_chunks(EMBEDDINGS_DIR)
+    embedded_with = (EmbeddingBundle(bundle_path(EMBEDDINGS_DIR)).model_name
+                     if has_bundle(EMBEDDINGS_DIR) else embedder.model_name)
+    
+    # The saved vectors were computed for exactly these chunks (and already projected)
+    stored_rows = {chunk.get('id') or fallback_chunk_id(chunk): i for i, chunk in enumerate(chunks)}
+    
+    def embed_chunks(changed):
+        if embedded_with == embedder.model_name:
+            rows = [stored_rows[chunk.get('id') or fallback_chunk_id(chunk)] for chunk in changed]
+            if isinstance(embeddings, QuantizedMatrix):
+                return embeddings.take(rows)  # only the changed rows are widened to float32
+            return np.asarray(embeddings[rows], dtype=np.float32)
+        # Saved with another model: re-encode, through the bundle's projection if it has one
+        encoded = embedder.generate_embeddings_batch(embedder.prepare_texts_from_chunks(changed))
+        return embedder.projection.apply(encoded) if embedder.projection is not None else encoded
+    
+    qdrant_manager = QdrantManager(host="localhost", port=6333)
+    report = qdrant_manager.sync_chunks(chunks, embed_chunks, embedding_model=embedder.model_name)
+    print(f"✅ Qdrant sync complete! {report}")
 
 def setup_qdrant():
     """Setup Qdrant with processed embeddings"""
     
     # Load embeddings
     embedder = EmbeddingGenerator()
-    chunks, embeddings = embedder.load_embeddings_and_chunks("../../embeddings_output/")
+    # Qdrant is sent float32 vectors for every chunk
+    chunks, embeddings = embedder.load_embeddings_and_chunks(EMBEDDINGS_DIR, dequantize=True)
     
-    # Setup Qdrant
+    # Setup Qdrant: build a new collection version, validate it, then switch the alias
     qdrant_manager = QdrantManager(host="localhost", port=6333)
-    qdrant_manager.create_collection(vector_size=embeddings.shape[1])
-    qdrant_manager.store_chunks_with_embeddings(chunks, embeddings)
+    probe_embeddings = embedder.generate_query_embeddings(PROBE_QUERIES)
+    
+    # Recorded with the new version; the API maps queries with it
+    report = qdrant_manager.rebuild_blue_green(chunks, embeddings, probe_embeddings=probe_embeddings,
+                                               projection=embedder.projection)
     
-    print("✅ Qdrant setup complete!")
+    if not report['ok']:
+        print(f"❌ Qdrant setup aborted, live collection unchanged: {report['errors']}")
+        return
+    print(f"✅ Qdrant setup complete! Live: {report['activated']} (rollback target: {report['previous']})")
 
 if __name__ == "__main__":
-    setup_qdrant()
+    if "--incremental" in sys.argv:
+        sync_qdrant()
+    else:
+        setup_qdrant()
@@ -0,0 +1,246 @@
+# scripts/embedding/stream_pipeline.py
+"""
+Streaming ingestion: raw files -> clean/chunk -> embed -> Qdrant.
+
+Stages run in their own threads connected by bounded queues. Encoding and
+uploading overlap, and at most `queue_size` batches wait between any two
+stages, so peak memory depends on the batch size, not on the corpus size.
+Nothing is materialized on disk except the optional JSONL tee of chunks.
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from api.embedding_service import EmbeddingGenerator
+from api.qdrant_service import QdrantManager, write_barrier
+from config.settings import settings
+from scripts.embedding.process_and_embed import DocumentProcessor, DEFAULT_FILE_CONFIG
+
+_DONE = object()
+
+
+class _Stopped(Exception):
+    """Raised inside a stage when another stage failed"""
+
+
+class StreamingIngestPipeline:
+    def __init__(self, processor: DocumentProcessor, embedder: EmbeddingGenerator,
+                 qdrant_manager: QdrantManager, batch_size: int = 64, queue_size: int = 4,
+                 upload_workers: int = settings.QDRANT_UPLOAD_PARALLEL,
+                 upload_retries: int = settings.QDRANT_UPLOAD_RETRIES):
+        """
+        Args:
+            processor: Loads, cleans and chunks raw files
+            embedder: Encodes chunk batches (uses its embedding cache if enabled)
+            qdrant_manager: Receives embedded batches
+            batch_size: Chunks per embed/upsert batch
+            queue_size: Max batches buffered between two stages
+            upload_workers: Concurrent upsert threads (writes are not awaited
+                            individually; one barrier at the end makes them visible)
+            upload_retries: Attempts per upsert batch before the run fails
+        """
+        self.processor = processor
+        self.embedder = embedder
+        self.qdrant_manager = qdrant_manager
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.upload_workers = upload_workers
+        self.upload_retries = upload_retries
+        self._lock = threading.Lock()
+
+    def run(self, file_config: Dict[str, str], collection_name: Optional[str] = None,
+            chunks_out: Optional[str] = None) -> Dict:
+        """
+        Stream every file in file_config into a collection
+
+        Args:
+            file_config: {filepath: file_type} as for DocumentProcessor.process_all_files
+            collection_name: Target collection (defaults to the manager's live collection)
+            chunks_out: Optional JSONL path receiving every stored chunk
+
+        Returns:
+            Stats dict (chunk/point counts, per-stage busy time, queue high-water marks).
+            'unique_points' is counted by Qdrant after the write barrier (chunks
+            sharing an id are one point), so it equals the points written when
+            the collection started empty.
+        """
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self._stats = {
+            'chunks': 0, 'batches': 0,
+            'chunk_s': 0.0, 'embed_s': 0.0, 'upload_s': 0.0,
+            'max_queued': {'chunks': 0, 'embedded': 0},
+        }
+        chunk_batches = queue.Queue(maxsize=self.queue_size)
+        embedded_batches = queue.Queue(maxsize=self.queue_size)
+        target = collection_name or self.qdrant_manager.collection_name
+        writer = open(chunks_out, 'w', encoding='utf-8') if chunks_out else None
+
+        stages = [
+            ("chunk", self._chunk_stage, (file_config, chunk_batches)),
+            ("embed", self._embed_stage, (chunk_batches, embedded_batches)),
+        ] + [
+            (f"upload-{i}", self._upload_stage, (embedded_batches, target, writer))
+            for i in range(self.upload_workers)
+        ]
+        threads = [
+            threading.Thread(target=self._guard, args=(name, fn, args), name=f"ingest-{name}", daemon=True)
+            for name, fn, args in stages
+        ]
+        start_time = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if writer:
+            writer.close()
+
+        if self._errors:
+            raise self._errors[0]
+
+        barrier_start = time.perf_counter()
+        write_barrier(self.qdrant_manager.client, target)
+        self._stats['barrier_s'] = round(time.perf_counter() - barrier_start, 2)
+
+        # Qdrant already deduplicates ids; counting there keeps memory flat however large the corpus
+        self._stats['unique_points'] = self.qdrant_manager.client.count(collection_name=target, exact=True).count
+        self._stats['elapsed_s'] = round(time.perf_counter() - start_time, 2)
+        for key in ('chunk_s', 'embed_s', 'upload_s'):
+            self._stats[key] = round(self._stats[key], 2)
+        return self._stats
+
+    def _guard(self, name: str, fn, args):
+        try:
+            fn(*args)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            print(f"Ingestion stage '{name}' failed: {e}")
+            self._errors.append(e)
+            self._stop.set()
+
+    def _put(self, q: queue.Queue, item, label: Optional[str] = None):
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                q.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            if label:
+                self._stats['max_queued'][label] = max(self._stats['max_queued'][label], q.qsize())
+            return
+
+    def _get(self, q: queue.Queue):
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _chunk_stage(self, file_config: Dict[str, str], out: queue.Queue):
+        batch = []
+        busy_since = time.perf_counter()
+        for chunk in self.processor.iter_chunks(file_config):
+            batch.append(chunk)
+            if len(batch) >= self.batch_size:
+                self._stats['chunk_s'] += time.perf_counter() - busy_since
+                self._put(out, batch, 'chunks')
+                batch = []
+                busy_since = time.perf_counter()
+        if batch:
+            self._stats['chunk_s'] += time.perf_counter() - busy_since
+            self._put(out, batch, 'chunks')
+        self._put(out, _DONE)
+
+    def _embed_stage(self, inp: queue.Queue, out: queue.Queue):
+        while True:
+            batch = self._get(inp)
+            if batch is _DONE:
+                for _ in range(self.upload_workers):
+                    self._put(out, _DONE)
+                return
+            start_time = time.perf_counter()
+            texts = self.embedder.prepare_texts_from_chunks(batch)
+            embeddings = self.embedder.generate_embeddings_batch(texts, self.batch_size, verbose=False)
+            self._stats['embed_s'] += time.perf_counter() - start_time
+            self._put(out, (batch, embeddings), 'embedded')
+
+    def _upload_stage(self, inp: queue.Queue, collection_name: str, writer):
+        while True:
+            item = self._get(inp)
+            if item is _DONE:
+                return
+            batch, embeddings = item
+            start_time = time.perf_counter()
+            self._upsert_with_retry(batch, embeddings, collection_name)
+            elapsed = time.perf_counter() - start_time
+
+            lines = [json.dumps(chunk, ensure_ascii=False) + "\n" for chunk in batch] if writer else []
+            with self._lock:
+                self._stats['upload_s'] += elapsed
+                self._stats['chunks'] += len(batch)
+                self._stats['batches'] += 1
+                if writer:
+                    writer.writelines(lines)
+                if self._stats['batches'] % 10 == 0:
+                    print(f"Stored {self._stats['chunks']} chunks ({self._stats['batches']} batches)")
+
+    def _upsert_with_retry(self, batch: List[Dict], embeddings, collection_name: str) -> List[str]:
+        max_retries = max(1, self.upload_retries)
+        for attempt in range(max_retries):
+            try:
+                return self.qdrant_manager.upsert_chunks(
+                    batch, embeddings, collection_name=collection_name,
+                    embedding_model=self.embedder.model_name, wait=False
+                )
+            except Exception as e:
+                if attempt == max_retries - 1:
+                    raise
+                print(f"Upsert of {len(batch)} chunks failed ({e}), retrying...")
+                time.sleep(0.5 * 2 ** attempt)
+
+
+def main():
+    """Blue/green rebuild of the knowledge base straight from the raw files"""
+    processor = DocumentProcessor(settings.EMBEDDING_MODEL, max_tokens=settings.MAX_CHUNK_TOKENS,
+                                  overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+                                  boilerplate_min_pages=settings.BOILERPLATE_MIN_PAGES,
+                                  boilerplate_min_share=settings.BOILERPLATE_MIN_SHARE)
+    embedder = EmbeddingGenerator(settings.EMBEDDING_MODEL)
+    embedder.enable_embedding_cache(settings.EMBEDDING_CACHE_DIR)
+    qdrant_manager = QdrantManager(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT,
+                                   api_key=settings.QDRANT_API_KEY)
+
+    # HNSW construction is deferred until every point is loaded
+    staging = qdrant_manager.create_versioned_collection(vector_size=embedder.embedding_dim,
+                                                         defer_indexing=True)
+    pipeline = StreamingIngestPipeline(processor, embedder, qdrant_manager,
+                                       upload_workers=settings.QDRANT_UPLOAD_PARALLEL,
+                                       upload_retries=settings.QDRANT_UPLOAD_RETRIES)
+    try:
+        stats = pipeline.run(DEFAULT_FILE_CONFIG, collection_name=staging,
+                             chunks_out="processed_chunks_ready_for_qdrant.jsonl")
+        stats['index_s'] = round(qdrant_manager.finish_bulk_load(
+            staging, expected_vectors=stats['unique_points']), 2)
+    except BaseException:
+        qdrant_manager.client.delete_collection(collection_name=staging)
+        raise
+    print(f"Ingestion stats: {stats}")
+
+    probe_embeddings = embedder.generate_query_embeddings(["How to create a new project in Labellerr?"])
+    report = qdrant_manager.activate_if_valid(staging, stats['unique_points'],
+                                              probe_embeddings=probe_embeddings)
+    print(f"Activation report: {report}")
+
+
+if __name__ == "__main__":
+    main()
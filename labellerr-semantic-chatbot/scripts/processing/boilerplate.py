@@ -0,0 +1,248 @@
+# scripts/processing/boilerplate.py
+"""
+Corpus-wide detection of repeated page chrome (menus, footers, cookie
+banners, CTA blocks) that survives HTML cleanup.
+
+Every page is split into normalized lines, and three kinds of fingerprints
+are counted once per page:
+  - blocks: runs of `window` consecutive lines (the page start and end
+    count as lines), so a short line such as "Pricing" only counts as
+    boilerplate together with its neighbours,
+  - long lines (>= min_line_chars) on their own, for banners and legal
+    text that sit between changing content,
+  - word shingles (`shingle` consecutive words) inside lines of at least
+    flat_line_words words, for pages flattened to one line (scraped
+    `text_content`, transcripts) where the menu is not a line of its own.
+A fingerprint seen on at least min_pages pages and min_share of all pages
+is boilerplate; strip() cuts every span it covers.
+
+Fingerprints are stable 64-bit hashes, so a fitted detector can be pickled
+to worker processes and reused there.
+
+    python scripts/processing/boilerplate.py data/website_content_extracted.json --type website_content
+"""
+import hashlib
+import math
+import os
+import re
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_DIGITS_RE = re.compile(r'\d+')
+_SPACE_RE = re.compile(r'\s+')
+_LINE_RE = re.compile(r'[^\n]+')
+_WORD_RE = re.compile(r'\S+')
+
+
+def normalize_line(line: str) -> str:
+    """Case-, whitespace- and number-insensitive form of a line ('' if blank)"""
+    return _SPACE_RE.sub(' ', _DIGITS_RE.sub('0', line.lower())).strip()
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+
+_PAGE_START = _digest(b'\x00page start')
+_PAGE_END = _digest(b'\x00page end')
+
+
+def _merge(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class BoilerplateDetector:
+    """
+    Learns which lines/blocks/phrases repeat across the pages of a corpus and strips them.
+
+    Args:
+        min_pages: Pages a fingerprint must appear on to count as boilerplate
+        min_share: Share of all pages it must appear on as well
+        window: Consecutive lines per block fingerprint
+        min_line_chars: Lines at least this long are also fingerprinted alone
+        shingle: Words per shingle fingerprint
+        flat_line_words: Lines with at least this many words are also shingled
+    """
+
+    def __init__(self, min_pages: int = 5, min_share: float = 0.1, window: int = 3,
+                 min_line_chars: int = 40, shingle: int = 8, flat_line_words: int = 40):
+        if window < 1 or shingle < 1:
+            raise ValueError("window and shingle must be at least 1")
+        self.min_pages = min_pages
+        self.min_share = min_share
+        self.window = window
+        self.min_line_chars = min_line_chars
+        self.shingle = shingle
+        self.flat_line_words = flat_line_words
+        self.pages = 0
+        self.threshold = 0
+        self.blocks: Optional[frozenset] = None
+        self._seen: List[np.ndarray] = []
+        self.reset_stats()
+
+    @property
+    def fitted(self) -> bool:
+        return self.blocks is not None
+
+    def reset_stats(self):
+        self.stats = {'texts': 0, 'chars': 0, 'removed_spans': 0, 'removed_chars': 0}
+
+    def merge_stats(self, stats: Dict):
+        """Fold in the stats of another detector (e.g. one in a worker process)"""
+        for key, value in stats.items():
+            self.stats[key] += value
+
+    def _fingerprints(self, text: str) -> Iterable[Tuple[int, int, int]]:
+        """(fingerprint, start, end) character span of every block, long line and shingle"""
+        lines = []
+        for match in _LINE_RE.finditer(text):
+            normalized = normalize_line(match.group())
+            if normalized:
+                lines.append((normalized, match.start(), match.end()))
+        if not lines:
+            return
+
+        digests = [_digest(normalized.encode('utf-8')) for normalized, _, _ in lines]
+        # Page start/end markers let a short header or footer form a block of its own
+        framed = [_PAGE_START] + digests + [_PAGE_END]
+        span = min(self.window, len(framed))
+        for i in range(len(framed) - span + 1):
+            first, last = max(i - 1, 0), min(i + span - 2, len(lines) - 1)
+            if first > last:
+                continue
+            block = _digest(b'block' + b''.join(framed[i:i + span]))
+            yield int.from_bytes(block, 'little'), lines[first][1], lines[last][2]
+
+        for (normalized, start, end), digest in zip(lines, digests):
+            if len(normalized) >= self.min_line_chars:
+                yield int.from_bytes(digest, 'little'), start, end
+            if normalized.count(' ') + 1 < self.flat_line_words:
+                continue
+            words = [(normalize_line(m.group()), m.start(), m.end())
+                     for m in _WORD_RE.finditer(text, start, end)]
+            for i in range(len(words) - self.shingle + 1):
+                phrase = ' '.join(word for word, _, _ in words[i:i + self.shingle])
+                shingle = _digest(b'words' + phrase.encode('utf-8'))
+                yield int.from_bytes(shingle, 'little'), words[i][1], words[i + self.shingle - 1][2]
+
+    def add_page(self, text: str):
+        """Count the fingerprints of one page (each at most once)"""
+        if self.fitted:
+            raise RuntimeError("Detector is already fitted")
+        self.pages += 1
+        unique = {fingerprint for fingerprint, _, _ in self._fingerprints(text or "")}
+        if unique:
+            self._seen.append(np.fromiter(unique, dtype=np.uint64, count=len(unique)))
+
+    def finalize(self) -> "BoilerplateDetector":
+        """Select the fingerprints above the thresholds and drop the counts"""
+        self.threshold = max(self.min_pages, math.ceil(self.min_share * self.pages), 2)
+        if self._seen:
+            fingerprints, counts = np.unique(np.concatenate(self._seen), return_counts=True)
+            self.blocks = frozenset(fingerprints[counts >= self.threshold].tolist())
+        else:
+            self.blocks = frozenset()
+        self._seen = []
+        return self
+
+    def fit(self, texts: Iterable[str]) -> "BoilerplateDetector":
+        """Count every page of texts and finalize"""
+        for text in texts:
+            self.add_page(text)
+        return self.finalize()
+
+    def boilerplate_spans(self, text: str) -> List[Tuple[int, int]]:
+        """Merged (start, end) character spans of text covered by boilerplate fingerprints"""
+        if not text or not self.blocks:
+            return []
+        return _merge([(start, end) for fingerprint, start, end in self._fingerprints(text)
+                       if fingerprint in self.blocks])
+
+    def strip(self, text: str) -> str:
+        """
+        Cut the spans covered by boilerplate fingerprints
+
+        Args:
+            text: Page or section text, with its line breaks if it has any
+
+        Returns:
+            The remaining text: whole boilerplate lines are dropped with their
+            line break, a cut across lines leaves one line break. Unchanged if
+            nothing matched.
+        """
+        if not text or not self.blocks:
+            return text
+        self.stats['texts'] += 1
+        self.stats['chars'] += len(text)
+        spans = self.boilerplate_spans(text)
+        if not spans:
+            return text
+
+        pieces, pos = [], 0
+        for start, end in spans:
+            line_start = start == 0 or text[start - 1] == '\n'
+            line_end = end == len(text) or text[end] == '\n'
+            if line_start and line_end:
+                end = min(end + 1, len(text))  # whole lines: take their line break too
+                separator = ''
+            else:
+                separator = '\n' if '\n' in text[start:end] else ' '
+            pieces.append(text[pos:start])
+            pieces.append(separator)
+            self.stats['removed_spans'] += 1
+            self.stats['removed_chars'] += end - start
+            pos = end
+        pieces.append(text[pos:])
+        return ''.join(pieces)
+
+    def report(self) -> Dict:
+        return {
+            'pages': self.pages,
+            'threshold_pages': self.threshold,
+            'boilerplate_fingerprints': len(self.blocks or ()),
+            **self.stats,
+        }
+
+
+def main():
+    """Show what would be stripped from the ingest inputs"""
+    import argparse
+
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from scripts.embedding.process_and_embed import DocumentProcessor
+
+    parser = argparse.ArgumentParser(description="Corpus-wide boilerplate report")
+    parser.add_argument("paths", nargs="+", help="ingest files (all of the same --type)")
+    parser.add_argument("--type", default="website_content", help="file type as in DEFAULT_FILE_CONFIG")
+    parser.add_argument("--min-pages", type=int, default=5)
+    parser.add_argument("--min-share", type=float, default=0.1)
+    parser.add_argument("--show", type=int, default=20, help="stripped spans to print")
+    args = parser.parse_args()
+
+    file_config = {path: args.type for path in args.paths}
+    processor = DocumentProcessor(boilerplate_min_pages=args.min_pages, boilerplate_min_share=args.min_share)
+    processor.fit_boilerplate(file_config)
+    detector = processor.boilerplate
+
+    removed = {}
+    for path in args.paths:
+        for text in processor.iter_page_texts(path, args.type):
+            detector.strip(text)
+            for start, end in detector.boilerplate_spans(text):
+                span = normalize_line(text[start:end])
+                removed[span] = removed.get(span, 0) + 1
+    print(detector.report())
+    for span, count in sorted(removed.items(), key=lambda item: -item[1])[:args.show]:
+        print(f"{count:>6}  {span[:120]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+# scripts/processing/chunker.py
+"""
+Shared chunker that sizes chunks in the embedding model's own tokens.
+
+Chunks never exceed what the encoder actually reads (max_seq_length minus
+special tokens minus any header prepended at embedding time), so no stored
+text is silently truncated away. Cuts prefer heading, then paragraph, then
+sentence boundaries; overlap restarts at a sentence start.
+
+Each document is tokenized once with offsets and chunks are slices of the
+original string, so chunking is a single pass with no re-joining of words.
+
+    python scripts/processing/chunker.py embeddings_output
+"""
+import bisect
+import os
+import re
+import sys
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Sequence limits from the models' sentence_bert_config.json (the tokenizer
+# config usually reports the underlying transformer's 512 instead)
+KNOWN_MAX_SEQ_LENGTH = {
+    'all-mpnet-base-v2': 384,
+    'all-MiniLM-L6-v2': 256,
+    'all-MiniLM-L12-v2': 256,
+    'multi-qa-mpnet-base-dot-v1': 512,
+}
+
+# Break strengths, for a cut placed before a given token
+SENTENCE, PARAGRAPH, HEADING = 1, 2, 3
+
+_SENTENCE_RE = re.compile(r'[.!?]["\')\]]*\s+|\n')
+_PARAGRAPH_RE = re.compile(r'\n[ \t]*\n\s*')
+# Markdown headings, or a short unpunctuated line followed by a blank line
+_HEADING_RE = re.compile(r'^(?:#{1,6}[ \t]+(.+?)[ \t]*$|([^\n.!?:;,]{2,80}?)[ \t]*\n(?=[ \t]*\n))', re.M)
+# Fallback token estimate: short words are one word piece, longer ones several
+_ESTIMATE_RE = re.compile(r'\w{1,6}|[^\w\s]')
+
+
+def _starts_word(text: str, char_pos: int) -> bool:
+    return char_pos == 0 or text[char_pos - 1].isspace()
+
+
+class Chunk(NamedTuple):
+    text: str
+    start_char: int
+    end_char: int
+    tokens: int
+    heading: str
+
+
+def load_tokenizer(model_name: str):
+    """Fast HuggingFace tokenizer of a sentence-transformers model, or None if transformers is unavailable"""
+    try:
+        from transformers import AutoTokenizer
+    except ImportError:
+        return None
+    repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    return AutoTokenizer.from_pretrained(repo, use_fast=True)
+
+
+class TokenChunker:
+    """
+    Split text into chunks of at most `max_tokens` model tokens.
+
+    Without a tokenizer (transformers not installed) token counts are
+    estimated from word pieces; the estimate errs on the long side.
+    """
+
+    def __init__(self, tokenizer=None, max_seq_length: int = 384, max_tokens: int = 0,
+                 overlap_tokens: int = 48, min_fill: float = 0.5):
+        """
+        Args:
+            tokenizer: Fast HuggingFace tokenizer (must support offset mapping)
+            max_seq_length: Tokens the encoder reads, special tokens included
+            max_tokens: Cap on content tokens per chunk (0 = everything the encoder reads)
+            overlap_tokens: Tokens repeated from the end of the previous chunk
+            min_fill: Share of the budget a chunk must reach before a boundary
+                      may end it early
+        """
+        self.tokenizer = tokenizer
+        self.max_seq_length = max_seq_length
+        if tokenizer is not None:
+            self.special_tokens = len(tokenizer("", add_special_tokens=True)["input_ids"])
+        else:
+            self.special_tokens = 2
+        limit = max_seq_length - self.special_tokens
+        self.max_tokens = min(max_tokens, limit) if max_tokens else limit
+        self.overlap_tokens = min(overlap_tokens, self.max_tokens // 2)
+        self.min_fill = min_fill
+        self.reset_stats()
+
+    @classmethod
+    def for_model(cls, model_name: str, **kwargs) -> "TokenChunker":
+        """Chunker for a sentence-transformers model name"""
+        tokenizer = load_tokenizer(model_name)
+        if tokenizer is None:
+            print(f"transformers not installed; estimating {model_name} token counts")
+        max_seq_length = KNOWN_MAX_SEQ_LENGTH.get(model_name.split("/")[-1])
+        if max_seq_length is None:
+            max_seq_length = min(getattr(tokenizer, "model_max_length", 512), 512)
+        return cls(tokenizer, max_seq_length=max_seq_length, **kwargs)
+
+    @classmethod
+    def from_model(cls, model, **kwargs) -> "TokenChunker":
+        """Chunker sharing a loaded SentenceTransformer's tokenizer and sequence limit"""
+        return cls(model.tokenizer, max_seq_length=model.max_seq_length, **kwargs)
+
+    def reset_stats(self):
+        self.stats = {'documents': 0, 'chunks': 0, 'tokens': 0, 'max_chunk_tokens': 0,
+                      'hard_splits': 0, 'oversized_headers': 0}
+
+    def merge_stats(self, stats: Dict):
+        """Fold in the stats of another chunker (e.g. one in a worker process)"""
+        for key, value in stats.items():
+            if key == 'max_chunk_tokens':
+                self.stats[key] = max(self.stats[key], value)
+            else:
+                self.stats[key] += value
+
+    def token_offsets(self, text: str) -> List[Tuple[int, int]]:
+        """(start, end) character span of every content token of text"""
+        if self.tokenizer is None:
+            return [match.span() for match in _ESTIMATE_RE.finditer(text)]
+        encoded = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True,
+                                 return_attention_mask=False, verbose=False)
+        return [span for span in encoded["offset_mapping"] if span[1] > span[0]]
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.token_offsets(text)) if text else 0
+
+    def chunk(self, text: str, header: str = "") -> List[Chunk]:
+        """
+        Split one document
+
+        Args:
+            text: Document text
+            header: Text prepended to every chunk at embedding time (its tokens
+                    are taken out of the budget)
+
+        Returns:
+            Chunks in document order
+        """
+        offsets = self.token_offsets(text)
+        self.stats['documents'] += 1
+        if not offsets:
+            return []
+
+        budget = self.max_tokens - self.count_tokens(header)
+        if budget < max(16, self.max_tokens // 4):
+            # Header leaves almost no room: the header is truncated instead of the content
+            self.stats['oversized_headers'] += 1
+            budget = max(16, self.max_tokens // 4)
+        overlap = min(self.overlap_tokens, budget // 2)
+
+        starts = [start for start, _ in offsets]
+        strength = self._break_strengths(text, starts)
+        # breaks[level]: sorted token indices with a break at least that strong
+        breaks = {level: sorted(i for i, s in strength.items() if s >= level)
+                  for level in (SENTENCE, PARAGRAPH, HEADING)}
+        headings = self._headings(text, starts)
+        heading_at = [i for i, _ in headings]
+
+        chunks = []
+        n = len(offsets)
+        start = 0
+        while start < n:
+            limit = start + budget
+            if limit >= n:
+                end = n
+            else:
+                end = self._best_break(breaks, start + int(budget * self.min_fill), limit)
+                if end is None:
+                    # No boundary in reach: cut between words, mid-word only as a last resort
+                    end = limit
+                    while end > start + 1 and not _starts_word(text, offsets[end][0]):
+                        end -= 1
+                    if end == start + 1:
+                        end = limit
+                    self.stats['hard_splits'] += 1
+
+            h = bisect.bisect_right(heading_at, start) - 1
+            start_char, end_char = offsets[start][0], offsets[end - 1][1]
+            chunks.append(Chunk(text[start_char:end_char], start_char, end_char, end - start,
+                                headings[h][1] if h >= 0 else ""))
+            self.stats['max_chunk_tokens'] = max(self.stats['max_chunk_tokens'], end - start)
+            self.stats['tokens'] += end - start
+            if end >= n:
+                break
+
+            if overlap and strength.get(end, 0) < HEADING:
+                # A new section starts clean; otherwise back up to a sentence start
+                lo = max(start + 1, end - overlap)
+                sentence_starts = breaks[SENTENCE]
+                j = bisect.bisect_left(sentence_starts, lo)
+                if j < len(sentence_starts) and sentence_starts[j] < end:
+                    start = sentence_starts[j]
+                else:
+                    while lo < end - 1 and not _starts_word(text, offsets[lo][0]):
+                        lo += 1
+                    start = lo
+            else:
+                start = end
+
+        self.stats['chunks'] += len(chunks)
+        return chunks
+
+    @staticmethod
+    def _break_strengths(text: str, starts: List[int]) -> Dict[int, int]:
+        """Map token index -> strength of a break placed right before it"""
+        strength: Dict[int, int] = {}
+
+        def mark(char_pos: int, level: int):
+            i = bisect.bisect_left(starts, char_pos)
+            if 0 < i < len(starts) and strength.get(i, 0) < level:
+                strength[i] = level
+
+        for match in _SENTENCE_RE.finditer(text):
+            mark(match.end(), SENTENCE)
+        for match in _PARAGRAPH_RE.finditer(text):
+            mark(match.end(), PARAGRAPH)
+        for match in _HEADING_RE.finditer(text):
+            mark(match.start(), HEADING)
+        return strength
+
+    @staticmethod
+    def _headings(text: str, starts: List[int]) -> List[Tuple[int, str]]:
+        return [(bisect.bisect_left(starts, match.start()), (match.group(1) or match.group(2)).strip())
+                for match in _HEADING_RE.finditer(text)]
+
+    @staticmethod
+    def _best_break(breaks: Dict[int, List[int]], lo: int, hi: int) -> Optional[int]:
+        """Latest break in (lo, hi] of the strongest level available there"""
+        for level in (HEADING, PARAGRAPH, SENTENCE):
+            positions = breaks[level]
+            j = bisect.bisect_right(positions, hi) - 1
+            if j >= 0 and positions[j] > lo:
+                return positions[j]
+        return None
+
+    def truncation_report(self, texts: Sequence[str]) -> Dict:
+        """
+        How much of each embedding input the encoder would cut off
+
+        Args:
+            texts: Full encoder inputs (header included)
+
+        Returns:
+            Dict with truncated chunk count/share and tokens lost/share
+        """
+        limit = self.max_seq_length - self.special_tokens
+        truncated = tokens = lost = longest = 0
+        for text in texts:
+            count = self.count_tokens(text)
+            tokens += count
+            longest = max(longest, count)
+            if count > limit:
+                truncated += 1
+                lost += count - limit
+        return {
+            'chunks': len(texts),
+            'token_limit': limit,
+            'truncated_chunks': truncated,
+            'truncated_share': round(truncated / len(texts), 3) if texts else 0.0,
+            'tokens': tokens,
+            'tokens_lost': lost,
+            'tokens_lost_share': round(lost / tokens, 3) if tokens else 0.0,
+            'max_tokens': longest,
+        }
+
+
+# Chunkers built by chunk_strings, per (model, max_tokens, overlap_tokens)
+_shared_chunkers: Dict[Tuple[str, int, int], TokenChunker] = {}
+
+
+def chunk_strings(text: str, model_name: str = "all-mpnet-base-v2", max_tokens: int = 0,
+                  overlap_tokens: int = 48, header: str = "") -> List[str]:
+    """
+    Chunk texts of one document, for scrapers that store ready-made chunks
+
+    Args:
+        text: Document text with its paragraph/heading line breaks
+        model_name: Embedding model the chunks are sized for
+        max_tokens: Cap on content tokens per chunk (0 = the model's sequence limit)
+        overlap_tokens: Tokens shared between consecutive chunks
+        header: Text prepended at embedding time (see embedding_header)
+
+    Returns:
+        Chunk texts in document order
+    """
+    if not text or not text.strip():
+        return []
+    key = (model_name, max_tokens, overlap_tokens)
+    if key not in _shared_chunkers:
+        _shared_chunkers[key] = TokenChunker.for_model(model_name, max_tokens=max_tokens,
+                                                       overlap_tokens=overlap_tokens)
+    return [chunk.text for chunk in _shared_chunkers[key].chunk(text, header=header)]
+
+
+def embedding_header(title: str, heading: str = "") -> str:
+    """Header EmbeddingGenerator.prepare_texts_from_chunks puts in front of chunk text"""
+    header = f"Title: {title}\n" if title else ""
+    if heading and heading != title:
+        header += f"Section: {heading}\n"
+    return header + "Content: "
+
+
+def main():
+    """Report how much of an existing chunk file the encoder truncates"""
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from api.embedding_store import load_chunks
+    from config.settings import settings
+
+    chunks = load_chunks(sys.argv[1] if len(sys.argv) > 1 else "embeddings_output")
+
+    chunker = TokenChunker.for_model(settings.EMBEDDING_MODEL)
+    texts = [embedding_header(c.get('title', ''), c.get('heading', '')) + c.get('text', '') for c in chunks]
+    print(f"Truncation for {settings.EMBEDDING_MODEL}: {chunker.truncation_report(texts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+# scripts/processing/html_text.py
+"""
+Shared HTML-to-text engine for the processors and scrapers.
+
+Produces the same text as BeautifulSoup's `get_text(separator, strip=True)`
+after decomposing the boilerplate selectors, but:
+  - raw HTML is parsed with lxml (libxml2) when it is installed instead of
+    the pure-Python html.parser,
+  - boilerplate removal, content-root lookup and text collection happen in
+    one walk over the tree, with selectors precompiled into tag/class sets
+    instead of one soup.select() pass per selector,
+  - the tree is never mutated.
+BeautifulSoup trees the scrapers already hold are walked the same way.
+
+Known differences: lxml always creates <body>, so a 'body' content root
+also matches bare fragments. <textarea> content is raw text to lxml (and to
+BeautifulSoup's lxml builder); markup in it is dropped the way html.parser
+would drop its tags, so both backends return the same words.
+
+segment_sections() splits a BeautifulSoup page into heading sections in
+the same kind of single walk; sections_text() renders them as plain text
+that keeps the heading and paragraph breaks for the chunker.
+"""
+import re
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+try:
+    import lxml.html
+except ImportError:  # optional dependency, fall back to BeautifulSoup's html.parser
+    lxml = None
+
+# BeautifulSoup tree builder for raw HTML
+SOUP_PARSER = "lxml" if lxml is not None else "html.parser"
+
+# Selectors the repo strips before taking page text
+PAGE_CHROME = ('script', 'style', 'nav', 'footer', 'header', 'aside')
+DOCS_BOILERPLATE = (
+    'script', 'style', 'nav', 'footer', 'header', 'aside',
+    'noscript', 'form', '.sidebar', '.navigation', '.menu',
+    '.breadcrumb', '.search', '.theme-switcher', '.ads',
+    '.social-share', '.pagination', '.toc'
+)
+
+# Elements whose strings get_text() never returns (bs4 stores them as
+# Script/Stylesheet/TemplateString/RubyText strings)
+_NON_TEXT_TAGS = frozenset(('script', 'style', 'template', 'rt', 'rp'))
+# String types get_text() returns; comments, doctypes etc. are skipped
+_TEXT_TYPES = (NavigableString, CData)
+
+# Raw-text elements whose markup lxml keeps as literal text
+_RAW_TEXT_TAGS = frozenset(('textarea',))
+_TAG_RE = re.compile(r'<[^>]*>')
+
+HEADING_LEVELS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+# Elements kept whole as one content block (their text joined with spaces)
+SECTION_BLOCKS = frozenset(('p', 'pre', 'ul', 'ol', 'dl', 'table', 'blockquote'))
+# Containers whose start and end also end the running block of loose text
+_BLOCK_BOUNDARIES = frozenset((
+    'div', 'section', 'article', 'main', 'body', 'header', 'footer', 'aside', 'nav',
+    'figure', 'figcaption', 'details', 'summary', 'form', 'fieldset', 'li', 'hr', 'br'
+))
+
+
+class SelectorSet:
+    """
+    Precompiled 'tag', '.class' and 'tag.class' selectors, matched with set
+    lookups. Anything more complex is rejected rather than matched wrongly.
+    """
+
+    def __init__(self, selectors: Sequence[str]):
+        self.selectors = tuple(selectors)
+        tags, classes, pairs = set(), set(), set()
+        for selector in selectors:
+            tag, dot, cls = selector.strip().partition('.')
+            if not (tag or cls) or any(c in selector for c in ' >+~#[]:*,') or '.' in cls:
+                raise ValueError(f"Unsupported selector '{selector}'")
+            if dot and tag:
+                pairs.add((tag, cls))
+            elif dot:
+                classes.add(cls)
+            else:
+                tags.add(tag)
+        self._tags = frozenset(tags)
+        self._classes = frozenset(classes)
+        self._pairs = frozenset(pairs)
+
+    def __bool__(self):
+        return bool(self.selectors)
+
+    def matches(self, tag: str, class_attr) -> bool:
+        if tag in self._tags:
+            return True
+        if not (self._classes or self._pairs) or not class_attr:
+            return False
+        classes = class_attr.split() if isinstance(class_attr, str) else class_attr
+        return any(cls in self._classes or (tag, cls) in self._pairs for cls in classes)
+
+
+class HtmlTextExtractor:
+    """
+    Extract visible text from HTML.
+
+    Args:
+        remove: Selectors whose elements are dropped with their subtree
+        content_roots: Selectors tried in order (like select_one(a) or
+                       select_one(b) or ...); text comes from the first match
+                       outside removed elements. Empty = whole document.
+        separator: Joins the stripped strings
+        parser: "lxml", "html.parser", or "auto" (lxml when installed)
+    """
+
+    def __init__(self, remove: Sequence[str] = (), content_roots: Sequence[str] = (),
+                 separator: str = ' ', parser: str = "auto"):
+        self.remove = SelectorSet(remove)
+        self.content_roots = [SelectorSet([selector]) for selector in content_roots]
+        self.separator = separator
+        if parser == "auto":
+            parser = "lxml" if lxml is not None else "html.parser"
+        if parser == "lxml" and lxml is None:
+            raise ImportError("lxml is not installed")
+        self.parser = parser
+
+    def extract(self, html) -> str:
+        """Text of an HTML string, a BeautifulSoup document or a Tag"""
+        if isinstance(html, Tag):
+            return self.separator.join(self._soup_strings(html))
+        if not html or not html.strip():
+            return ""
+        if self.parser == "lxml":
+            return self.separator.join(self._lxml_strings(_lxml_document(html)))
+        return self.separator.join(self._soup_strings(BeautifulSoup(html, "html.parser")))
+
+    def boilerplate(self, soup: Tag) -> List[Tag]:
+        """Outermost elements of soup matching the remove selectors, found in one walk"""
+        return [el for el in _walk_soup(soup, self.remove, prune=frozenset()) if isinstance(el, Tag)
+                and self.remove.matches(el.name, el.get('class'))]
+
+    def strip_boilerplate(self, soup: Tag) -> Tag:
+        """Decompose boilerplate in place (for callers that keep working on the soup)"""
+        for element in self.boilerplate(soup):
+            element.decompose()
+        return soup
+
+    def _soup_strings(self, soup: Tag) -> Iterator[str]:
+        root = soup
+        if self.content_roots:
+            root = _first_match(
+                ((el.name, el.get('class'), el) for el in _walk_soup(soup, self.remove) if isinstance(el, Tag)),
+                self.content_roots
+            )
+            if root is None:
+                return
+        for node in _walk_soup(root, self.remove):
+            if type(node) in _TEXT_TYPES:
+                text = _soup_text(node)
+                if text:
+                    yield text
+
+    def _lxml_strings(self, document) -> Iterator[str]:
+        root = document
+        if self.content_roots:
+            root = _first_match(
+                ((el.tag, el.get('class'), el) for el, _ in _walk_lxml(document, self.remove, siblings=True)
+                 if el is not None),
+                self.content_roots
+            )
+            if root is None:
+                return
+        for _, text in _walk_lxml(root, self.remove, siblings=root is document):
+            if text:
+                text = text.strip()
+                if text:
+                    yield text
+
+
+def _lxml_document(html: str):
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # Unicode input with an XML encoding declaration must be passed as bytes
+        return lxml.html.document_fromstring(html.encode("utf-8"))
+
+
+def _untag(text: str) -> str:
+    """Words of raw-text element content with any markup in it removed"""
+    return ' '.join(_TAG_RE.sub(' ', text).split())
+
+
+def _soup_text(node) -> str:
+    """Stripped text of a BeautifulSoup string ('' if blank)"""
+    text = node.strip()
+    if '<' in text and node.parent is not None and node.parent.name in _RAW_TEXT_TAGS:
+        return _untag(text)
+    return text
+
+
+def _first_match(elements: Iterator[Tuple[str, object, object]], roots: List[SelectorSet]):
+    """First element (document order) for the highest-priority root selector that matches any"""
+    found = [None] * len(roots)
+    for tag, class_attr, element in elements:
+        for i, selector in enumerate(roots):
+            if found[i] is None and selector.matches(tag, class_attr):
+                found[i] = element
+                if i == 0:
+                    return element
+    return next((element for element in found if element is not None), None)
+
+
+def _walk_soup(root: Tag, remove: SelectorSet, prune=_NON_TEXT_TAGS):
+    """
+    Yield the nodes of a BeautifulSoup tree in document order. A removed
+    element is yielded itself but not descended into; neither are `prune`
+    elements (by default those that never contribute text).
+    """
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        if not isinstance(node, Tag):
+            continue
+        if node.name in prune or (remove and remove.matches(node.name, node.get('class'))):
+            continue
+        stack.extend(reversed(node.contents))
+
+
+def _walk_lxml(root, remove: SelectorSet, siblings: bool = False):
+    """
+    Yield (element, None) for every element and (None, text) for every text
+    run of an lxml tree in document order, skipping removed and non-text
+    subtrees. Tail text belongs to the parent, so it is kept even when its
+    element is skipped.
+
+    siblings: Also walk the root's following siblings. libxml2 puts content
+    after </html> into extra top-level elements next to the document root.
+    """
+    # Stack entries: an element to open, or a plain string (a pending tail)
+    stack = [root]
+    if siblings:
+        stack.extend(root.itersiblings())
+        stack.reverse()
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            yield None, item
+            continue
+        tail = item.tail if item is not root else None
+        if tail:
+            stack.append(tail)
+        tag = item.tag
+        if not isinstance(tag, str):
+            continue  # comment or processing instruction: only its tail is text
+        yield item, None
+        if tag in _NON_TEXT_TAGS or (remove and remove.matches(tag, item.get('class'))):
+            continue
+        if item.text:
+            yield None, _untag(item.text) if tag in _RAW_TEXT_TAGS else item.text
+        stack.extend(reversed(item))
+
+
+class Section(NamedTuple):
+    """Heading of a page and the content blocks up to the next heading"""
+    heading: str
+    level: int
+    path: Tuple[str, ...]  # enclosing headings, outermost first, ending with this one
+    element: Optional[Tag]  # the heading tag (None for text before the first heading)
+    blocks: List[str]
+
+    @property
+    def content(self) -> str:
+        return '\n\n'.join(self.blocks)
+
+
+# Stack marker for the end of an element: (marker, element closes a SECTION_BLOCKS block)
+_END = object()
+
+
+def segment_sections(root: Tag, min_block_chars: int = 6, preamble: bool = False) -> List[Section]:
+    """
+    Split a page into sections in one document-order walk.
+
+    Every text string belongs to the section of the last heading before it,
+    at any depth of the tree, so each block is visited once however many
+    headings the page has. A heading inside a block ends that block too.
+
+    Args:
+        root: BeautifulSoup document or Tag
+        min_block_chars: Blocks shorter than this are dropped
+        preamble: Also return the text before the first heading (as a level-0
+                  section with an empty heading)
+
+    Returns:
+        Sections in document order; headings without text are treated as
+        ordinary content
+    """
+    sections = [Section('', 0, (), None, [])]
+    path: List[Tuple[int, str]] = []
+    strings: List[str] = []
+    in_block = 0
+
+    def flush():
+        if strings:
+            text = ' '.join(strings)
+            strings.clear()
+            if len(text) >= min_block_chars:
+                sections[-1].blocks.append(text)
+
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if type(node) is tuple:
+            if node[1]:
+                in_block -= 1
+            if not in_block:
+                flush()
+            continue
+        if not isinstance(node, Tag):
+            if type(node) in _TEXT_TYPES:
+                text = _soup_text(node)
+                if text:
+                    strings.append(text)
+            continue
+
+        name = node.name
+        if name in _NON_TEXT_TAGS:
+            continue
+        level = HEADING_LEVELS.get(name)
+        if level:
+            heading = node.get_text(strip=True)
+            if heading:
+                flush()
+                while path and path[-1][0] >= level:
+                    path.pop()
+                path.append((level, heading))
+                sections.append(Section(heading, level, tuple(text for _, text in path), node, []))
+                continue
+        if name in SECTION_BLOCKS:
+            if not in_block:
+                flush()
+            in_block += 1
+            stack.append((_END, True))
+        elif name in _BLOCK_BOUNDARIES and not in_block:
+            flush()
+            stack.append((_END, False))
+        stack.extend(reversed(node.contents))
+    flush()
+
+    if not preamble or not sections[0].blocks:
+        sections = sections[1:]
+    return sections
+
+
+def sections_text(root, min_block_chars: int = 1) -> str:
+    """
+    Plain text of a page with its structure: every heading on a line of its
+    own followed by a blank line, content blocks separated by blank lines
+
+    Args:
+        root: Raw HTML, a BeautifulSoup document or a Tag
+        min_block_chars: Blocks shorter than this are dropped
+
+    Returns:
+        Text for TokenChunker (headings and paragraphs become its cut points)
+    """
+    if not isinstance(root, Tag):
+        if not root or not root.strip():
+            return ""
+        root = BeautifulSoup(root, SOUP_PARSER)
+    parts = []
+    for section in segment_sections(root, min_block_chars=min_block_chars, preamble=True):
+        if section.heading:
+            parts.append(section.heading)
+        parts.extend(section.blocks)
+    return '\n\n'.join(parts)
@@ -0,0 +1,142 @@
+# scripts/processing/json_stream.py
+"""
+Streaming readers for large JSON and JSONL ingest files.
+
+Records are decoded one at a time from a buffered read, so memory depends
+on the largest single record rather than on the file size.
+"""
+import json
+from typing import Any, Iterator, Optional
+
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = ',]}:' + _WHITESPACE
+
+
+class _Reader:
+    """Text buffer over a file that decodes one JSON value at a time"""
+
+    def __init__(self, f, read_size: int):
+        self.f = f
+        self.read_size = read_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        if self.eof:
+            return False
+        data = self.f.read(size)
+        if not data:
+            self.eof = True
+            return False
+        # Drop consumed text so the buffer never holds more than the current value
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of file)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self.read_size):
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} in JSON stream, got {char or 'end of file'!r}")
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode the next complete value, reading more input as needed"""
+        self.peek()
+        size = self.read_size
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number is only complete once a delimiter follows it (the next read may continue it)
+                if self.eof or (end < len(self.buf) and (
+                        self.buf[end] in _DELIMITERS or not isinstance(value, (int, float)))):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Value spans past the buffer: read more (doubling, so huge records stay linear)
+            self._fill(size)
+            size *= 2
+
+
+def iter_json_array(filepath: str, key: Optional[str] = None, object_as_record: bool = True,
+                    read_size: int = 1 << 20) -> Iterator[Any]:
+    """
+    Yield the elements of a JSON array file one by one.
+
+    Args:
+        filepath: JSON file
+        key: For a top-level object, stream the array stored under this key
+             (other members are decoded and dropped one at a time)
+        object_as_record: Without a key, yield a top-level object (or other
+                          non-array value) as the single record
+        read_size: Characters read per refill
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        reader = _Reader(f, read_size)
+        first = reader.peek()
+        if first == "[":
+            yield from _array_elements(reader)
+        elif first == "{" and key is not None:
+            reader.expect("{")
+            if reader.peek() == "}":
+                return
+            while True:
+                name = reader.value()
+                reader.expect(":")
+                if name == key and reader.peek() == "[":
+                    yield from _array_elements(reader)
+                    return
+                reader.value()
+                if reader.expect(",}") == "}":
+                    return
+        elif first:
+            value = reader.value()
+            if key is None and object_as_record:
+                yield value
+
+
+def _array_elements(reader: _Reader) -> Iterator[Any]:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value()
+        if reader.expect(",]") == "]":
+            return
+
+
+def iter_jsonl(filepath: str) -> Iterator[Any]:
+    """Yield one record per non-blank line; malformed lines are reported and skipped"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping malformed line {line_no} of {filepath}: {e}")
+
+
+def iter_json_records(filepath: str, key: Optional[str] = None,
+                      object_as_record: bool = True) -> Iterator[Any]:
+    """Records of a .jsonl/.ndjson file (one per line) or a JSON file (see iter_json_array)"""
+    if filepath.lower().endswith(JSONL_EXTENSIONS):
+        return iter_jsonl(filepath)
+    return iter_json_array(filepath, key=key, object_as_record=object_as_record)
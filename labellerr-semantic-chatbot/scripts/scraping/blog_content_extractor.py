@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import os
+import sys
 import json
 import requests
 from bs4 import BeautifulSoup
@@ -7,6 +8,15 @@ from datetime import datetime
 import time
 import re
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+from config.settings import settings
+from scripts.processing.chunker import chunk_strings
+from scripts.processing.html_text import HtmlTextExtractor, PAGE_CHROME, SOUP_PARSER
+
+# Text of the first article/main/body outside page chrome
+BLOG_TEXT = HtmlTextExtractor(remove=PAGE_CHROME + ('noscript',),
+                              content_roots=('article', 'main', 'body'), separator='\n')
+
 class BlogContentExtractor:
     def __init__(self):
         self.output_dir = "../../data_ingest/raw/blog"
@@ -43,46 +53,14 @@ class BlogContentExtractor:
         return metadata
 
     def clean_blog_content(self, soup):
-        # Remove unwanted elements
-        for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'noscript']):
-            element.decompose()
-        
-        # Find main content
-        content_element = soup.select_one('article') or soup.select_one('main') or soup.find('body')
-        
-        if content_element:
-            text = content_element.get_text(separator='\n', strip=True)
-            text = re.sub(r'\n\s*\n', '\n\n', text)
-            text = re.sub(r' +', ' ', text)
-            return text.strip()
-        return ""
+        text = BLOG_TEXT.extract(soup)
+        text = re.sub(r'\n\s*\n', '\n\n', text)
+        text = re.sub(r' +', ' ', text)
+        return text.strip()
 
-    def create_content_chunks(self, content, max_words=300):
-        if not content:
-            return []
-        
-        paragraphs = content.split('\n\n')
-        chunks = []
-        current_chunk = ""
-        
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-            
-            test_chunk = f"{current_chunk}\n\n{para}" if current_chunk else para
-            word_count = len(test_chunk.split())
-            
-            if word_count > max_words and current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = para
-            else:
-                current_chunk = test_chunk
-        
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
-        
-        return chunks
+    def create_content_chunks(self, content, max_tokens=0):
+        # Token-sized chunks, cut at paragraph breaks where possible
+        return chunk_strings(content, settings.EMBEDDING_MODEL, max_tokens=max_tokens)
 
     def extract_single_post(self, url):
         try:
@@ -90,7 +68,7 @@ class BlogContentExtractor:
             response = self.session.get(url, timeout=15)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(response.text, SOUP_PARSER)
             metadata = self.extract_blog_metadata(soup, url)
             content = self.clean_blog_content(soup)
             chunks = self.create_content_chunks(content)
@@ -221,17 +221,26 @@ Uses Selenium for JavaScript-heavy documentation sites
 """
 
 import os
+import sys
 import json
 import time
 from datetime import datetime
 import requests
-from bs4 import BeautifulSoup, Tag, NavigableString
+from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+from config.settings import settings
+from scripts.processing.boilerplate import BoilerplateDetector
+from scripts.processing.chunker import chunk_strings
+from scripts.processing.html_text import HtmlTextExtractor, DOCS_BOILERPLATE, SOUP_PARSER, segment_sections
+
+DOCS_CLEANER = HtmlTextExtractor(remove=DOCS_BOILERPLATE)
+
 class LabellerrDocsExtractor:
     def __init__(self, output_dir="../../data_ingest/raw/documentation_sections"):
         self.base_url = "https://docs.labellerr.com/"
@@ -278,7 +287,7 @@ class LabellerrDocsExtractor:
             )
             
             # Get page source after JavaScript execution
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            soup = BeautifulSoup(driver.page_source, SOUP_PARSER)
             
             links = set()
             
@@ -330,7 +339,7 @@ class LabellerrDocsExtractor:
                 pass
             
             # Get page source after JavaScript execution
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            soup = BeautifulSoup(driver.page_source, SOUP_PARSER)
             
             # Extract page metadata
             page_title = self.extract_page_title(soup, url)
@@ -390,31 +399,26 @@ class LabellerrDocsExtractor:
         # Remove unwanted elements
         self.clean_soup_for_content(soup)
         
-        # Find all headings
-        headings = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+        # One walk over the page assigns every block to the heading it falls under
+        page_sections = segment_sections(soup)
         
-        if not headings:
+        if not page_sections:
             # If no headings found, try to extract any meaningful content
             return self.extract_content_without_headings(soup)
         
         sections = []
         
-        for i, heading in enumerate(headings):
-            heading_text = heading.get_text(strip=True)
-            heading_level = int(heading.name[1])
-            
-            if not heading_text:
-                continue
-            
-            # Extract content under this heading
-            content = self.extract_content_under_heading(soup, heading, heading_level)
+        for section in page_sections:
+            # Filter out navigation text
+            content = self.filter_navigation_text(section.content)
             
             # Create chunks for embedding
             chunks = self.create_content_chunks(content)
             
             section_data = {
-                "heading": heading_text,
-                "level": heading_level,
+                "heading": section.heading,
+                "level": section.level,
+                "heading_path": list(section.path),
                 "content": content,
                 "chunks": chunks,
                 "chunk_count": len(chunks),
@@ -464,59 +468,8 @@ class LabellerrDocsExtractor:
         return []
 
     def clean_soup_for_content(self, soup):
-        """Remove unwanted elements from soup"""
-        unwanted_selectors = [
-            'script', 'style', 'nav', 'footer', 'header', 'aside',
-            'noscript', 'form', '.sidebar', '.navigation', '.menu',
-            '.breadcrumb', '.search', '.theme-switcher', '.ads',
-            '.social-share', '.pagination', '.toc'
-        ]
-        
-        for selector in unwanted_selectors:
-            for element in soup.select(selector):
-                element.decompose()
-
-    def extract_content_under_heading(self, soup, heading_element, heading_level):
-        """Extract content under a specific heading"""
-        content_parts = []
-        
-        # Get all siblings after the heading
-        for sibling in heading_element.next_siblings:
-            # Stop at next heading of same or higher level
-            if (isinstance(sibling, Tag) and 
-                sibling.name and 
-                sibling.name.startswith('h') and 
-                int(sibling.name[1]) <= heading_level):
-                break
-            
-            # Extract text from content elements
-            if isinstance(sibling, Tag):
-                if sibling.name in ['p', 'div', 'ul', 'ol', 'pre', 'code', 'blockquote', 'table', 'section']:
-                    text = sibling.get_text(separator=' ', strip=True)
-                    if text and len(text) > 5:  # Only meaningful text
-                        content_parts.append(text)
-                        
-            elif isinstance(sibling, NavigableString):
-                text = str(sibling).strip()
-                if text and len(text) > 5:
-                    content_parts.append(text)
-        
-        # If no content found after heading, try to get content from parent container
-        if not content_parts:
-            parent = heading_element.parent
-            if parent:
-                text = parent.get_text(separator=' ', strip=True)
-                # Remove the heading text itself
-                text = text.replace(heading_element.get_text(strip=True), '', 1).strip()
-                if text and len(text) > 20:
-                    content_parts.append(text)
-        
-        full_content = '\n\n'.join(content_parts).strip()
-        
-        # Filter out navigation text
-        full_content = self.filter_navigation_text(full_content)
-        
-        return full_content
+        """Remove unwanted elements from soup (one walk for all selectors)"""
+        DOCS_CLEANER.strip_boilerplate(soup)
 
     def filter_navigation_text(self, text):
         """Filter out navigation and UI text"""
@@ -547,39 +500,34 @@ class LabellerrDocsExtractor:
             if len(line) > 15 and not line.isupper():
                 filtered_lines.append(line)
         
-        return '\n'.join(filtered_lines)
+        # Lines are content blocks; keep them as paragraphs for the chunker
+        return '\n\n'.join(filtered_lines)
 
-    def create_content_chunks(self, content, max_words=350):
-        """Split content into chunks for embeddings"""
-        if not content:
-            return []
-        
-        # Split by paragraphs first
-        paragraphs = content.split('\n\n')
-        chunks = []
-        current_chunk = ""
-        
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-            
-            # Check if adding this paragraph exceeds word limit
-            test_chunk = f"{current_chunk}\n\n{para}" if current_chunk else para
-            word_count = len(test_chunk.split())
-            
-            if word_count > max_words and current_chunk:
-                # Save current chunk and start new one
-                chunks.append(current_chunk.strip())
-                current_chunk = para
-            else:
-                current_chunk = test_chunk
-        
-        # Add the last chunk
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+    def strip_repeated_blocks(self, min_pages=5, min_share=0.1):
+        """Remove lines/blocks repeated across many pages from every extracted section"""
+        pages = {}
+        for section in self.extracted_sections:
+            pages.setdefault(section['url'], []).append(section['content'])
+        detector = BoilerplateDetector(min_pages, min_share).fit('\n'.join(parts) for parts in pages.values())
         
-        return chunks
+        kept = []
+        for section in self.extracted_sections:
+            content = detector.strip(section['content']).strip()
+            if content != section['content']:
+                if not content:
+                    continue  # nothing but boilerplate
+                section['content'] = content
+                section['chunks'] = self.create_content_chunks(content)
+                section['chunk_count'] = len(section['chunks'])
+                section['word_count'] = len(content.split())
+            kept.append(section)
+        self.extracted_sections = kept
+        print(f"🧹 Boilerplate: removed {detector.stats['removed_spans']} repeated passages "
+              f"across {len(pages)} pages")
+
+    def create_content_chunks(self, content, max_tokens=0):
+        """Split content into chunks sized in the embedding model's tokens (cut at paragraph breaks first)"""
+        return chunk_strings(content, settings.EMBEDDING_MODEL, max_tokens=max_tokens)
 
     def extract_all_documentation(self):
         """Extract content from all documentation pages"""
@@ -608,6 +556,9 @@ class LabellerrDocsExtractor:
             # Rate limiting between requests
             time.sleep(2)
         
+        # Drop text repeated across pages that the fixed nav patterns missed
+        self.strip_repeated_blocks()
+        
         # Save results
         self.save_all_results()
 
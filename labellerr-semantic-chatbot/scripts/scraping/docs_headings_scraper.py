@@ -5,6 +5,7 @@ Simple focused script to map out documentation structure
 """
 
 import os
+import sys
 import json
 import time
 from datetime import datetime
@@ -17,6 +18,9 @@ from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
 from bs4 import BeautifulSoup
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+from scripts.processing.html_text import SOUP_PARSER, segment_sections
+
 class DocumentationHeadingsExtractor:
     def __init__(self, output_dir="data_ingest/raw/documentation"):
         self.base_url = "https://docs.labellerr.com/"
@@ -61,7 +65,7 @@ class DocumentationHeadingsExtractor:
                 EC.presence_of_element_located((By.TAG_NAME, "a"))
             )
             
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            soup = BeautifulSoup(driver.page_source, SOUP_PARSER)
             
             # Find all internal documentation links
             for a_tag in soup.find_all('a', href=True):
@@ -131,19 +135,21 @@ class DocumentationHeadingsExtractor:
             except:
                 pass
             
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            soup = BeautifulSoup(driver.page_source, SOUP_PARSER)
             
-            # Extract all heading elements
-            for heading_tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-                heading_text = heading_tag.get_text(strip=True)
+            # All headings with their enclosing heading path, in one walk of the page
+            for section in segment_sections(soup):
+                heading_tag = section.element
+                heading_text = section.heading
                 
-                if heading_text and len(heading_text) > 2:  # Skip very short headings
+                if len(heading_text) > 2:  # Skip very short headings
                     # Try to find associated link
                     heading_url = self.find_heading_link(heading_tag, url)
                     
                     heading_data = {
                         "heading": heading_text,
-                        "level": int(heading_tag.name[1]),  # h1=1, h2=2, etc.
+                        "level": section.level,  # h1=1, h2=2, etc.
+                        "heading_path": list(section.path),
                         "url": heading_url,
                         "page_url": url,
                         "heading_tag": heading_tag.name
@@ -16,12 +16,16 @@ import logging
 
 # Add parent directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
-from config.settings import LABELLERR_PAGES, REQUEST_TIMEOUT, MAX_REQUESTS_PER_SECOND
+from config.settings import LABELLERR_PAGES, REQUEST_TIMEOUT, MAX_REQUESTS_PER_SECOND, settings
+from scripts.processing.chunker import chunk_strings
+from scripts.processing.html_text import HtmlTextExtractor, PAGE_CHROME, SOUP_PARSER
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+PAGE_TEXT = HtmlTextExtractor(remove=PAGE_CHROME)
+
 class LabellerrWebScraper:
     def __init__(self, output_dir="../../data_ingest/raw"):
         self.output_dir = output_dir
@@ -39,29 +43,19 @@ class LabellerrWebScraper:
             logger.info(f"Fetching: {url}")
             response = self.session.get(url, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
-            return BeautifulSoup(response.text, 'html.parser')
+            return BeautifulSoup(response.text, SOUP_PARSER)
         except requests.RequestException as e:
             logger.error(f"Failed to fetch {url}: {e}")
             return None
     
-    def extract_text_chunks(self, text, max_words=300):
-        """Split text into chunks for better embedding"""
-        words = text.split()
-        chunks = []
-        for i in range(0, len(words), max_words):
-            chunk = " ".join(words[i:i + max_words])
-            if chunk.strip():  # Only add non-empty chunks
-                chunks.append(chunk.strip())
-        return chunks
+    def extract_text_chunks(self, text, max_tokens=0):
+        """Split text into chunks sized in the embedding model's tokens"""
+        return chunk_strings(text, settings.EMBEDDING_MODEL, max_tokens=max_tokens)
     
     def clean_text(self, soup):
         """Extract and clean visible text from soup"""
-        # Remove unwanted elements
-        for element in soup(["script", "style", "nav", "footer", "header", "aside"]):
-            element.decompose()
-        
-        # Get text and clean it
-        text = soup.get_text(separator=" ", strip=True)
+        # Visible text without page chrome, in one walk
+        text = PAGE_TEXT.extract(soup)
         
         # Remove extra whitespace and normalize
         text = " ".join(text.split())
@@ -3,10 +3,15 @@
 Add transcripts to YouTube videos using correct YouTubeTranscriptApi
 """
 import os
+import sys
 import json
 from datetime import datetime
 from youtube_transcript_api import YouTubeTranscriptApi
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+from config.settings import settings
+from scripts.processing.chunker import chunk_strings
+
 class YouTubeTranscriptExtractor:
     def __init__(self, output_dir="data_ingest/raw/youtube"):
         self.output_dir = output_dir
@@ -41,20 +46,9 @@ class YouTubeTranscriptExtractor:
         except Exception as e:
             return None, str(e)
     
-    def create_transcript_chunks(self, transcript, max_words=300):
-        """Split transcript into chunks for embeddings"""
-        if not transcript:
-            return []
-        
-        words = transcript.split()
-        chunks = []
-        
-        for i in range(0, len(words), max_words):
-            chunk = " ".join(words[i:i + max_words])
-            if chunk.strip():
-                chunks.append(chunk.strip())
-        
-        return chunks
+    def create_transcript_chunks(self, transcript, max_tokens=0):
+        """Split transcript into chunks sized in the embedding model's tokens (cut at sentence ends)"""
+        return chunk_strings(transcript, settings.EMBEDDING_MODEL, max_tokens=max_tokens)
     
     def add_transcripts_to_videos(self):
         """Add transcripts to all videos"""
@@ -0,0 +1,60 @@
+import pytest
+
+# api.main pulls these in through the embedding and LLM services
+API_DEPENDENCIES = ("google.generativeai", "sentence_transformers", "torch")
+
+
+class FakeQdrant:
+    collection_name = "kb"
+    collection_version = 1
+
+
+class FakeChatbot:
+    """Stands in for LabellerrRAGChatbot; records what it was asked"""
+
+    model = "fake-llm"
+
+    def __init__(self):
+        self.retrieved = []
+        self.generated = []
+        self.fail_on = set()
+
+    def enhance_query(self, query):
+        return f"{query} labellerr"
+
+    def retrieve_context(self, query, top_k=5, source_filter=None):
+        self.retrieved.append(query)
+        return self._hits(query, top_k)
+
+    def retrieve_context_batch(self, queries, top_k=5, source_filter=None):
+        self.retrieved.extend(queries)
+        return [self._hits(query, top_k) for query in queries]
+
+    def generate_response(self, query, context, include_sources=True):
+        self.generated.append(query)
+        if query in self.fail_on:
+            raise RuntimeError(f"generation failed for {query}")
+        return {'response': f"answer: {query}", 'sources': context}
+
+    def record_turn(self, query, result):
+        pass
+
+    @staticmethod
+    def _hits(query, top_k):
+        return [{'id': f"{query}-{i}", 'title': query, 'url': f"https://docs.example/{i}",
+                 'text': f"chunk {i} for {query}", 'score': 0.9 - i / 10, 'source_type': 'documentation'}
+                for i in range(top_k)]
+
+
+@pytest.fixture
+def api_main(monkeypatch):
+    """api.main wired to a fake chatbot and Qdrant (startup, which connects to Qdrant, is not run)"""
+    for module in API_DEPENDENCIES:
+        pytest.importorskip(module)
+    from api import main
+
+    monkeypatch.setattr(main, "chatbot", FakeChatbot())
+    monkeypatch.setattr(main, "qdrant_service", FakeQdrant())
+    main.search_cache.clear_local()
+    main.answer_cache.clear_local()
+    return main
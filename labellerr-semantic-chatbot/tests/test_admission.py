@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from api.utils.admission import AdmissionController, AdmissionRejected
+
+
+def _controller(**kwargs):
+    options = dict(max_in_flight=1, max_queue=1, max_wait_s=1.0, initial_latency_s=0.01)
+    options.update(kwargs)
+    return AdmissionController("test", **options)
+
+
+def test_queued_request_gets_the_released_slot():
+    async def scenario():
+        controller = _controller()
+        order = []
+
+        async def request(name, hold_s):
+            async with controller.admit():
+                order.append(name)
+                await asyncio.sleep(hold_s)
+
+        await asyncio.gather(request("a", 0.02), request("b", 0))
+        return order, controller.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["a", "b"]
+    assert stats['admitted'] == 2 and stats['in_flight'] == 0 and stats['queued'] == 0
+
+
+def test_full_queue_is_rejected_with_429():
+    async def scenario():
+        controller = _controller()
+        await controller.acquire()
+        queued = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        controller.release()
+        await queued
+        controller.release()
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 429 and rejected.retry_after >= 1
+
+
+def test_wait_past_the_limit_is_rejected_with_503():
+    async def scenario():
+        controller = _controller(max_wait_s=0.02)
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        return rejected.value, controller.stats()
+
+    rejected, stats = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert stats['timed_out'] == 1 and stats['queued'] == 0
+
+
+def test_slow_observed_latency_sheds_before_queueing():
+    async def scenario():
+        controller = _controller(max_queue=10)
+        await controller.acquire()
+        controller.release(latency_s=60.0)
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert (rejected.status_code, rejected.reason) == (503, "estimated wait exceeds limit")
+    assert rejected.retry_after > 1
+
+
+def test_batches_take_one_unit_per_query_capped_at_capacity():
+    async def scenario():
+        controller = _controller(max_in_flight=4, max_queue=8)
+        assert await controller.acquire(3) == 3
+        assert await controller.acquire(1) == 1
+        # Too big for the free capacity: queued, and queues the single request behind it (FIFO)
+        batch = asyncio.ensure_future(controller.acquire(100))
+        single = asyncio.ensure_future(controller.acquire(1))
+        await asyncio.sleep(0)
+        queued = controller.stats()['queued']
+        controller.release(weight=1)
+        await asyncio.sleep(0)
+        assert not batch.done()
+        controller.release(weight=3)
+        units = await batch
+        assert not single.done()
+        controller.release(weight=units)
+        await single
+        return queued, units
+
+    assert asyncio.run(scenario()) == (5, 4)
+
+
+def test_observed_latency_shrinks_the_queue():
+    controller = _controller(max_in_flight=4, max_queue=32, max_wait_s=1.0)
+    controller.latency_s = 0.05
+    assert controller.queue_limit() == 32
+    controller.latency_s = 0.5
+    assert controller.queue_limit() == 8
+    assert controller.stats()['queue_limit'] == 8
+
+
+def test_queued_batch_is_rejected_when_it_would_wait_too_long():
+    async def scenario():
+        controller = _controller(max_in_flight=4, max_queue=32, max_wait_s=1.0, initial_latency_s=0.5)
+        await controller.acquire(4)
+        first = asyncio.ensure_future(controller.acquire(4))
+        second = asyncio.ensure_future(controller.acquire(4))  # 8 of 8 startable units queued
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(4)
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        queued = controller.stats()['queued']
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        return rejected.value, queued
+
+    rejected, queued = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert queued == 4  # the cancelled waiter gave its units back
+
+
+def test_admit_records_latency_per_query():
+    async def scenario():
+        controller = _controller(max_in_flight=4, initial_latency_s=0.0, max_wait_s=5.0)
+        controller.ewma_alpha = 1.0
+        async with controller.admit(weight=40):
+            await asyncio.sleep(0.05)
+        return controller.latency_s
+
+    assert 0.004 <= asyncio.run(scenario()) < 0.02  # 0.05s on 4 units for 40 queries
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _lines(response):
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.endswith("\n")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_search_batch_streams_one_line_per_query_in_order(api_main):
+    client = TestClient(api_main.app)
+    queries = ["export formats", "Polygon tool", "webhooks"]
+    response = client.post("/search/batch", json={"queries": queries, "k": 2})
+    assert response.status_code == 200
+    items = _lines(response)
+    assert [item['index'] for item in items] == [0, 1, 2]
+    assert [item['query'] for item in items] == queries
+    assert all(len(item['results']) == 2 and item['error'] is None for item in items)
+    assert items[1]['results'][0]['title'] == "Polygon tool"
+    # One batched retrieval for the whole request
+    assert api_main.chatbot.retrieved == queries
+
+
+def test_rag_batch_tags_every_answer_with_its_index(api_main):
+    client = TestClient(api_main.app)
+    messages = [f"question {i}" for i in range(6)]
+    response = client.post("/rag/batch", json={"messages": messages, "context_k": 1})
+    assert response.status_code == 200
+    items = sorted(_lines(response), key=lambda item: item['index'])
+    assert [item['index'] for item in items] == list(range(6))
+    assert [item['response']['response'] for item in items] == [f"answer: {m}" for m in messages]
+    # Retrieval with the enhanced query, generation with the message as sent
+    assert api_main.chatbot.retrieved == [f"{m} labellerr" for m in messages]
+
+
+def test_failed_item_does_not_abort_the_stream(api_main):
+    api_main.chatbot.fail_on = {"question 1"}
+    client = TestClient(api_main.app)
+    response = client.post("/rag/batch", json={"messages": ["question 0", "question 1", "question 2"]})
+    assert response.status_code == 200
+    items = {item['index']: item for item in _lines(response)}
+    assert set(items) == {0, 1, 2}
+    assert items[1]['response'] is None
+    assert "generation failed" in items[1]['error']
+    assert items[0]['response']['response'] == "answer: question 0"
+    assert items[2]['error'] is None
+
+
+@pytest.mark.parametrize("path,field", [("/search/batch", "queries"), ("/rag/batch", "messages")])
+def test_empty_and_oversized_batches_are_rejected(api_main, monkeypatch, path, field):
+    client = TestClient(api_main.app)
+    assert client.post(path, json={field: []}).status_code == 400
+
+    monkeypatch.setattr(api_main.settings, "BATCH_MAX_QUERIES", 3)
+    response = client.post(path, json={field: ["a", "b", "c", "d"]})
+    assert response.status_code == 413
+    assert "exceeds limit of 3" in response.json()['detail']
+    assert api_main.chatbot.retrieved == []
@@ -0,0 +1,91 @@
+import json
+import os
+import random
+
+import pytest
+
+from scripts.embedding.process_and_embed import DocumentProcessor
+from scripts.processing.boilerplate import BoilerplateDetector
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "scripts", "embedding", "data")
+WEBSITE_DUMP = os.path.join(DATA_DIR, "website_content_extracted.json")
+
+NAV = "Home\nPricing\nDocs\nBlog"
+FOOTER = "© 2024 Labellerr Inc. All rights reserved. Privacy Policy | Terms of Service\nBook a demo"
+
+
+TOPICS = ["polygons", "keypoints", "exports", "webhooks", "reviews", "datasets", "projects", "audio",
+          "video", "text", "dicom", "pdf", "members", "billing", "ontology", "sdk", "api", "queues",
+          "metrics", "labels"]
+
+
+def _pages(n=20):
+    # Numbers are normalized away, so pages differ by words
+    return [f"{NAV}\nThis page explains {TOPICS[i]} in its own words.\n"
+            f"A paragraph only about {TOPICS[i]}.\n{FOOTER}" for i in range(n)]
+
+
+def test_repeated_lines_are_stripped_and_content_kept():
+    detector = BoilerplateDetector(min_pages=5, min_share=0.1).fit(_pages())
+    stripped = detector.strip(_pages()[3])
+    assert "Pricing" not in stripped
+    assert "All rights reserved" not in stripped
+    assert "Book a demo" not in stripped
+    assert stripped.splitlines() == ["This page explains webhooks in its own words.",
+                                     "A paragraph only about webhooks."]
+
+
+def test_below_threshold_nothing_is_stripped():
+    pages = _pages(4)
+    detector = BoilerplateDetector(min_pages=5).fit(pages)
+    assert detector.strip(pages[0]) == pages[0]
+    assert detector.stats['removed_spans'] == 0
+
+
+def test_a_page_counts_each_fingerprint_once():
+    # Five copies of the menu on one page are still one page
+    detector = BoilerplateDetector(min_pages=2, min_share=0.0)
+    detector.fit(["\n".join([NAV] * 5), "Something else entirely on this page"])
+    assert not detector.blocks
+
+
+def test_flattened_pages_are_shingled():
+    menu = ("Product Data Annotation Platform Comprehensive solution for efficient data labeling. "
+            "Video Annotation Platform Advanced tools for dynamic video labeling.")
+    rng = random.Random(0)
+    pages = [f"About {topic} {menu} " + " ".join(rng.choice(TOPICS) for _ in range(60)) + " end"
+             for topic in TOPICS[:10]]
+    detector = BoilerplateDetector(min_pages=5).fit(pages)
+    stripped = detector.strip(pages[2])
+    assert "Comprehensive solution" not in stripped
+    assert stripped.startswith("About exports ")
+    assert stripped.endswith(pages[2][-40:])
+    assert "\n" not in stripped
+
+
+def test_unfitted_detector_cannot_be_refitted():
+    detector = BoilerplateDetector().fit(_pages())
+    with pytest.raises(RuntimeError):
+        detector.add_page("late page")
+
+
+@pytest.mark.skipif(not os.path.exists(WEBSITE_DUMP), reason="website dump not checked out")
+def test_website_dump_nav_and_cta_are_removed_before_chunking():
+    processor = DocumentProcessor(boilerplate_min_pages=5, boilerplate_min_share=0.1)
+    file_config = {WEBSITE_DUMP: "website_content"}
+    processor.fit_boilerplate(file_config)
+    assert processor.boilerplate.blocks
+
+    chunks = list(processor.iter_chunks(file_config))
+    text = "\n".join(chunk['text'] for chunk in chunks)
+    # Banner and menu on every page, CTA block above the footer
+    assert "Spring High Performer and Easiest To Use" not in text
+    assert "Comprehensive solution for efficient data labeling" not in text
+    assert "Model Faster With 75% Less Cost" not in text
+
+    with open(WEBSITE_DUMP, 'r', encoding='utf-8') as f:
+        pages = json.load(f)
+    # Page-specific copy survives
+    assert "Data annotation is a process to turn unstructured data" in pages[1]['text_content']
+    assert "Data annotation is a process to turn unstructured data" in text
+    assert {chunk['url'] for chunk in chunks} >= {page['url'] for page in pages[:5]}
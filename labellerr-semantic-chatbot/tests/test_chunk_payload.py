@@ -0,0 +1,12 @@
+from api.qdrant_service import QdrantManager, chunk_point_id
+
+
+def test_metadata_cannot_overwrite_core_payload_fields():
+    chunk = {'id': "doc:0", 'text': "real text", 'url': "https://docs.labellerr.com/a", 'title': "A",
+             'metadata': {'text': "other", 'url': "elsewhere", 'chunk_id': "x", 'content_hash': "0",
+                          'month': "2024-05", 'tags': ["export"]}}
+    point_id, payload = QdrantManager()._chunk_payload(chunk, "model")
+    assert point_id == chunk_point_id("doc:0")
+    assert (payload['text'], payload['url'], payload['chunk_id']) == ("real text", "https://docs.labellerr.com/a", "doc:0")
+    assert payload['content_hash'] != "0"
+    assert (payload['month'], payload['tags']) == ("2024-05", ["export"])
@@ -0,0 +1,49 @@
+from scripts.embedding.process_and_embed import DocumentProcessor
+from scripts.processing.chunker import TokenChunker, chunk_strings
+from scripts.processing.html_text import sections_text
+
+
+def _paragraph(topic, sentences=6):
+    return " ".join(f"The {topic} step number {i} is described in this sentence." for i in range(sentences))
+
+
+def _document():
+    return (f"Creating projects\n\n{_paragraph('project')}\n\n{_paragraph('dataset')}\n\n"
+            f"Exporting labels\n\n{_paragraph('export')}\n\n{_paragraph('format')}")
+
+
+def test_clean_text_keeps_line_and_paragraph_breaks():
+    processor = DocumentProcessor(chunker=TokenChunker(max_seq_length=128))
+    cleaned = processor.clean_text("Intro  line\there \n\n\n\nSetup\n\n  Step one.   \n  Step two.\r\n")
+    assert cleaned == "Intro line here\n\nSetup\n\nStep one.\nStep two."
+
+
+def test_chunks_start_at_headings_after_cleaning():
+    processor = DocumentProcessor(chunker=TokenChunker(max_seq_length=160, overlap_tokens=16))
+    text = processor.clean_text(_document().replace("\n\n", " \n \n\t"))
+    chunks = processor.chunker.chunk(text)
+    assert len(chunks) > 2
+    assert any(chunk.text.startswith("Exporting labels") for chunk in chunks)
+    assert {chunk.heading for chunk in chunks} == {"Creating projects", "Exporting labels"}
+    assert all(chunk.tokens <= processor.chunker.max_tokens for chunk in chunks)
+
+
+def test_flattened_text_loses_heading_cuts():
+    # What clean_text used to hand the chunker: one line, no headings to cut at
+    chunker = TokenChunker(max_seq_length=160, overlap_tokens=16)
+    chunks = chunker.chunk(" ".join(_document().split()))
+    assert {chunk.heading for chunk in chunks} == {""}
+
+
+def test_chunk_strings_sizes_scraper_chunks_in_tokens():
+    chunker = TokenChunker.for_model("all-mpnet-base-v2", max_tokens=64)
+    texts = chunk_strings(_document(), "all-mpnet-base-v2", max_tokens=64)
+    assert len(texts) > 3
+    assert all(chunker.count_tokens(text) <= 64 for text in texts)
+    assert chunk_strings("   ") == []
+
+
+def test_sections_text_puts_headings_and_blocks_on_own_paragraphs():
+    html = ("<html><body><script>var x = 1;</script><h1>Guide</h1><p>Intro <b>bold</b> text.</p>"
+            "<h2>Setup</h2><ul><li>One</li><li>Two</li></ul><p>Done.</p></body></html>")
+    assert sections_text(html) == "Guide\n\nIntro bold text.\n\nSetup\n\nOne Two\n\nDone."
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from api.qdrant_service import (QdrantManager, get_alias_target, legacy_version_name,
+                                list_versioned_collections, switch_alias)
+
+ALIAS = "kb"
+DIM = 4
+
+
+def _manager():
+    manager = QdrantManager(collection_name=ALIAS)
+    manager.client = QdrantClient(":memory:")
+    return manager
+
+
+def _collection(manager, name, points=3):
+    manager.client.create_collection(name, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    rng = np.random.default_rng(0)
+    manager.client.upsert(name, points=[PointStruct(id=i, vector=rng.random(DIM).tolist(), payload={'text': f"t{i}"})
+                                        for i in range(points)])
+
+
+def _count(manager, name):
+    return manager.client.count(name, exact=True).count
+
+
+def test_create_collection_behind_an_alias_keeps_the_live_data():
+    manager = _manager()
+    _collection(manager, "kb_v20240101000000")
+    switch_alias(manager.client, ALIAS, "kb_v20240101000000")
+
+    manager.create_collection(vector_size=DIM)
+    live = get_alias_target(manager.client, ALIAS)
+    assert live != "kb_v20240101000000"
+    assert _count(manager, live) == 0
+    assert _count(manager, "kb_v20240101000000") == 3
+    assert manager.rollback() == "kb_v20240101000000"
+
+
+def test_legacy_collection_is_kept_as_the_oldest_version():
+    manager = _manager()
+    _collection(manager, ALIAS, points=5)
+    _collection(manager, "kb_v20240101000000", points=2)
+
+    previous = switch_alias(manager.client, ALIAS, "kb_v20240101000000")
+    assert previous == legacy_version_name(ALIAS)
+    assert get_alias_target(manager.client, ALIAS) == "kb_v20240101000000"
+    assert list_versioned_collections(manager.client, ALIAS)[0] == previous
+    assert _count(manager, previous) == 5
+    assert manager.rollback() == previous
+
+
+def test_migration_refuses_a_missing_target():
+    manager = _manager()
+    _collection(manager, ALIAS)
+    with pytest.raises(ValueError):
+        switch_alias(manager.client, ALIAS, "kb_v20240101000000")
+    assert _count(manager, ALIAS) == 3
+
+
+def test_queries_use_the_newest_version_while_the_alias_is_being_created():
+    manager = _manager()
+    _collection(manager, legacy_version_name(ALIAS))
+    _collection(manager, "kb_v20240101000000")
+    # Legacy collection dropped, alias not created yet
+    assert manager.resolve_live_index(DIM) == ("kb_v20240101000000", None)
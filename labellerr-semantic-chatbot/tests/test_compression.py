@@ -0,0 +1,53 @@
+import gzip
+
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from api.utils.compression import CompressionMiddleware, parse_accept_encoding
+
+BODY = b'{"results": [' + b'{"text": "labellerr"},' * 200 + b'{}]}'
+
+
+def _client():
+    async def page(request):
+        return Response(BODY, media_type="application/json", headers={"ETag": '"v1-abc"'})
+
+    async def weak(request):
+        return Response(BODY, media_type="application/json", headers={"ETag": 'W/"v1-abc"'})
+
+    async def stream(request):
+        async def lines():
+            for i in range(3):
+                yield b'{"i": %d}\n' % i
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    app = Starlette(routes=[Route("/page", page), Route("/weak", weak), Route("/stream", stream)])
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    return TestClient(app)
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip;q=0.5, br, identity;q=0") == {'gzip': 0.5, 'br': 1.0, 'identity': 0.0}
+
+
+def test_compressed_response_carries_a_weak_etag():
+    client = _client()
+    response = client.get("/page", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"v1-abc"'
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.content == BODY
+
+    identity = client.get("/page", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] == '"v1-abc"'
+    assert client.get("/weak", headers={"Accept-Encoding": "gzip"}).headers["etag"] == 'W/"v1-abc"'
+
+
+def test_streaming_response_is_compressed_incrementally():
+    with _client().stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw) == b'{"i": 0}\n{"i": 1}\n{"i": 2}\n'
@@ -0,0 +1,62 @@
+import multiprocessing as mp
+
+import numpy as np
+
+from api.embedding_cache import EmbeddingCache
+
+DIM = 8
+
+
+def _vector(text):
+    return np.random.default_rng(abs(hash(text)) % (2 ** 32)).random(DIM, dtype=np.float32)
+
+
+def _cache(path):
+    return EmbeddingCache(path, "model", "f" * 40, DIM)
+
+
+def _add_texts(path, worker, rounds):
+    cache = _cache(path)
+    for i in range(rounds):
+        # Every worker also adds a text shared with all the others
+        texts = [f"w{worker}-{i}-{j}" for j in range(5)] + [f"shared-{i}"]
+        cache.add(texts, np.stack([_vector(text) for text in texts]))
+
+
+def test_lookup_hits_and_misses(tmp_path):
+    cache = _cache(str(tmp_path))
+    cache.add(["a", "b", "a"], np.stack([_vector("a"), _vector("b"), _vector("a")]))
+    found, missing = cache.lookup(["b", "x", "a"])
+    assert missing == [1]
+    np.testing.assert_array_equal(found[[0, 2]], np.stack([_vector("b"), _vector("a")]))
+    assert cache.stats()['rows'] == 2
+
+
+def test_processes_appending_concurrently_never_share_a_row(tmp_path):
+    path = str(tmp_path)
+    ctx = mp.get_context("fork")
+    workers = [ctx.Process(target=_add_texts, args=(path, w, 20)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    cache = _cache(path)
+    texts = [f"w{w}-{i}-{j}" for w in range(4) for i in range(20) for j in range(5)]
+    texts += [f"shared-{i}" for i in range(20)]
+    found, missing = cache.lookup(texts)
+    assert missing == []
+    np.testing.assert_array_equal(found, np.stack([_vector(text) for text in texts]))
+    assert cache.stats()['rows'] == len(texts)
+
+
+def test_torn_tail_is_dropped_before_appending(tmp_path):
+    cache = _cache(str(tmp_path))
+    cache.add(["a"], _vector("a")[None])
+    with open(cache.vectors_path, 'ab') as f:
+        f.write(b"\0" * 5)  # a crashed writer's partial row
+    cache.add(["b"], _vector("b")[None])
+    found, missing = cache.lookup(["a", "b"])
+    assert missing == []
+    np.testing.assert_array_equal(found, np.stack([_vector("a"), _vector("b")]))
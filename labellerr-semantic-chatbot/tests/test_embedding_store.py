@@ -0,0 +1,84 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from api.embedding_store import EmbeddingBundle, load_chunks, write_bundle
+
+
+def _chunks(n=30):
+    chunks = [{'id': f"c{i}", 'text': f"chunk {i} ✓", 'text_for_embedding': "dropped"} for i in range(n)]
+    if n > 7:
+        chunks[3]['metadata'] = {'page': 3, 'tags': ['a']}  # column appearing late, non-string value
+        chunks[7]['score'] = None
+    return chunks
+
+
+def _embeddings(n=30, dim=8):
+    return np.random.default_rng(1).normal(size=(n, dim)).astype(np.float32)
+
+
+def test_round_trip_decodes_chunks_and_maps_vectors(tmp_path):
+    path = str(tmp_path / "bundle")
+    chunks, embeddings = _chunks(), _embeddings()
+    manifest = write_bundle(path, chunks, embeddings, "model", batch_size=7)
+    assert manifest['count'] == 30
+
+    bundle = EmbeddingBundle(path, verify=True)
+    expected = [{k: v for k, v in chunk.items() if k != 'text_for_embedding'} for chunk in chunks]
+    assert bundle.chunks() == expected
+    assert bundle.chunk(3)['metadata'] == {'page': 3, 'tags': ['a']}
+    assert 'score' in bundle.chunk(7) and 'score' not in bundle.chunk(8)
+    assert isinstance(bundle.embeddings, np.memmap)
+    np.testing.assert_array_equal(bundle.embeddings, embeddings)
+    assert load_chunks(str(tmp_path)) == expected
+
+
+def test_batches_follow_chunk_order(tmp_path):
+    path = str(tmp_path / "bundle")
+    write_bundle(path, _chunks(), _embeddings(), "model")
+    batches = list(EmbeddingBundle(path).iter_batches(batch_size=8))
+    assert [len(chunks) for chunks, _ in batches] == [8, 8, 8, 6]
+    np.testing.assert_array_equal(np.concatenate([vectors for _, vectors in batches]), _embeddings())
+
+
+def test_int8_bundle_records_recall_and_dequantizes(tmp_path):
+    path = str(tmp_path / "bundle")
+    manifest = write_bundle(path, _chunks(), _embeddings(), "model", dtype='int8')
+    assert manifest['recall']['recall@1'] > 0.5
+    bundle = EmbeddingBundle(path)
+    assert bundle.matrix.data.dtype == np.int8
+    assert np.abs(bundle.embeddings - _embeddings()).max() < 0.05
+
+
+def test_truncated_file_and_checksum_mismatch_are_detected(tmp_path):
+    path = str(tmp_path / "bundle")
+    write_bundle(path, _chunks(), _embeddings(), "model")
+    vectors = os.path.join(path, "embeddings.f32")
+    data = bytearray(open(vectors, 'rb').read())
+    data[0] ^= 0xFF
+    open(vectors, 'wb').write(bytes(data))
+    with pytest.raises(ValueError, match="Checksum"):
+        EmbeddingBundle(path, verify=True)
+    open(vectors, 'wb').write(bytes(data[:-4]))
+    with pytest.raises(ValueError, match="bytes"):
+        EmbeddingBundle(path)
+
+
+def test_rewrite_replaces_the_bundle_atomically(tmp_path):
+    path = str(tmp_path / "bundle")
+    write_bundle(path, _chunks(), _embeddings(), "model")
+    write_bundle(path, _chunks(5), _embeddings(5), "model")
+    assert len(EmbeddingBundle(path)) == 5
+    assert sorted(os.listdir(tmp_path)) == ["bundle"]
+    with open(os.path.join(path, "manifest.json")) as f:
+        assert json.load(f)['count'] == 5
+
+
+def test_dequantized_copy_is_made_once(tmp_path):
+    path = str(tmp_path / "bundle")
+    write_bundle(path, _chunks(), _embeddings(), "model", dtype='int8')
+    bundle = EmbeddingBundle(path)
+    assert bundle.embeddings is bundle.embeddings
+    np.testing.assert_array_equal(bundle.matrix.take([4, 1]), bundle.embeddings[[4, 1]])
@@ -0,0 +1,109 @@
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+from scripts.processing.html_text import (DOCS_BOILERPLATE, PAGE_CHROME, SOUP_PARSER, HtmlTextExtractor, SelectorSet,
+                                         segment_sections)
+
+DOCS_HTML = os.path.join(os.path.dirname(os.path.dirname(__file__)), "scripts", "embedding", "data",
+                         "docs_html_content.html")
+
+PAGES = [
+    "<html><body><p>a</p></body></html> late",
+    "<html><body>a</body></html><!-- c --> late <b>t</b>",
+    "<p>x</p><textarea>see <b>bold</b> &amp; more</textarea><p>y</p>",
+    "<div><nav>Home Pricing</nav><main class='content'><h1>Title</h1><p>Body <i>text</i></p></main>"
+    "<footer>(c) 2024</footer><script>var a = 1;</script></div>",
+    "<?xml version='1.0' encoding='utf-8'?><html><body><p>declared</p></body></html>",
+]
+
+
+def _reference(html, remove=(), content_roots=()):
+    # What the scrapers did before the shared engine: decompose, select_one, get_text
+    soup = BeautifulSoup(html, "html.parser")
+    for selector in remove:
+        for element in soup.select(selector):
+            element.decompose()
+    root = next((soup.select_one(selector) for selector in content_roots if soup.select_one(selector)), soup)
+    return root.get_text(separator=' ', strip=True)
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+@pytest.mark.parametrize("html", PAGES)
+def test_matches_get_text_after_decompose(html, parser):
+    extractor = HtmlTextExtractor(remove=PAGE_CHROME, parser=parser)
+    assert extractor.extract(html) == _reference(html, PAGE_CHROME)
+
+
+def test_text_after_closing_html_tag_is_kept():
+    assert HtmlTextExtractor(parser="lxml").extract("<html><body><p>a</p></body></html> late") == "a late"
+
+
+@pytest.mark.parametrize("builder", ["lxml", "html.parser"])
+def test_textarea_markup_is_not_returned_as_text(builder):
+    html = "<textarea>see <b>bold</b></textarea>"
+    assert HtmlTextExtractor().extract(BeautifulSoup(html, builder)) == "see bold"
+
+
+def test_content_root_priority_follows_the_selector_order():
+    html = "<body><div class='post'>post</div><article>article</article></body>"
+    extractor = HtmlTextExtractor(content_roots=('article', '.post'))
+    assert extractor.extract(html) == "article"
+    assert HtmlTextExtractor(content_roots=('.missing',)).extract(html) == ""
+
+
+def test_complex_selectors_are_rejected():
+    with pytest.raises(ValueError):
+        SelectorSet(['div > p'])
+
+
+@pytest.mark.skipif(not os.path.exists(DOCS_HTML), reason="docs page not checked out")
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_docs_page_golden(parser):
+    with open(DOCS_HTML, 'r', encoding='utf-8') as f:
+        html = f.read()
+    expected = _reference(html, DOCS_BOILERPLATE)
+    assert len(expected) > 10000
+    assert HtmlTextExtractor(remove=DOCS_BOILERPLATE, parser=parser).extract(html) == expected
+    roots = ('article', 'main', 'body')
+    assert (HtmlTextExtractor(remove=PAGE_CHROME, content_roots=roots, parser=parser).extract(html)
+            == _reference(html, PAGE_CHROME, roots))
+
+
+SECTIONED = ("<html><body><p>Welcome to the docs.</p>"
+             "<h1>Guide</h1><p>Guide intro text.</p>"
+             "<div><h2>Setup</h2><p>Install the SDK.</p><h3>Keys</h3><p>Create an API key.</p></div>"
+             "<h2>Export</h2><ul><li>Pick a format</li><li><h3>COCO</h3>Boxes and polygons.</li></ul>"
+             "<p>ok</p><h2></h2><p>After empty heading.</p></body></html>")
+
+
+def test_segment_sections_tracks_nested_heading_paths():
+    sections = segment_sections(BeautifulSoup(SECTIONED, SOUP_PARSER))
+    assert [(s.heading, s.level, s.path) for s in sections] == [
+        ("Guide", 1, ("Guide",)),
+        ("Setup", 2, ("Guide", "Setup")),
+        ("Keys", 3, ("Guide", "Setup", "Keys")),
+        ("Export", 2, ("Guide", "Export")),
+        ("COCO", 3, ("Guide", "Export", "COCO")),
+    ]
+    assert sections[2].element.name == "h3"
+    assert sections[2].content == "Create an API key."
+
+
+def test_heading_inside_a_block_ends_the_block():
+    sections = {s.heading: s for s in segment_sections(BeautifulSoup(SECTIONED, SOUP_PARSER))}
+    assert sections["Export"].blocks == ["Pick a format"]
+    # Short blocks are dropped, an empty heading is ordinary content
+    assert sections["COCO"].blocks == ["Boxes and polygons.", "After empty heading."]
+
+
+def test_preamble_is_returned_only_on_request():
+    soup = BeautifulSoup(SECTIONED, SOUP_PARSER)
+    assert segment_sections(soup)[0].heading == "Guide"
+    preamble = segment_sections(soup, preamble=True)[0]
+    assert (preamble.heading, preamble.level, preamble.path, preamble.element) == ("", 0, (), None)
+    assert preamble.blocks == ["Welcome to the docs."]
+    # No text before the first heading: no empty preamble section
+    no_intro = BeautifulSoup("<h1>Only</h1><p>Body text.</p>", SOUP_PARSER)
+    assert [s.heading for s in segment_sections(no_intro, preamble=True)] == ["Only"]
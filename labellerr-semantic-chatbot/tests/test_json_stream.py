@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from scripts.processing.json_stream import iter_json_array, iter_json_records
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_array_is_streamed_across_small_reads(tmp_path):
+    records = [{'id': i, 'text': "é" * i, 'score': i / 3, 'tags': [i, None, True]} for i in range(50)]
+    path = _write(tmp_path, "a.json", json.dumps(records, indent=2))
+    assert list(iter_json_array(path, read_size=7)) == records
+
+
+def test_numbers_split_by_a_read_are_not_truncated(tmp_path):
+    path = _write(tmp_path, "n.json", "[12345678, 3.25e10, -7]")
+    for read_size in range(1, 10):
+        assert list(iter_json_array(path, read_size=read_size)) == [12345678, 3.25e10, -7]
+
+
+def test_array_under_a_key_skips_other_members(tmp_path):
+    path = _write(tmp_path, "k.json", json.dumps({'meta': {'n': [1, 2]}, 'pages': [{'a': 1}, {'a': 2}], 'tail': 1}))
+    assert list(iter_json_array(path, key='pages', read_size=4)) == [{'a': 1}, {'a': 2}]
+    assert list(iter_json_array(path, key='missing')) == []
+    assert list(iter_json_array(path)) == [json.loads(open(path).read())]
+    assert list(iter_json_array(path, object_as_record=False)) == []
+
+
+def test_empty_inputs(tmp_path):
+    assert list(iter_json_array(_write(tmp_path, "e.json", " [ ] "))) == []
+    assert list(iter_json_array(_write(tmp_path, "b.json", ""))) == []
+
+
+def test_truncated_array_raises(tmp_path):
+    with pytest.raises(ValueError):
+        list(iter_json_array(_write(tmp_path, "t.json", '[{"a": 1}, {"a": ')))
+
+
+def test_jsonl_skips_blank_and_malformed_lines(tmp_path):
+    path = _write(tmp_path, "r.jsonl", '{"a": 1}\n\n{broken\n{"a": 2}\n')
+    assert list(iter_json_records(path)) == [{'a': 1}, {'a': 2}]
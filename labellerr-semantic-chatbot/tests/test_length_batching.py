@@ -0,0 +1,89 @@
+import numpy as np
+
+from api.length_batching import BatchAutotuner, LengthBucketedEncoder, length_bucket
+
+
+class FakeModel:
+    tokenizer = None
+    max_seq_length = 512
+    device = "cpu"
+
+    def __init__(self):
+        self.batches = []
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+    def encode(self, texts, batch_size, **kwargs):
+        self.batches.append(len(texts))
+        return np.array([[len(text.split()), 0, 0, 1] for text in texts], dtype=np.float32)
+
+
+class FakeProbe:
+    """Headroom of 8 MB, 1 KB per padded token"""
+
+    def __init__(self):
+        self.padded = 0
+
+    def headroom(self):
+        return 8 * 1024 * 1024
+
+    def start(self):
+        return 0
+
+    def peak_since(self, baseline):
+        return self.padded * 1024
+
+
+def _texts(n, words=10):
+    return [" ".join(["word"] * words) + f" {i}" for i in range(n)]
+
+
+def test_results_keep_input_order():
+    model = FakeModel()
+    texts = [" ".join(["w"] * n) for n in (50, 3, 20, 3, 80)]
+    out = LengthBucketedEncoder(model).encode(texts, verbose=False)
+    assert out[:, 0].tolist() == [50, 3, 20, 3, 80]
+
+
+def test_caller_batch_size_caps_the_autotuner():
+    model = FakeModel()
+    encoder = LengthBucketedEncoder(model, BatchAutotuner(candidates=(64, 128)))
+    encoder.encode(_texts(100), verbose=False, batch_size=8)
+    assert max(model.batches) == 8
+    # Capped batches are not throughput samples for the uncapped sizes
+    assert encoder.autotuner.chosen() == {}
+
+
+def test_cpu_models_keep_the_fixed_token_budget():
+    encoder = LengthBucketedEncoder(FakeModel())
+    assert encoder.memory_probe is None
+    encoder.encode(_texts(40), verbose=False)
+    assert encoder.last_stats['max_tokens_per_batch'] == 16384
+
+
+def test_measured_memory_sets_the_token_budget():
+    model = FakeModel()
+    probe = FakeProbe()
+    encoder = LengthBucketedEncoder(model, BatchAutotuner(candidates=(16, 32, 64, 128, 256)), memory_probe=probe)
+    encode_batch = encoder._encode_batch
+
+    def measured(batch):
+        probe.padded = len(batch) * 16
+        return encode_batch(batch)
+
+    encoder._encode_batch = measured
+    encoder.encode(_texts(600), verbose=False)
+    # 0.8 * 8 MB / 1 KB per token
+    assert encoder.autotuner.max_tokens_per_batch == 6553
+    assert max(model.batches) * length_bucket(16) <= 6553
+
+
+def test_lower_budget_resettles_oversized_buckets():
+    tuner = BatchAutotuner(candidates=(16, 32, 64))
+    for size in (16, 32, 64):
+        tuner.record(64, size, tokens=size * 64, seconds=1.0 / size)
+    tuner._settle(64)
+    assert tuner.chosen() == {64: 64}
+    tuner.set_token_budget(32 * 64)
+    assert tuner.batch_size(64) == 32
@@ -0,0 +1,28 @@
+import os
+
+import numpy as np
+
+from api.embedding_cache import EmbeddingCache
+from api.parallel_embedding import _worker_environment
+
+
+def test_thread_limits_are_set_for_spawning_and_restored(monkeypatch):
+    monkeypatch.setenv("OMP_NUM_THREADS", "16")
+    monkeypatch.delenv("MKL_NUM_THREADS", raising=False)
+    with _worker_environment(3):
+        assert os.environ["OMP_NUM_THREADS"] == "3"
+        assert os.environ["MKL_NUM_THREADS"] == "3"
+        assert os.environ["TOKENIZERS_PARALLELISM"] == "false"
+    assert os.environ["OMP_NUM_THREADS"] == "16"
+    assert "MKL_NUM_THREADS" not in os.environ
+
+
+def test_cache_lookup_fills_a_memmap_target(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache"), "model", "f" * 40, dim=4)
+    cache.add(["a", "b"], np.eye(4, dtype=np.float32)[:2])
+    out = np.lib.format.open_memmap(str(tmp_path / "out.npy"), mode='w+', dtype=np.float32, shape=(3, 4))
+    filled, missing = cache.lookup(["b", "c", "a"], out=out)
+    assert filled is out
+    assert missing == [1]
+    out.flush()
+    np.testing.assert_array_equal(np.load(tmp_path / "out.npy")[[0, 2]], np.eye(4)[[1, 0]])
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api.utils.admission import AdmissionRejected
+from api.utils.pools import PRIORITY_BATCH, PRIORITY_CHAT, PRIORITY_INTERACTIVE, BulkheadPool
+
+
+def _blocked(pool):
+    """Occupy the pool's only worker until the returned event is set"""
+    release, started = threading.Event(), threading.Event()
+    future = pool.submit(lambda: started.set() or release.wait(5), priority=PRIORITY_BATCH)
+    assert started.wait(5)
+    return release, future
+
+
+def test_chat_requests_jump_queued_batch_work():
+    pool = BulkheadPool("generation", workers=1, max_queue=10)
+    release, _ = _blocked(pool)
+    order = []
+    futures = [pool.submit(order.append, f"batch {i}", priority=PRIORITY_BATCH) for i in range(3)]
+    futures.append(pool.submit(order.append, "chat", priority=PRIORITY_CHAT))
+    futures.append(pool.submit(order.append, "search", priority=PRIORITY_INTERACTIVE))
+    release.set()
+    for future in futures:
+        future.result(5)
+    # Priority first, FIFO within a priority
+    assert order == ["search", "chat", "batch 0", "batch 1", "batch 2"]
+    pool.shutdown()
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    pool = BulkheadPool("generation", workers=1, max_queue=2)
+    release, _ = _blocked(pool)
+    queued = [pool.submit(time.sleep, 0) for _ in range(2)]
+    with pytest.raises(AdmissionRejected) as rejected:
+        pool.submit(time.sleep, 0)
+    assert rejected.value.status_code == 503
+    assert rejected.value.retry_after >= 1
+    assert pool.stats()['rejected'] == 1
+
+    release.set()
+    for future in queued:
+        future.result(5)
+    pool.submit(time.sleep, 0).result(5)  # room again once drained
+    pool.shutdown()
+
+
+def test_saturated_generation_pool_does_not_block_retrieval():
+    generation = BulkheadPool("generation", workers=1, max_queue=1)
+    retrieval = BulkheadPool("retrieval", workers=1, max_queue=1)
+    release, _ = _blocked(generation)
+    generation.submit(time.sleep, 0)
+    with pytest.raises(AdmissionRejected):
+        generation.submit(time.sleep, 0)
+
+    async def search():
+        return await asyncio.wait_for(retrieval.run(lambda: "hits"), timeout=1)
+
+    assert asyncio.run(search()) == "hits"
+    release.set()
+    generation.shutdown()
+    retrieval.shutdown()
@@ -0,0 +1,46 @@
+import json
+
+from scripts.embedding.process_and_embed import DocumentProcessor
+from scripts.processing.chunker import TokenChunker
+
+TOPICS = ["polygons", "keypoints", "exports", "webhooks", "reviews", "datasets", "projects", "audio"]
+
+
+def _post(i):
+    topic = TOPICS[i % len(TOPICS)]
+    body = "\n\n".join(" ".join(f"Post {i} explains {topic} in sentence {j} of paragraph {p}." for j in range(8))
+                       for p in range(1 + i % 3))
+    return {'title': f"{topic.title()} guide {i}", 'url': f"https://blog.example/{i}", 'content': body}
+
+
+def _inputs(tmp_path):
+    blog = tmp_path / "blog.json"
+    blog.write_text(json.dumps([_post(i) for i in range(23)]), encoding="utf-8")
+    videos = tmp_path / "videos.jsonl"
+    videos.write_text("\n".join(json.dumps({'title': f"Video {i}", 'url': f"https://video.example/{i}",
+                                            'transcript': _post(i + 100)['content'], 'duration': f"{i}:00"})
+                                for i in range(9)), encoding="utf-8")
+    notes = tmp_path / "notes.txt"
+    notes.write_text(_post(500)['content'], encoding="utf-8")
+    return {str(blog): 'blog_json', str(notes): 'txt', str(videos): 'youtube_json'}
+
+
+def _processor():
+    return DocumentProcessor(chunker=TokenChunker(max_seq_length=96, overlap_tokens=8))
+
+
+def test_process_pool_matches_the_serial_result(tmp_path):
+    file_config = _inputs(tmp_path)
+    serial_processor = _processor()
+    serial = serial_processor.process_all_files(file_config, workers=1)
+
+    processor = _processor()
+    parallel = processor.process_all_files(file_config, workers=2, shard_size=4)
+
+    assert len(serial) > len(file_config) * 10
+    assert parallel == serial
+    report = processor.last_report
+    assert report[str(tmp_path / "blog.json")]['tasks'] == 6
+    assert not any(entry['errors'] for entry in report.values())
+    # Worker chunking stats are merged back
+    assert processor.chunker.stats == serial_processor.chunker.stats
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+
+from api.projection import Projection
+from api.qdrant_service import (IndexMismatchError, QdrantManager, is_collection_not_found,
+                                load_collection_projection, save_collection_projection, switch_alias)
+
+ALIAS = "kb"
+
+
+def _manager():
+    manager = QdrantManager(collection_name=ALIAS)
+    manager.client = QdrantClient(":memory:")
+    return manager
+
+
+def _collection(manager, name, size):
+    manager.client.create_collection(name, vectors_config=VectorParams(size=size, distance=Distance.COSINE))
+
+
+def _pca(dim_in=16, dim=4):
+    rng = np.random.default_rng(0)
+    return Projection.fit_pca(rng.normal(size=(64, dim_in)).astype(np.float32), dim)
+
+
+def test_projection_payload_round_trip():
+    projection = _pca()
+    restored = Projection.from_payload(projection.to_payload())
+    assert restored.fingerprint == projection.fingerprint
+    np.testing.assert_array_equal(restored.components, projection.components)
+
+    truncate = Projection.from_payload(Projection.truncate(16, 8).to_payload())
+    assert (truncate.method, truncate.dim) == ('truncate', 8)
+
+
+def test_projection_is_stored_per_physical_collection():
+    manager = _manager()
+    projection = _pca()
+    save_collection_projection(manager.client, "kb_v1", projection)
+    save_collection_projection(manager.client, "kb_v2", None)
+    assert load_collection_projection(manager.client, "kb_v1").fingerprint == projection.fingerprint
+    assert load_collection_projection(manager.client, "kb_v2") is None
+    assert load_collection_projection(manager.client, "kb_v3") is None
+
+
+def _count_alias_lookups(manager):
+    calls = []
+    get_aliases = manager.client.get_aliases
+    manager.client.get_aliases = lambda: calls.append(1) or get_aliases()
+    return calls
+
+
+def test_searches_use_the_cached_live_index():
+    manager = _manager()
+    _collection(manager, "kb_v1", 16)
+    switch_alias(manager.client, ALIAS, "kb_v1")
+    manager.refresh_live_index()
+    calls = _count_alias_lookups(manager)
+    for _ in range(5):
+        assert manager.resolve_live_index(16) == ("kb_v1", None)
+    assert calls == []
+
+
+def test_activation_is_picked_up_by_the_next_search():
+    manager = _manager()
+    projection = _pca(16, 4)
+    _collection(manager, "kb_v1", 16)
+    _collection(manager, "kb_v2", 4)
+    save_collection_projection(manager.client, "kb_v2", projection)
+
+    manager.activate_collection("kb_v1")
+    assert manager.resolve_live_index(16) == ("kb_v1", None)
+
+    # No poll in between: the very next resolution maps queries with v2's basis
+    manager.activate_collection("kb_v2")
+    target, live_projection = manager.resolve_live_index(16)
+    assert target == "kb_v2"
+    assert live_projection.fingerprint == projection.fingerprint
+
+
+def test_switch_by_another_process_is_picked_up_by_the_poll():
+    manager = _manager()
+    _collection(manager, "kb_v1", 16)
+    _collection(manager, "kb_v2", 16)
+    switch_alias(manager.client, ALIAS, "kb_v1")
+    assert manager.resolve_live_index(16) == ("kb_v1", None)
+
+    switch_alias(manager.client, ALIAS, "kb_v2")
+    assert manager.resolve_live_index(16) == ("kb_v1", None)  # still searchable until the poll
+    manager.refresh_live_index()
+    assert manager.resolve_live_index(16) == ("kb_v2", None)
+
+
+def test_mismatch_with_the_cached_index_resolves_again():
+    manager = _manager()
+    projection = _pca(16, 4)
+    _collection(manager, "kb_v1", 8)
+    _collection(manager, "kb_v2", 4)
+    save_collection_projection(manager.client, "kb_v2", projection)
+    switch_alias(manager.client, ALIAS, "kb_v1")
+    manager.refresh_live_index()
+
+    switch_alias(manager.client, ALIAS, "kb_v2")
+    assert manager.resolve_live_index(16)[0] == "kb_v2"
+
+
+def test_pruned_target_is_reported_as_not_found():
+    manager = _manager()
+    _collection(manager, "kb_v1", 16)
+    switch_alias(manager.client, ALIAS, "kb_v1")
+    target, _ = manager.resolve_live_index(16)
+    manager.client.delete_collection("kb_v1")
+    with pytest.raises(Exception) as error:
+        manager.search_similar(np.zeros(16, dtype=np.float32), collection_name=target)
+    assert is_collection_not_found(error.value)
+    assert not is_collection_not_found(ValueError("bad vector"))
+
+
+def test_missing_projection_fails_closed():
+    manager = _manager()
+    _collection(manager, "kb_v1", 4)
+    switch_alias(manager.client, ALIAS, "kb_v1")
+    with pytest.raises(IndexMismatchError):
+        manager.resolve_live_index(16)
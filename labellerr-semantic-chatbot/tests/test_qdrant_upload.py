@@ -0,0 +1,41 @@
+import numpy as np
+from qdrant_client import QdrantClient
+
+from api.qdrant_service import QdrantManager
+from config.settings import settings
+
+
+def _manager(monkeypatch, calls):
+    manager = QdrantManager(collection_name="kb")
+    manager.client = QdrantClient(":memory:")
+    upload = manager.client.upload_collection
+
+    def spy(**kwargs):
+        calls.append(kwargs)
+        return upload(**kwargs)
+
+    monkeypatch.setattr(manager.client, "upload_collection", spy)
+    return manager
+
+
+def _chunks(n):
+    return [{'id': f"c{i}", 'text': f"text {i}", 'url': f"https://x/{i}", 'title': "t"} for i in range(n)]
+
+
+def test_upload_defaults_come_from_settings(monkeypatch):
+    calls = []
+    manager = _manager(monkeypatch, calls)
+    manager.create_collection(vector_size=4)
+    manager.bulk_upload(_chunks(3), np.eye(4, dtype=np.float32)[:3])
+    assert calls[0]['batch_size'] == settings.QDRANT_UPLOAD_BATCH_SIZE
+    assert calls[0]['parallel'] == settings.QDRANT_UPLOAD_PARALLEL
+    assert calls[0]['max_retries'] == settings.QDRANT_UPLOAD_RETRIES
+
+
+def test_bulk_load_threads_max_retries(monkeypatch):
+    calls = []
+    manager = _manager(monkeypatch, calls)
+    load = manager.bulk_load(_chunks(3), np.eye(4, dtype=np.float32)[:3], parallel=1, max_retries=7,
+                             timeout_s=5)
+    assert load['points'] == 3
+    assert (calls[0]['parallel'], calls[0]['max_retries']) == (1, 7)
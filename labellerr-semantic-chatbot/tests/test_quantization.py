@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from api.quantization import QuantizedMatrix, recall_report, sample_queries
+
+
+def _embeddings(rows=500, dim=32):
+    vectors = np.random.default_rng(0).normal(size=(rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("dtype,tolerance", [("float32", 0.0), ("float16", 1e-3), ("int8", 1e-2)])
+def test_dequantize_round_trip(dtype, tolerance):
+    embeddings = _embeddings()
+    matrix = QuantizedMatrix.from_float(embeddings, dtype, block_rows=64)
+    assert np.abs(matrix.dequantize() - embeddings).max() <= tolerance
+    np.testing.assert_allclose(matrix.dequantize(10, 20), matrix.dequantize()[10:20])
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_scores_match_dequantized_dot_products(dtype):
+    embeddings = _embeddings()
+    matrix = QuantizedMatrix.from_float(embeddings, dtype, block_rows=64)
+    queries = embeddings[:3]
+    np.testing.assert_allclose(matrix.scores(queries), queries @ matrix.dequantize().T, rtol=1e-4, atol=1e-4)
+    np.testing.assert_allclose(matrix.scores(queries[0]), matrix.scores(queries)[0], rtol=1e-5, atol=1e-6)
+
+
+def test_top_k_is_exact_across_blocks_and_honours_exclude():
+    embeddings = _embeddings()
+    matrix = QuantizedMatrix.from_float(embeddings, "float32", block_rows=37)
+    queries, rows = sample_queries(embeddings, 20)
+    indices, scores = matrix.top_k(queries, 5, exclude=rows)
+    expected = embeddings @ queries.T
+    expected[rows, np.arange(len(rows))] = -np.inf
+    np.testing.assert_array_equal(indices, np.argsort(-expected.T, axis=1)[:, :5])
+    assert (indices != rows[:, None]).all()
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+
+def test_constant_dimension_and_empty_matrix():
+    embeddings = np.ones((4, 3), dtype=np.float32)
+    np.testing.assert_allclose(QuantizedMatrix.from_float(embeddings, "int8").dequantize(), embeddings)
+    empty = QuantizedMatrix.from_float(np.empty((0, 3), dtype=np.float32), "int8")
+    assert len(empty) == 0 and empty.scores(np.ones(3)).shape == (0,)
+
+
+def test_recall_report_reduced_precision_stays_close():
+    embeddings = _embeddings()
+    queries, rows = sample_queries(embeddings, 50)
+    report = recall_report(embeddings, queries, ks=(1, 10), exclude=rows)
+    assert report['float16']['recall@10'] >= 0.95
+    assert report['int8']['recall@10'] >= 0.8
+    assert report['int8']['size_ratio'] == 0.25
@@ -0,0 +1,31 @@
+from fastapi.testclient import TestClient
+
+
+def test_rag_answers_the_question_as_asked(api_main):
+    client = TestClient(api_main.app)
+    response = client.post("/rag", json={"message": "How do I export  COCO labels?"})
+    assert response.status_code == 200
+    chatbot = api_main.chatbot
+    assert chatbot.generated == ["How do I export  COCO labels?"]
+    assert chatbot.retrieved == ["How do I export  COCO labels? labellerr"]
+    assert response.json()['response'] == "answer: How do I export  COCO labels?"
+
+
+def test_rag_cache_is_keyed_on_the_normalized_question(api_main):
+    client = TestClient(api_main.app)
+    client.post("/rag", json={"message": "How do I export COCO labels?"})
+    response = client.post("/rag", json={"message": "  how do i EXPORT coco labels? "})
+    assert response.status_code == 200
+    assert api_main.chatbot.generated == ["How do I export COCO labels?"]
+
+
+def test_search_embeds_the_original_query(api_main):
+    client = TestClient(api_main.app)
+    response = client.get("/search", params={"q": "Polygon  Tool", "k": 2})
+    assert response.status_code == 200
+    assert api_main.chatbot.retrieved == ["Polygon  Tool"]
+    assert [item['title'] for item in response.json()] == ["Polygon  Tool"] * 2
+
+    # Same normalized query: served from the cache
+    client.get("/search", params={"q": "polygon tool", "k": 2})
+    assert api_main.chatbot.retrieved == ["Polygon  Tool"]
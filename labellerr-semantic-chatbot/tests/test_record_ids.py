@@ -0,0 +1,27 @@
+from api.indexing.sources import chunk_record
+
+MODEL = 'all-MiniLM-L6-v2'
+
+
+def _record(text="Labellerr exports annotations in COCO and YOLO formats. " * 10, **fields):
+    return {'url': "https://docs.labellerr.com/export", 'title': "Export", 'text': text,
+            '_source_file': "updates.json", '_index': 0, **fields}
+
+
+def _ids(record):
+    return [chunk['id'] for chunk in chunk_record(record, MODEL)]
+
+
+def test_fallback_id_does_not_depend_on_the_record_position():
+    assert _ids(_record(_index=0)) == _ids(_record(_index=7))
+
+
+def test_fallback_id_follows_url_title_and_content():
+    base = _ids(_record())
+    assert _ids(_record(url="https://docs.labellerr.com/import")) != base
+    assert _ids(_record(title="Import")) != base
+    assert _ids(_record(text="Projects group datasets, members and ontologies. " * 10)) != base
+
+
+def test_record_id_wins_over_the_fallback():
+    assert _ids(_record(id="rec-1"))[0] == "rec-1:0"
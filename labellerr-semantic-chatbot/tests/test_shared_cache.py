@@ -0,0 +1,148 @@
+import asyncio
+import socket
+import socketserver
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from api.utils.shared_cache import (MemoryCacheBackend, RedisCacheBackend, RedisError, TieredCache,
+                                    cache_key, create_cache_backend)
+
+
+class FakeRedis(socketserver.ThreadingTCPServer):
+    """RESP2 server with just enough of Redis for RedisCacheBackend (GET, SET PX, AUTH, SELECT)"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, password=None):
+        super().__init__(("127.0.0.1", 0), _RespHandler)
+        self.password = password
+        self.store = {}
+        self.commands = []
+        self.drop_next = False
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}127.0.0.1:{self.server_address[1]}/3"
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            if self.server.drop_next:
+                self.server.drop_next = False
+                return  # close without replying
+            self.server.commands.append(args[0].decode())
+            self.wfile.write(self._reply(args))
+
+    def _reply(self, args):
+        command, store = args[0].upper(), self.server.store
+        if command == b"AUTH":
+            return b"+OK\r\n" if args[1].decode() == self.server.password else b"-WRONGPASS invalid password\r\n"
+        if command == b"SELECT":
+            return b"+OK\r\n"
+        if command == b"SET":
+            store[args[1]] = (args[2], time.monotonic() + int(args[4]) / 1000.0)
+            return b"+OK\r\n"
+        if command == b"GET":
+            value, expires_at = store.get(args[1], (None, 0.0))
+            if value is None or expires_at < time.monotonic():
+                return b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        return b"-ERR unknown command\r\n"
+
+
+@pytest.fixture
+def redis():
+    server = FakeRedis(password="secret")
+    yield server
+    server.stop()
+
+
+def _closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_redis_backend_round_trip_and_miss(redis):
+    backend = RedisCacheBackend(redis.url)
+    value = b"binary\r\n\x00value"
+    assert backend.get("missing") is None
+    backend.set("key", value, ttl_s=60)
+    assert backend.get("key") == value
+    assert redis.commands[:2] == ["AUTH", "SELECT"]
+
+
+def test_redis_backend_ttl_expires(redis):
+    backend = RedisCacheBackend(redis.url)
+    backend.set("key", b"v", ttl_s=0.05)
+    time.sleep(0.1)
+    assert backend.get("key") is None
+
+
+def test_redis_backend_reconnects_after_a_dropped_connection(redis):
+    backend = RedisCacheBackend(redis.url)
+    backend.set("key", b"v", ttl_s=60)
+    redis.drop_next = True
+    with pytest.raises(ConnectionError):
+        backend.get("key")
+    assert backend.get("key") == b"v"
+
+
+def test_redis_server_errors_are_raised(redis):
+    backend = RedisCacheBackend(redis.url.replace("secret", "wrong"))
+    with pytest.raises(RedisError):
+        backend.get("key")
+
+
+def test_tiered_cache_shares_values_between_workers(redis):
+    writer, reader = TieredCache(RedisCacheBackend(redis.url)), TieredCache(RedisCacheBackend(redis.url))
+    key = cache_key("search", "kb", 3, "query")
+    writer.set_vector(key, np.arange(4, dtype=np.float32), ttl_s=60)
+    np.testing.assert_array_equal(reader.get_vector(key), np.arange(4, dtype=np.float32))
+    assert reader.stats()['l2_hits'] == 1
+    redis.stop()
+    np.testing.assert_array_equal(reader.get_vector(key), np.arange(4, dtype=np.float32))  # from L1
+
+
+def test_unreachable_backend_is_a_miss_and_backs_off():
+    cache = TieredCache(RedisCacheBackend(f"redis://127.0.0.1:{_closed_port()}/0"), error_backoff_s=60)
+    assert cache.get("key") is None
+    cache.set("key", b"v", ttl_s=60)
+    assert cache.stats()['l2_errors'] == 1  # the set is skipped during the back-off
+    assert cache.get("key") == b"v"
+
+
+def test_async_json_helpers_with_the_memory_backend():
+    async def scenario():
+        backend = MemoryCacheBackend()
+        await TieredCache(backend).aset_json("answer", {'text': "é"}, ttl_s=60)
+        return await TieredCache(backend).aget_json("answer"), await TieredCache(backend).aget_json("other")
+
+    assert asyncio.run(scenario()) == ({'text': "é"}, None)
+
+
+def test_memory_backend_ttl_and_purge():
+    backend = create_cache_backend("memory")
+    backend.purge_every = 2
+    backend.set("old", b"v", ttl_s=-1)
+    backend.set("new", b"v", ttl_s=60)
+    assert backend.get("old") is None and backend.get("new") == b"v"
+    assert list(backend._entries) == ["new"]
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from api.utils.singleflight import SingleFlight, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  How do I\n export\tLabels? ") == "how do i export labels?"
+
+
+def test_concurrent_callers_share_one_execution():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {'answer': 42}
+
+        results = await asyncio.gather(*[flight.do("key", work) for _ in range(5)])
+        again = await flight.do("key", work)
+        return calls, results, again, flight.stats()
+
+    calls, results, again, stats = asyncio.run(scenario())
+    assert len(calls) == 2  # once for the burst, once after it finished
+    assert all(result is results[0] for result in results)
+    assert again == {'answer': 42}
+    assert stats == {'in_flight': 0, 'executions': 2, 'coalesced': 4}
+
+
+def test_exception_reaches_every_caller_and_is_forgotten():
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("backend down")
+
+        results = await asyncio.gather(*[flight.do("key", fail) for _ in range(3)], return_exceptions=True)
+        return results, flight.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert stats['in_flight'] == 0 and stats['executions'] == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_work():
+    async def scenario():
+        flight = SingleFlight("test")
+        done = []
+
+        async def work():
+            await asyncio.sleep(0.02)
+            done.append(1)
+            return "ok"
+
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, done
+
+    assert asyncio.run(scenario()) == ("ok", [1])
@@ -0,0 +1,105 @@
+import threading
+from collections import Counter
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+
+from api.qdrant_service import QdrantManager
+
+# stream_pipeline imports the encoder service
+for module in ("sentence_transformers", "torch", "tqdm"):
+    pytest.importorskip(module)
+
+from scripts.embedding.stream_pipeline import StreamingIngestPipeline  # noqa: E402
+
+DIM = 4
+
+
+class FakeProcessor:
+    def __init__(self, n):
+        self.n = n
+        self.yielded = 0
+
+    def iter_chunks(self, file_config):
+        for i in range(self.n):
+            self.yielded += 1
+            yield {'id': f"chunk-{i}", 'text': f"text {i}", 'title': "t", 'url': "u",
+                   'heading': "", 'source_type': "documentation"}
+
+
+class FakeEmbedder:
+    model_name = "fake-model"
+
+    def __init__(self, fail_on_batch=None):
+        self.fail_on_batch = fail_on_batch
+        self.batches = 0
+
+    def prepare_texts_from_chunks(self, chunks):
+        return [chunk['text'] for chunk in chunks]
+
+    def generate_embeddings_batch(self, texts, batch_size=None, verbose=True):
+        self.batches += 1
+        if self.batches == self.fail_on_batch:
+            raise RuntimeError("encoder crashed")
+        return np.ones((len(texts), DIM), dtype=np.float32)
+
+
+def _manager():
+    manager = QdrantManager(collection_name="kb")
+    manager.client = QdrantClient(":memory:")
+    manager.client.create_collection("kb", vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    upserted = Counter()
+    upsert_chunks = manager.upsert_chunks
+    # The in-process client is not thread-safe; a Qdrant server takes concurrent upserts
+    lock = threading.Lock()
+
+    def recording_upsert(chunks, *args, **kwargs):
+        with lock:
+            upserted.update(chunk['id'] for chunk in chunks)
+            return upsert_chunks(chunks, *args, **kwargs)
+
+    manager.upsert_chunks = recording_upsert
+    return manager, upserted
+
+
+def _run(pipeline, timeout_s=20):
+    """pipeline.run() in a thread; fails the test instead of hanging on a deadlock"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['stats'] = pipeline.run({"input.json": "website_content"})
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout_s)
+    assert not thread.is_alive(), "pipeline deadlocked"
+    return outcome
+
+
+def test_every_chunk_is_upserted_once_through_tiny_queues():
+    manager, upserted = _manager()
+    pipeline = StreamingIngestPipeline(FakeProcessor(103), FakeEmbedder(), manager,
+                                       batch_size=4, queue_size=1, upload_workers=3, upload_retries=1)
+    stats = _run(pipeline)['stats']
+    assert upserted == Counter({f"chunk-{i}": 1 for i in range(103)})
+    assert stats['chunks'] == stats['unique_points'] == 103
+    assert stats['batches'] == 26
+    assert max(stats['max_queued'].values()) <= 1
+
+
+def test_failing_stage_stops_the_pipeline_and_reraises():
+    manager, upserted = _manager()
+    processor = FakeProcessor(10_000)
+    pipeline = StreamingIngestPipeline(processor, FakeEmbedder(fail_on_batch=3), manager,
+                                       batch_size=4, queue_size=1, upload_workers=2, upload_retries=1)
+    outcome = _run(pipeline)
+    assert isinstance(outcome.get('error'), RuntimeError)
+    assert str(outcome['error']) == "encoder crashed"
+    # Upstream stopped instead of chunking the whole input into a stalled queue
+    assert processor.yielded < 100
+    assert sum(upserted.values()) <= 8
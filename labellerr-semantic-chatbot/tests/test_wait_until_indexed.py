@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client.models import CollectionStatus
+
+from api.qdrant_service import wait_until_indexed
+
+GREEN, YELLOW, RED = CollectionStatus.GREEN, CollectionStatus.YELLOW, CollectionStatus.RED
+
+
+class StatusSequence:
+    """Client whose get_collection replays (status, indexed, points) states, repeating the last"""
+
+    def __init__(self, states):
+        self.states = list(states)
+        self.calls = 0
+
+    def get_collection(self, name):
+        status, indexed, points = self.states[min(self.calls, len(self.states) - 1)]
+        self.calls += 1
+        return SimpleNamespace(status=status, indexed_vectors_count=indexed, points_count=points,
+                               optimizer_status="ok")
+
+
+def test_green_before_the_optimizer_starts_is_not_done():
+    client = StatusSequence([(GREEN, 0, 100), (GREEN, 0, 100), (YELLOW, 40, 100), (GREEN, 100, 100)])
+    assert wait_until_indexed(client, "c", poll_s=0) == 100
+    assert client.calls == 4
+
+
+def test_expected_vectors_overrides_the_point_count():
+    client = StatusSequence([(GREEN, 50, 100), (YELLOW, 80, 100), (GREEN, 90, 100)])
+    assert wait_until_indexed(client, "c", expected_vectors=90, poll_s=0) == 90
+
+
+def test_segments_below_the_threshold_settle_after_optimizing():
+    client = StatusSequence([(YELLOW, 0, 100), (GREEN, 60, 100), (GREEN, 60, 100)])
+    assert wait_until_indexed(client, "c", poll_s=0) == 60
+    assert client.calls == 3
+
+
+def test_never_optimized_collection_settles_after_settle_polls():
+    client = StatusSequence([(GREEN, 0, 10)])
+    assert wait_until_indexed(client, "c", poll_s=0, settle_polls=3) == 0
+    assert client.calls == 4
+
+
+def test_red_and_timeout_raise():
+    with pytest.raises(RuntimeError):
+        wait_until_indexed(StatusSequence([(RED, 0, 10)]), "c", poll_s=0)
+    with pytest.raises(TimeoutError):
+        wait_until_indexed(StatusSequence([(YELLOW, 0, 10)]), "c", timeout_s=0, poll_s=0)
+
+
+def test_collection_below_the_indexing_threshold_is_done_when_green():
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+
+    client = QdrantClient(":memory:")
+    client.create_collection("small", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    client.upsert("small", points=[PointStruct(id=1, vector=[1.0, 0.0, 0.0, 0.0])])
+    assert wait_until_indexed(client, "small", timeout_s=0, poll_s=0) == 0